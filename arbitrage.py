@@ -1,34 +1,43 @@
 import asyncio
 import logging
-import json
+import sys
 import time
 from logging.handlers import RotatingFileHandler
 from config import CONFIG
-from functools import partial
-from utils import calculate_effective_buy, calculate_effective_sell
+from utils import calculate_effective_buy, calculate_effective_sell, exchange_label, stale_legs, ticker_quotes
+from orderbook import OrderBook
+from sizing import DepthSizer
+from scheduler import PollingScheduler
+from log_queue import queued, Lazy, SampledLog
+from metrics import SCAN_DURATION, SCAN_QUEUE_DEPTH, OPPORTUNITIES
 
 # Używamy RotatingFileHandler do logowania – konfiguracja logerów
 def setup_logger(logger_name, log_file, level=logging.INFO):
     logger = logging.getLogger(logger_name)
     if not logger.handlers:
-        handler = RotatingFileHandler(log_file, maxBytes=10*1024*1024, backupCount=5, encoding="utf-8")
+        # delay – plik powstaje przy pierwszym wpisie, a nie przy imporcie modułu (np. w testach i benchmarku)
+        handler = RotatingFileHandler(log_file, maxBytes=10*1024*1024, backupCount=5, encoding="utf-8", delay=True)
         formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
         handler.setFormatter(formatter)
-        logger.addHandler(handler)
+        # Zapis i rotacja pliku w wątku w tle – pętla zdarzeń tylko wrzuca rekord do kolejki
+        logger.addHandler(queued(handler))
         logger.setLevel(level)
         logger.propagate = False
     return logger
 
 arbitrage_logger = setup_logger("arbitrage", "arbitrage.log")
 opp_logger = setup_logger("arbitrage_opportunities", "arbitrage_opportunities.log")
+# Powtarzalne komunikaty etapu tickerów (ten sam symbol w każdym cyklu) – najwyżej jeden na LOG_SAMPLE_INTERVAL sekund
+sampled_logger = SampledLog(arbitrage_logger)
+
+OPPORTUNITY_LOG_FORMAT = (
+    "Pair: %s | Asset: %s | Buy (%s eff.): %.6f | Sell (%s eff.): %.6f | "
+    "Ticker Profit: %.2f%% | Liquidity Profit: %.2f%% | Profit (%s): %.6f | Invested (%s): %.6f | Qty Purchased: %.4f | "
+    "Liquidity Info: Buy Levels: %s; Sell Levels: %s | Extra: %s"
+)
 # Jeśli potrzebujemy oddzielnie logować nieopłacalne okazje – można dodać oddzielny logger,
 # ale zgodnie z ostatnimi ustaleniami wszystkie okazje trafiają do głównego logu.
 
-def normalize_symbol(symbol):
-    if ":" in symbol:
-        return symbol.split(":")[0]
-    return symbol
-
 # Funkcja pomocnicza do obliczania ważonej średniej ceny z kilku poziomów orderbooka
 def compute_weighted_average(order_levels, desired_qty):
     total_cost = 0
@@ -49,231 +58,512 @@ def compute_weighted_average(order_levels, desired_qty):
     weighted_avg = total_cost / total_volume
     return weighted_avg, used_levels
 
-# Asynchroniczny rate limiter
-class RateLimiter:
-    def __init__(self, delay):
-        self.delay = delay
-        self.last_request = 0
-
-RATE_LIMITS = {
-    "binanceexchange": 0.05,
-    "kucoinexchange": 0.2,
-    "bitgetexchange": 0.3,
-    "bitstampexchange": 1.2
-}
-rate_limiters = {}
-
-def get_rate_limiter(exchange):
-    key = exchange.__class__.__name__.lower()
-    if key not in rate_limiters:
-        delay = RATE_LIMITS.get(key, 0.1)
-        rate_limiters[key] = RateLimiter(delay)
-    return rate_limiters[key]
-
+# Limity zapytań są egzekwowane w adapterach giełd (exchanges/rate_limiter.py) dla wszystkich endpointów
 async def fetch_ticker_rate_limited_async(exchange, symbol):
-    now = time.monotonic()
-    limiter = get_rate_limiter(exchange)
-    wait_time = limiter.delay - (now - limiter.last_request)
-    if wait_time > 0:
-        await asyncio.sleep(wait_time)
-    ticker = await exchange.fetch_ticker(symbol)
-    limiter.last_request = time.monotonic()
-    return ticker
+    return await exchange.fetch_ticker(symbol)
+
+async def fetch_legs(leg1, leg2, timeout=None):
+    # Obie nogi pobierane równolegle ze wspólnym terminem; po jego przekroczeniu obie są pomijane
+    timeout = timeout if timeout is not None else CONFIG.get("LEG_FETCH_TIMEOUT")
+    try:
+        return await asyncio.wait_for(asyncio.gather(leg1, leg2), timeout)
+    except asyncio.TimeoutError:
+        return None, None
 
 async def get_liquidity_info_async(exchange, symbol, levels_to_fetch=CONFIG.get("ORDERBOOK_LEVELS", 5)):
     try:
-        order_book = await exchange.fetch_order_book(symbol)
-        asks = order_book.get('asks', [])[:levels_to_fetch]
-        bids = order_book.get('bids', [])[:levels_to_fetch]
-        return {"asks": asks, "bids": bids}
+        # Giełda zwraca tylko potrzebne poziomy (jawny limit głębokości), dalej tablicowy order book
+        order_book = await exchange.fetch_order_book(symbol, levels_to_fetch)
+        return OrderBook.from_ccxt(order_book, levels_to_fetch, symbol=symbol)
     except Exception as e:
-        arbitrage_logger.error(f"Error fetching order book for {symbol} on {exchange.__class__.__name__}: {e}")
+        arbitrage_logger.error("Error fetching order book for %s on %s: %s", symbol, exchange_label(exchange), e)
         return None
 
-async def convert_investment(quote, investment_usdt, conversion_exchange):
-    pair = f"{quote}/USDT"
-    ticker = await conversion_exchange.fetch_ticker(pair)
-    if ticker is None or ticker.get("last") is None:
-        return investment_usdt
-    price = ticker.get("last")
-    return investment_usdt / price
+class SymbolPlan:
+    """
+    Skompilowany opis jednego aktywa pary: symbole obu giełd (internowane), ich quote i etykieta do logów.
+    Liczony raz przy starcie strategii, aby sprawdzenie symbolu nie dzieliło napisów ani nie przeglądało CONFIG.
+    """
+    __slots__ = ("key", "label", "symbol1", "symbol2", "base", "quote1", "quote2", "convert1", "convert2")
+
+    def __init__(self, key, label, symbol1, symbol2, convert_quotes):
+        self.key = key  # klucz aktywa w common_assets.json (również klucz PollingScheduler)
+        self.label = label  # {giełda: symbol} jako napis – tak jak dotąd w logach
+        self.symbol1 = sys.intern(symbol1)
+        self.symbol2 = sys.intern(symbol2)
+        base, quote1 = symbol1.split("/")[:2]
+        self.base = sys.intern(base)
+        self.quote1 = sys.intern(quote1)
+        self.quote2 = sys.intern(symbol2.split("/")[1])
+        # Czy kwotę inwestycji przeliczać na quote nogi kupna (CONVERT_INVESTMENT) – dla kupna na giełdzie 1 / 2
+        self.convert1 = self.quote1 in convert_quotes
+        self.convert2 = self.quote2 in convert_quotes
+
+    def __repr__(self):
+        return self.label
+
+class Leg:
+    """Stałe jednego kierunku pary: giełda kupna i sprzedaży, opłaty, mnożniki ceny efektywnej i nazwy do logów."""
+    __slots__ = ("direction", "buy_exchange", "sell_exchange", "buy_label", "sell_label",
+                 "fee_buy", "fee_sell", "buy_multiplier", "sell_multiplier")
+
+    def __init__(self, direction, buy_exchange, sell_exchange):
+        self.direction = direction
+        self.buy_exchange = buy_exchange
+        self.sell_exchange = sell_exchange
+        self.buy_label = exchange_label(buy_exchange)
+        self.sell_label = exchange_label(sell_exchange)
+        self.fee_buy = buy_exchange.fee_rate
+        self.fee_sell = sell_exchange.fee_rate
+        self.buy_multiplier = calculate_effective_buy(1, self.fee_buy)
+        self.sell_multiplier = calculate_effective_sell(1, self.fee_sell)
 
 class PairArbitrageStrategy:
-    def __init__(self, exchange1, exchange2, assets, pair_name=""):
+    def __init__(self, exchange1, exchange2, assets, pair_name="", market_data=None, fx=None, recorder=None):
         self.exchange1 = exchange1
         self.exchange2 = exchange2
         self.assets = assets  # Słownik pełnych symboli, np. { "ABC/USDT": {"binance": "ABC/USDT", "bitget": "ABC/USDT"} }
         self.pair_name = pair_name  # np. "binance-bitget"
-
-    async def check_opportunity(self, asset):
-        names = self.pair_name.split("-")
-        if not isinstance(asset, dict):
-            if "/" in asset:
-                asset = {names[0]: asset, names[1]: asset}
-            else:
-                arbitrage_logger.error(f"{self.pair_name} - Asset '{asset}' does not contain '/', skipping.")
-                return
-
-        symbol_ex1 = asset.get(names[0])
-        symbol_ex2 = asset.get(names[1])
+        names = pair_name.split("-")
+        self.name1, self.name2 = names[0], names[-1]
+        self.market_data = market_data  # MarketDataHub – wspólny snapshot tickerów; None = pobieranie per symbol
+        self.fx = fx  # ConversionRates – kursy quote -> USDT z cache (przeliczanie inwestycji i par o różnych quote)
+        # OpportunityRecorder – zapis ocenionych okazji do pliku binarnego; jego run() uruchamia właściciel strategii
+        self.recorder = recorder
+        self.concurrency = self._scan_concurrency()
+        self.last_cycle_time = None
+        # Stałe z CONFIG i opłat giełd odczytywane raz, a nie przy każdym sprawdzeniu
+        self.threshold = CONFIG.get("ARBITRAGE_THRESHOLD", 2)
+        self.absurd_threshold = CONFIG.get("ABSURD_THRESHOLD", 100)
+        self.levels = CONFIG.get("ORDERBOOK_LEVELS", 5)
+        self.base_investment = CONFIG.get("INVESTMENT_AMOUNT", 100)
+        self.convert_quotes = {quote for quote, enabled in CONFIG.get("CONVERT_INVESTMENT", {}).items() if enabled}
+        self.legs = None
+        if exchange1 is not None and exchange2 is not None:
+            self.legs = {1: Leg(1, exchange1, exchange2), 2: Leg(2, exchange2, exchange1)}
+        self.plan = {}  # {klucz aktywa: SymbolPlan}
+        self.scheduler = None
+        for key in assets or ():
+            self.add_asset(key, assets[key] if isinstance(assets, dict) else None)
+        self.clock = time.time  # czas do oceny wieku notowań (w backteście – czas symulacji)
+        self.set_market_data(market_data)
+
+    def set_market_data(self, market_data):
+        # Snapshot można podłączyć po zbudowaniu strategii – jego symbole wynikają z jej skompilowanych planów.
+        # Bez wspólnego snapshotu tickery są pobierane per symbol – wtedy kolejność i częstotliwość
+        # sprawdzania symboli wyznacza PollingScheduler. Ze snapshotem i screenerem ten sam scheduler wybiera
+        # kandydatów, dla których w danym przebiegu pobieramy order booki
+        self.market_data = market_data
+        self.scheduler = None
+        if not CONFIG.get("ADAPTIVE_POLLING", True):
+            return
+        if market_data is None:
+            self.scheduler = PollingScheduler(self.plan, self._polling_budget())
+        elif market_data.screener is not None:
+            self.scheduler = PollingScheduler(self.plan, self._candidate_budget(),
+                                              max_interval=CONFIG.get("CANDIDATE_MAX_INTERVAL", 10))
+
+    def _scan_concurrency(self):
+        # Liczba aktywów sprawdzanych równolegle – ograniczona konfiguracją i budżetem zapytań obu giełd
+        limit = CONFIG.get("SCAN_CONCURRENCY", 20)
+        for exchange in (self.exchange1, self.exchange2):
+            limiter = getattr(exchange, "rate_limiter", None)
+            if limiter is not None:
+                limit = min(limit, int(limiter.capacity // limiter.order_book_weight()))
+        return max(1, limit)
+
+    def _polling_budget(self):
+        # Liczba symboli na przebieg: część budżetu zapytań wolniejszej giełdy (każdy symbol to jeden ticker na obu giełdach)
+        budget = len(self.plan)
+        for exchange in (self.exchange1, self.exchange2):
+            limiter = getattr(exchange, "rate_limiter", None)
+            if limiter is not None:
+                per_second = limiter.base_rate / limiter.weight("fetch_ticker")
+                budget = min(budget, int(per_second * CONFIG.get("POLL_BUDGET_SHARE", 0.3)))
+        return max(1, budget)
+
+    def _candidate_budget(self):
+        # Liczba kandydatów ze screeningu na przebieg snapshotu: część budżetu order booków wolniejszej giełdy
+        # w odstępie między snapshotami (każdy kandydat to jeden order book na obu giełdach)
+        budget = len(self.plan)
+        for exchange in (self.exchange1, self.exchange2):
+            limiter = getattr(exchange, "rate_limiter", None)
+            if limiter is not None:
+                per_second = limiter.base_rate / limiter.order_book_weight(self.levels)
+                budget = min(budget, int(per_second * CONFIG.get("SNAPSHOT_INTERVAL", 1)
+                                         * CONFIG.get("CANDIDATE_BUDGET_SHARE", 0.5)))
+        return max(1, budget)
+
+    def _scheduler_budget(self):
+        return self._polling_budget() if self.market_data is None else self._candidate_budget()
+
+    def compile_asset(self, key, mapping=None):
+        # SymbolPlan dla aktywa z common_assets.json: mapowanie {giełda: symbol} albo sam symbol wspólny dla obu giełd
+        if not isinstance(mapping, dict) or self.name1 not in mapping or self.name2 not in mapping:
+            if "/" not in key:
+                arbitrage_logger.error(f"{self.pair_name} - Asset '{key}' does not contain '/', skipping.")
+                return None
+            mapping = {self.name1: key, self.name2: key}
+        symbol_ex1 = mapping.get(self.name1)
+        symbol_ex2 = mapping.get(self.name2)
         if not symbol_ex1 or not symbol_ex2:
-            arbitrage_logger.warning(f"{self.pair_name} - Incomplete symbol data for asset {asset}, skipping.")
+            arbitrage_logger.warning(f"{self.pair_name} - Incomplete symbol data for asset {mapping}, skipping.")
+            return None
+        if "/" not in symbol_ex1 or "/" not in symbol_ex2:
+            arbitrage_logger.error(f"{self.pair_name} - Error determining quote from symbols {symbol_ex1}, {symbol_ex2}, skipping.")
+            return None
+        label = str({self.name1: symbol_ex1, self.name2: symbol_ex2})
+        return SymbolPlan(key, label, symbol_ex1, symbol_ex2, self.convert_quotes)
+
+    def add_asset(self, key, mapping=None):
+        plan = self.compile_asset(key, mapping)
+        if plan is not None:
+            self.plan[key] = plan
+            if self.scheduler is not None:
+                self.scheduler.add(key)
+        return plan
+
+    def remove_asset(self, key):
+        if self.scheduler is not None:
+            self.scheduler.discard(key)
+        return self.plan.pop(key, None)
+
+    def update_assets(self, assets):
+        """
+        Przeładowanie listy aktywów działającej strategii: dodaje nowe klucze, usuwa zniknięte i podmienia
+        aktywa ze zmienionym mapowaniem symboli. Plany (i statystyki schedulera) pozostałych aktywów zostają.
+        Zwraca (dodane, usunięte) klucze.
+        """
+        removed = [key for key in self.plan if key not in assets]
+        for key in removed:
+            self.remove_asset(key)
+        added = []
+        for key, mapping in assets.items():
+            plan = self.plan.get(key)
+            compiled = self.compile_asset(key, mapping)
+            if plan is not None and compiled is not None and (plan.symbol1, plan.symbol2) == (compiled.symbol1, compiled.symbol2):
+                continue
+            if plan is not None:
+                self.remove_asset(key)
+                removed.append(key)
+            if compiled is not None:
+                self.plan[key] = compiled
+                if self.scheduler is not None:
+                    self.scheduler.add(key)
+                added.append(key)
+        self.assets = assets
+        if self.scheduler is not None:
+            self.scheduler.budget = self._scheduler_budget()
+        return added, removed
+
+    async def check_opportunity(self, key):
+        plan = self.plan.get(key)
+        if plan is None:
             return
+        symbol_ex1, symbol_ex2 = plan.symbol1, plan.symbol2
 
-        arbitrage_logger.info(f"{self.pair_name} - Checking arbitrage for symbols: {symbol_ex1} ({names[0]}), {symbol_ex2} ({names[1]})")
+        sampled_logger.info((self.pair_name, "checking", key), "%s - Checking arbitrage for symbols: %s (%s), %s (%s)",
+                            self.pair_name, symbol_ex1, self.name1, symbol_ex2, self.name2)
 
-        # Pobierz tickery asynchronicznie
-        try:
-            ticker1 = await fetch_ticker_rate_limited_async(self.exchange1, symbol_ex1)
-            ticker2 = await fetch_ticker_rate_limited_async(self.exchange2, symbol_ex2)
-        except asyncio.CancelledError:
-            return
+        # Tickery bierzemy ze wspólnego snapshotu, a bez niego pobieramy je asynchronicznie
+        if self.market_data is not None:
+            ticker1 = self.market_data.get_ticker(self.name1, symbol_ex1)
+            ticker2 = self.market_data.get_ticker(self.name2, symbol_ex2)
+        else:
+            try:
+                ticker1, ticker2 = await fetch_legs(fetch_ticker_rate_limited_async(self.exchange1, symbol_ex1),
+                                                    fetch_ticker_rate_limited_async(self.exchange2, symbol_ex2))
+            except asyncio.CancelledError:
+                return
 
         if ticker1 is None or ticker2 is None:
-            arbitrage_logger.warning(f"{self.pair_name} - Missing ticker data for {asset}, skipping.")
+            sampled_logger.warning((self.pair_name, "missing ticker", key), "%s - Missing ticker data for %s, skipping.",
+                                   self.pair_name, plan.label)
+            return
+
+        # Nogi z różnych chwil (albo przeterminowane) dają pozorne spready
+        stale = stale_legs((ticker1.get("timestamp"), ticker1.get("received")),
+                           (ticker2.get("timestamp"), ticker2.get("received")), self.clock())
+        if stale is not None:
+            sampled_logger.info((self.pair_name, "stale", key), "%s - Stale ticker data for %s (%s), skipping.",
+                                self.pair_name, plan.label, stale)
             return
 
-        price1 = ticker1.get('last')
-        price2 = ticker2.get('last')
-        if price1 is None or price2 is None:
-            arbitrage_logger.warning(f"{self.pair_name} - Ticker price is None for {asset}, skipping.")
+        # Na każdej giełdzie kupujemy po ask i sprzedajemy po bid
+        bid1, ask1 = ticker_quotes(ticker1)
+        bid2, ask2 = ticker_quotes(ticker2)
+        if bid1 is None or ask1 is None or bid2 is None or ask2 is None:
+            sampled_logger.warning((self.pair_name, "no price", key), "%s - Ticker price is None for %s, skipping.",
+                                   self.pair_name, plan.label)
             return
 
-        # Oblicz zysk na podstawie cen tickerów dla obu kierunków:
-        fee1 = self.exchange1.fee_rate
-        fee2 = self.exchange2.fee_rate
-        effective_buy_ex1 = price1 * (1 + fee1 / 100)
-        effective_sell_ex2 = price2 * (1 - fee2 / 100)
+        # Gdy nogi mają różne quote (np. X/EUR kontra X/USDT), cenę sprzedaży przeliczamy na quote kupna – jak w check_liquidity
+        factor1 = factor2 = 1.0
+        if plan.quote1 != plan.quote2:
+            factor1 = self.fx.factor(plan.quote2, plan.quote1) if self.fx is not None else None
+            factor2 = self.fx.factor(plan.quote1, plan.quote2) if self.fx is not None else None
+            if factor1 is None or factor2 is None:
+                sampled_logger.info((self.pair_name, "fx", key), "%s - No conversion rate %s/%s for %s, skipping.",
+                                    self.pair_name, plan.quote2, plan.quote1, plan.label)
+                return
+
+        # Oblicz zysk na podstawie cen tickerów dla obu kierunków (mnożniki opłat policzone przy starcie):
+        leg1, leg2 = self.legs[1], self.legs[2]
+        effective_buy_ex1 = ask1 * leg1.buy_multiplier
+        effective_sell_ex2 = bid2 * leg1.sell_multiplier * factor1
         profit1 = ((effective_sell_ex2 - effective_buy_ex1) / effective_buy_ex1) * 100
 
-        effective_buy_ex2 = price2 * (1 + fee2 / 100)
-        effective_sell_ex1 = price1 * (1 - fee1 / 100)
+        effective_buy_ex2 = ask2 * leg2.buy_multiplier
+        effective_sell_ex1 = bid1 * leg2.sell_multiplier * factor2
         profit2 = ((effective_sell_ex1 - effective_buy_ex2) / effective_buy_ex2) * 100
+        if self.scheduler is not None:
+            self.scheduler.record(key, max(profit1, profit2))
 
-        threshold = CONFIG.get("ARBITRAGE_THRESHOLD", 2)
+        threshold = self.threshold
         if profit1 < threshold and profit2 < threshold:
-            arbitrage_logger.info(f"{self.pair_name} - Ticker profit below threshold for {asset}, skipping further calculations.")
+            sampled_logger.info((self.pair_name, "below", key), "%s - Ticker profit below threshold for %s, skipping further calculations.",
+                                self.pair_name, plan.label)
             return
 
         # Wybierz kierunek z lepszym zyskiem
         if profit1 >= threshold and profit1 >= profit2:
-            chosen_direction = 1
-            chosen_profit = profit1
-            buy_exchange = self.exchange1
-            sell_exchange = self.exchange2
-            symbol_buy = symbol_ex1
-            symbol_sell = symbol_ex2
+            chosen_direction, chosen_profit = 1, profit1
         elif profit2 >= threshold:
-            chosen_direction = 2
-            chosen_profit = profit2
-            buy_exchange = self.exchange2
-            sell_exchange = self.exchange1
-            symbol_buy = symbol_ex2
-            symbol_sell = symbol_ex1
+            chosen_direction, chosen_profit = 2, profit2
         else:
-            arbitrage_logger.info(f"{self.pair_name} - No valid arbitrage direction for {asset}, skipping.")
+            sampled_logger.info((self.pair_name, "direction", key), "%s - No valid arbitrage direction for %s, skipping.",
+                                self.pair_name, plan.label)
             return
-
-        try:
-            quote = symbol_buy.split("/")[1]
-        except Exception as e:
-            arbitrage_logger.error(f"{self.pair_name} - Error determining quote from symbol {symbol_buy}: {e}")
+        if chosen_profit >= self.absurd_threshold:
+            sampled_logger.info((self.pair_name, "absurd", key), "%s - Ticker profit %.2f%% above absurd threshold for %s, skipping.",
+                                self.pair_name, chosen_profit, plan.label)
             return
 
-        base_investment = CONFIG.get("INVESTMENT_AMOUNT", 100)
+        # price1/price2 – ceny na giełdzie 1 i 2 w wybranym kierunku (strona kupna: ask, sprzedaży: bid)
+        price1, price2 = (ask1, bid2) if chosen_direction == 1 else (bid1, ask2)
+        await self.check_liquidity(plan, chosen_direction, chosen_profit, price1, price2)
+
+    async def check_liquidity(self, plan, chosen_direction, chosen_profit, price1, price2):
+        # Etap order booków dla kierunku wybranego na podstawie tickerów (1 = kupno na giełdzie 1, 2 = na giełdzie 2)
+        leg = self.legs[chosen_direction]
+        buy_exchange, sell_exchange = leg.buy_exchange, leg.sell_exchange
+        if chosen_direction == 1:
+            symbol_buy, symbol_sell, quote, sell_quote, convert = plan.symbol1, plan.symbol2, plan.quote1, plan.quote2, plan.convert1
+        else:
+            symbol_buy, symbol_sell, quote, sell_quote, convert = plan.symbol2, plan.symbol1, plan.quote2, plan.quote1, plan.convert2
+        fee_buy = leg.fee_buy
+        fee_sell = leg.fee_sell
+
+        # Gdy nogi mają różne quote (np. X/EUR kontra X/USDT), przychód ze sprzedaży przeliczamy na quote kupna
+        quote_factor = 1.0
+        if sell_quote != quote:
+            quote_factor = self.fx.factor(sell_quote, quote) if self.fx is not None else None
+            if quote_factor is None:
+                sampled_logger.warning((self.pair_name, "fx", plan.key), "%s - No conversion rate %s/%s for %s, skipping.",
+                                       self.pair_name, sell_quote, quote, plan.label)
+                return
+
+        base_investment = self.base_investment
         investment = base_investment
-        if CONFIG.get("CONVERT_INVESTMENT", {}).get(quote, False):
-            from exchanges.binance import BinanceExchange
-            conversion_exchange = BinanceExchange()
-            investment = await convert_investment(quote, base_investment, conversion_exchange)
-            await conversion_exchange.close()
-            arbitrage_logger.info(f"Converted investment for quote {quote}: {base_investment} USDT -> {investment:.6f} {quote}")
+        if convert:
+            converted = self.fx.from_base(base_investment, quote) if self.fx is not None else None
+            if converted is None:
+                sampled_logger.warning((self.pair_name, "investment fx", quote), "%s - No conversion rate for quote %s, using unconverted investment.",
+                                       self.pair_name, quote)
+            else:
+                investment = converted
+                sampled_logger.info((self.pair_name, "converted", quote), "Converted investment for quote %s: %s USDT -> %.6f %s",
+                                    quote, base_investment, investment, quote)
 
         # Sprawdzenie płynności – używamy wielu poziomów order booka
-        orderbook_data_buy = await get_liquidity_info_async(buy_exchange, symbol_buy, levels_to_fetch=CONFIG.get("ORDERBOOK_LEVELS", 5))
-        orderbook_data_sell = await get_liquidity_info_async(sell_exchange, symbol_sell, levels_to_fetch=CONFIG.get("ORDERBOOK_LEVELS", 5))
+        levels = self.levels
+        orderbook_data_buy, orderbook_data_sell = await fetch_legs(
+            get_liquidity_info_async(buy_exchange, symbol_buy, levels_to_fetch=levels),
+            get_liquidity_info_async(sell_exchange, symbol_sell, levels_to_fetch=levels))
         if orderbook_data_buy is None or orderbook_data_sell is None:
-            arbitrage_logger.warning(f"{self.pair_name} - Missing order book data for {asset}, skipping liquidity check.")
+            sampled_logger.warning((self.pair_name, "missing book", plan.key), "%s - Missing order book data for %s, skipping liquidity check.",
+                                   self.pair_name, plan.label)
+            return
+        stale = stale_legs((orderbook_data_buy.timestamp, orderbook_data_buy.received),
+                           (orderbook_data_sell.timestamp, orderbook_data_sell.received), self.clock())
+        if stale is not None:
+            OPPORTUNITIES.labels(self.pair_name, "stale").inc()
+            sampled_logger.warning((self.pair_name, "stale book", plan.key), "%s - Stale order book data for %s (%s), skipping liquidity check.",
+                                   self.pair_name, plan.label, stale)
             return
 
-        asks = orderbook_data_buy.get("asks", [])
-        bids = orderbook_data_sell.get("bids", [])
+        asks = orderbook_data_buy.asks
+        bids = orderbook_data_sell.bids
 
         if not asks or not bids:
-            arbitrage_logger.warning(f"{self.pair_name} - Insufficient order book levels for {asset}, skipping.")
+            sampled_logger.warning((self.pair_name, "shallow book", plan.key), "%s - Insufficient order book levels for %s, skipping.",
+                                   self.pair_name, plan.label)
             return
 
-        # Najpierw sprawdź, czy pierwszy poziom wystarcza
-        first_ask = asks[0]
-        effective_order_buy_first = first_ask[0] * (1 + fee1 / 100)
-        desired_qty = investment / effective_order_buy_first
-        if first_ask[1] >= desired_qty:
-            weighted_buy_price = first_ask[0]
-            buy_breakdown = [(first_ask[0], desired_qty)]
+        # Wielkość transakcji ze skumulowanych tablic order booków – ta sama ilość po stronie kupna i sprzedaży,
+        # przycięta do głębokości, która faktycznie jest dostępna
+        sizer = DepthSizer(asks, bids, fee_buy, fee_sell, quote_factor=quote_factor)
+        sized = sizer.evaluate_investments(investment)
+        actual_qty = float(sized["qty"][0])
+        if actual_qty <= 0:
+            sampled_logger.warning((self.pair_name, "sizing", plan.key), "%s - Unable to size trade from order book depth for %s, skipping.",
+                                   self.pair_name, plan.label)
+            return
+        depth_exhausted = bool(sized["depth_exhausted"][0])
+        effective_buy_final = float(sized["avg_buy"][0])
+        effective_sell_final = float(sized["avg_sell"][0])
+        weighted_buy_price = effective_buy_final / leg.buy_multiplier
+        weighted_sell_price = effective_sell_final / leg.sell_multiplier / quote_factor
+        profit_liq = ((effective_sell_final - effective_buy_final) / effective_buy_final) * 100
+        invested_amount = float(sized["cost"][0])
+        potential_proceeds = float(sized["proceeds"][0])
+
+        if self.recorder is not None:
+            self.recorder.record(self.pair_name, plan.base, leg.buy_label, leg.sell_label,
+                                 symbol_buy, symbol_sell, quote, chosen_direction,
+                                 price1 if chosen_direction == 1 else price2, price2 if chosen_direction == 1 else price1,
+                                 effective_buy_final, effective_sell_final, chosen_profit, profit_liq,
+                                 potential_proceeds - invested_amount, invested_amount, actual_qty, depth_exhausted,
+                                 asks, bids, self.clock())
+
+        # Komunikat (z poziomami order booków i drabinką wielkości) składa dopiero wątek logowania
+        log_args = (
+            self.pair_name, plan.label, leg.buy_label, effective_buy_final,
+            leg.sell_label, effective_sell_final, chosen_profit, profit_liq,
+            quote, potential_proceeds - invested_amount, quote, invested_amount, actual_qty,
+            Lazy(asks.levels), Lazy(bids.levels),
+            Lazy(self._extra_info, sizer, asks, bids, actual_qty, investment, weighted_buy_price, weighted_sell_price, depth_exhausted),
+        )
+        OPPORTUNITIES.labels(self.pair_name, "profitable" if profit_liq > 0 else "unprofitable").inc()
+        if profit_liq is not None and profit_liq > 0:
+            opp_logger.info(OPPORTUNITY_LOG_FORMAT, *log_args)
         else:
-            weighted_buy_price, buy_breakdown = compute_weighted_average(asks, desired_qty)
-            if weighted_buy_price is None:
-                arbitrage_logger.warning(f"{self.pair_name} - Unable to compute weighted average buy price for {asset}, skipping.")
-                return
+            arbitrage_logger.info(OPPORTUNITY_LOG_FORMAT, *log_args)
 
-        # Analogicznie dla sprzedaży
-        first_bid = bids[0]
-        effective_order_sell_first = first_bid[0] * (1 - fee2 / 100)
-        desired_qty_sell = investment / effective_order_sell_first
-        if first_bid[1] >= desired_qty_sell:
-            weighted_sell_price = first_bid[0]
-            sell_breakdown = [(first_bid[0], desired_qty_sell)]
+        if chosen_direction == 1:
+            arbitrage_logger.info("%s - Opportunity Direction 1: Buy on %s at %s | Sell on %s at %s | Ticker Profit: %.2f%%",
+                                  self.pair_name, leg.buy_label, price1, leg.sell_label, price2, chosen_profit)
         else:
-            weighted_sell_price, sell_breakdown = compute_weighted_average(bids, desired_qty_sell)
-            if weighted_sell_price is None:
-                arbitrage_logger.warning(f"{self.pair_name} - Unable to compute weighted average sell price for {asset}, skipping.")
-                return
+            arbitrage_logger.info("%s - Opportunity Direction 2: Buy on %s at %s | Sell on %s at %s | Ticker Profit: %.2f%%",
+                                  self.pair_name, leg.buy_label, price2, leg.sell_label, price1, chosen_profit)
 
-        effective_buy_final = weighted_buy_price * (1 + fee1 / 100)
-        effective_sell_final = weighted_sell_price * (1 - fee2 / 100)
-        profit_liq = ((effective_sell_final - effective_buy_final) / effective_buy_final) * 100
-
-        # Założenie: rzeczywista ilość to desired_qty (można też sumować breakdown, ale zakładamy, że suma breakdown = desired_qty)
-        actual_qty = desired_qty  
-        invested_amount = actual_qty * effective_buy_final
-        potential_proceeds = actual_qty * effective_sell_final
+    @staticmethod
+    def _extra_info(sizer, asks, bids, actual_qty, investment, weighted_buy_price, weighted_sell_price, depth_exhausted):
+        _, buy_breakdown = compute_weighted_average(asks, actual_qty)
+        _, sell_breakdown = compute_weighted_average(bids, actual_qty)
+        optimal = sizer.optimal(CONFIG.get("MAX_INVESTMENT_AMOUNT"))
 
         extra_info = f"Weighted Buy Price: {weighted_buy_price:.6f}, Weighted Sell Price: {weighted_sell_price:.6f}; "
         extra_info += f"Breakdown Buy: {buy_breakdown}; Breakdown Sell: {sell_breakdown}; "
-
-        log_line = (
-            f"Pair: {self.pair_name} | Asset: {asset} | "
-            f"Buy ({buy_exchange.__class__.__name__} eff.): {effective_buy_final:.6f} | "
-            f"Sell ({sell_exchange.__class__.__name__} eff.): {effective_sell_final:.6f} | "
-            f"Ticker Profit: {chosen_profit:.2f}% | Liquidity Profit: {profit_liq:.2f}% | "
-            f"Profit ({quote}): {potential_proceeds - invested_amount:.6f} | "
-            f"Invested ({quote}): {invested_amount:.6f} | Qty Purchased: {actual_qty:.4f} | "
-            f"Liquidity Info: Buy Levels: {asks}; Sell Levels: {bids} | Extra: {extra_info}"
-        )
-
-        if profit_liq is not None and profit_liq > 0:
-            opp_logger.info(log_line)
+        extra_info += f"Depth Exhausted: {depth_exhausted}; "
+        extra_info += (f"Optimal Qty: {optimal['qty']:.4f}, Optimal Invested: {optimal['cost']:.6f}, "
+                       f"Optimal Profit: {optimal['profit']:.6f}; ")
+        ladder = CONFIG.get("SIZE_LADDER", [])
+        if ladder:
+            ladder_result = sizer.evaluate_investments([investment * step for step in ladder])
+            extra_info += "Ladder Profit: " + ", ".join(
+                f"{step}x: {profit:.6f}{' (depth exhausted)' if exhausted else ''}"
+                for step, profit, exhausted in zip(ladder, ladder_result["profit"], ladder_result["depth_exhausted"])
+            ) + "; "
+        return extra_info
+
+    def screening_assets(self):
+        # Lista (SymbolPlan, symbol na giełdzie 1, symbol na giełdzie 2) dla TickerScreener – kandydaci ze screeningu
+        # trafiają z nim prosto do check_liquidity
+        return [(plan, plan.symbol1, plan.symbol2) for plan in self.plan.values()]
+
+    def stale_snapshot(self, plan):
+        # Wiek i rozjazd nóg aktywa we wspólnym snapshocie tickerów – sprawdzany przed pobraniem order booków,
+        # bo screening liczy spread z cen snapshotu. Zwraca opis powodu odrzucenia albo None
+        ticker1 = self.market_data.get_ticker(self.name1, plan.symbol1)
+        ticker2 = self.market_data.get_ticker(self.name2, plan.symbol2)
+        if ticker1 is None or ticker2 is None:
+            return "missing ticker"
+        return stale_legs((ticker1.get("timestamp"), ticker1.get("received")),
+                          (ticker2.get("timestamp"), ticker2.get("received")), self.clock())
+
+    def fresh_snapshot(self, plan):
+        stale = self.stale_snapshot(plan)
+        if stale is None:
+            return True
+        OPPORTUNITIES.labels(self.pair_name, "stale").inc()
+        sampled_logger.info((self.pair_name, "stale", plan.key), "%s - Stale ticker data for %s (%s), skipping.",
+                            self.pair_name, plan.label, stale)
+        return False
+
+    def fresh_candidates(self, candidates):
+        # Kandydaci ze screeningu, których nogi w snapshocie są aktualne i pochodzą z (prawie) tej samej chwili
+        return [candidate for candidate in candidates if self.fresh_snapshot(candidate[0])]
+
+    def record_spreads(self):
+        # Spread każdego aktywa pary z ostatniego screeningu – także poniżej progu – trafia do statystyk schedulera,
+        # inaczej aktywa spoza kandydatów byłyby oceniane według coraz starszych danych
+        plans, spreads = self.market_data.screener.spreads(self.pair_name)
+        for plan, spread in zip(plans, spreads.tolist()):
+            if spread == spread:  # NaN – brak ceny na którejś giełdzie
+                self.scheduler.record(plan.key, spread)
+
+    def select_candidates(self, candidates):
+        # Kandydaci ze screeningu, dla których w tym przebiegu pobieramy order booki; gdy jest ich więcej niż
+        # budżet – najbardziej obiecujący i zaległi
+        if self.scheduler is not None:
+            self.record_spreads()
+        candidates = self.fresh_candidates(candidates)
+        if self.scheduler is None or not candidates:
+            return candidates
+        by_key = {}
+        for candidate in candidates:
+            plan, profit = candidate[0], candidate[2]
+            best = by_key.get(plan.key)
+            if best is None or profit > best[2]:
+                by_key[plan.key] = candidate
+        return [by_key[key] for key in self.scheduler.select(candidates=by_key)]
+
+    async def scan(self, candidates=None):
+        # Bez kandydatów sprawdzamy wszystkie aktywa od etapu tickerów; z kandydatami (po screeningu)
+        # od razu przechodzimy do order booków
+        semaphore = asyncio.Semaphore(self.concurrency)
+        if candidates is None:
+            items = self.scheduler.select() if self.scheduler is not None else list(self.plan)
+            check_item = self.check_opportunity
         else:
-            arbitrage_logger.info(log_line)
-
-        if chosen_direction == 1 and profit1 >= threshold:
-            arbitrage_logger.info(
-                f"{self.pair_name} - Opportunity Direction 1: Buy on {self.exchange1.__class__.__name__} at {price1} | "
-                f"Sell on {self.exchange2.__class__.__name__} at {price2} | Ticker Profit: {profit1:.2f}%"
-            )
-        elif chosen_direction == 2 and profit2 >= threshold:
-            arbitrage_logger.info(
-                f"{self.pair_name} - Opportunity Direction 2: Buy on {self.exchange2.__class__.__name__} at {price2} | "
-                f"Sell on {self.exchange1.__class__.__name__} at {price1} | Ticker Profit: {profit2:.2f}%"
-            )
+            items = self.select_candidates(candidates)
+            check_item = lambda candidate: self.check_liquidity(*candidate)
+
+        queue_depth = SCAN_QUEUE_DEPTH.labels(self.pair_name)
+        queue_depth.set(len(items))
+
+        async def check(item):
+            try:
+                async with semaphore:
+                    await check_item(item)
+            finally:
+                queue_depth.dec()
+
+        start = time.monotonic()
+        results = await asyncio.gather(*(check(item) for item in items), return_exceptions=True)
+        for item, result in zip(items, results):
+            if isinstance(result, Exception):
+                arbitrage_logger.error("%s - Error checking %s: %s", self.pair_name, item, result)
+        self.last_cycle_time = time.monotonic() - start
+        SCAN_DURATION.labels(self.pair_name).observe(self.last_cycle_time)
+        arbitrage_logger.info("%s - Scan cycle of %d assets finished in %.2fs (concurrency %s).",
+                              self.pair_name, len(items), self.last_cycle_time, self.concurrency)
 
     async def run(self):
-        arbitrage_logger.info(f"{self.pair_name} - Starting arbitrage strategy for {len(self.assets)} assets.")
+        arbitrage_logger.info(f"{self.pair_name} - Starting arbitrage strategy for {len(self.plan)} assets.")
+        cycle = 0
         try:
             while True:
-                for asset in self.assets:
-                    await self.check_opportunity(asset)
-                await asyncio.sleep(1)
+                if self.market_data is not None:
+                    # Jeden przebieg na każdy nowy snapshot tickerów
+                    cycle = await self.market_data.wait_for_update(cycle)
+                if self.market_data is not None and self.market_data.screener is not None:
+                    await self.scan(self.market_data.candidates.get(self.pair_name, []))
+                else:
+                    await self.scan()
+                if self.market_data is None:
+                    await asyncio.sleep(1)
         except asyncio.CancelledError:
             arbitrage_logger.info(f"{self.pair_name} - Arbitrage strategy cancelled.")
             return
@@ -0,0 +1,168 @@
+import asyncio
+import json
+import logging
+import os
+from config import CONFIG
+from arbitrage import PairArbitrageStrategy
+from cross_venue import build_universe
+import common_assets
+
+logger = logging.getLogger("arbitrage")
+
+# Pliki definiujące uniwersum aktywów; zmiana któregokolwiek przeładowuje aktywa działających strategii
+ASSET_FILES = ("common_assets.json", "assets_to_add.json", "assets_to_remove.json")
+
+async def load_asset_universe(filename="common_assets.json"):
+    # common_assets.json z naniesionymi assets_to_add.json / assets_to_remove.json; None, gdy pliku nie da się wczytać
+    try:
+        with open(filename, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except Exception as e:
+        logger.error(f"Failed to load {filename}: {e}")
+        return None
+    return await common_assets.modify_common_assets(data)
+
+def pair_symbols(strategies):
+    # {giełda: symbole} potrzebne strategiom par – z ich skompilowanych planów; giełdy każdej pary są zawsze
+    # w wyniku (także bez poprawnych aktywów), aby screener i snapshot je znały przy późniejszym przeładowaniu
+    symbols = {}
+    for strategy in strategies.values():
+        symbols1 = symbols.setdefault(strategy.name1, set())
+        symbols2 = symbols.setdefault(strategy.name2, set())
+        for plan in strategy.plan.values():
+            symbols1.add(plan.symbol1)
+            symbols2.add(plan.symbol2)
+    return symbols
+
+def universe_symbols(universe):
+    symbols = {}
+    for listing in universe.values():
+        for name, symbol in listing.items():
+            symbols.setdefault(name, set()).add(symbol)
+    return symbols
+
+def update_streaming(exchanges, before, after):
+    # Strumienie giełd, których lista symboli się zmieniła, są subskrybowane od nowa z pełną listą
+    if not CONFIG.get("STREAMING", False):
+        return
+    for name, symbols in after.items():
+        if symbols != before.get(name) and name in exchanges:
+            exchanges[name].start_streaming(symbols)
+
+class AssetWatcher:
+    """
+    Obserwuje pliki aktywów (porównując mtime co ASSET_RELOAD_INTERVAL sekund) i po zmianie wczytuje uniwersum
+    od nowa, przekazując je do apply(common_assets_data). Nieudane wczytanie (np. plik zapisany w połowie)
+    zostawia bieżące aktywa – ponowna próba nastąpi przy kolejnej zmianie pliku.
+    """
+    def __init__(self, apply, files=ASSET_FILES, interval=None):
+        self.apply = apply
+        self.files = files
+        self.interval = interval if interval is not None else CONFIG.get("ASSET_RELOAD_INTERVAL", 5)
+        self.stamps = self._stamps()
+
+    def _stamps(self):
+        stamps = []
+        for filename in self.files:
+            try:
+                stat = os.stat(filename)
+                stamps.append((stat.st_mtime_ns, stat.st_size))
+            except OSError:
+                stamps.append(None)
+        return stamps
+
+    async def run(self):
+        if not self.interval:
+            return
+        logger.info(f"AssetWatcher - Watching {', '.join(self.files)} every {self.interval}s.")
+        while True:
+            await asyncio.sleep(self.interval)
+            stamps = self._stamps()
+            if stamps == self.stamps:
+                continue
+            self.stamps = stamps
+            data = await load_asset_universe(self.files[0])
+            if data is None:
+                continue
+            try:
+                self.apply(data)
+            except Exception as e:
+                logger.error(f"AssetWatcher - Failed to apply reloaded assets: {e}")
+
+class PairAssetReloader:
+    """
+    Nanosi przeładowane common_assets.json na działające strategie par: różnicę aktywów każdej pary,
+    wpisy TickerScreenera oraz symbole snapshotu MarketDataHub. Strategia pary, której nie było przy starcie,
+    jest uruchamiana, jeśli obie giełdy są w snapshocie; pozostałe aktywa i połączenia nie są ruszane.
+    """
+    def __init__(self, exchanges, strategies, screener, market_data, fx=None, recorder=None):
+        self.exchanges = exchanges
+        self.strategies = strategies  # {pair_key: PairArbitrageStrategy}
+        self.screener = screener
+        self.market_data = market_data
+        self.fx = fx
+        self.recorder = recorder
+        self.tasks = []  # zadania strategii uruchomionych przez przeładowanie
+
+    def _start_pair(self, pair_key, assets):
+        names = pair_key.split("-")
+        if len(names) != 2 or any(name not in self.market_data.exchanges for name in names):
+            logger.warning(f"AssetReload - Pair {pair_key} is not covered by the running market data, restart to scan it.")
+            return None
+        strategy = PairArbitrageStrategy(self.exchanges[names[0]], self.exchanges[names[1]], {}, pair_name=pair_key,
+                                         market_data=self.market_data, fx=self.fx, recorder=self.recorder)
+        self.strategies[pair_key] = strategy
+        self.tasks.append(asyncio.create_task(strategy.run()))
+        return strategy
+
+    def apply(self, common_assets_data):
+        before = pair_symbols(self.strategies)
+        changed = False
+        for pair_key in set(self.strategies) | set(common_assets_data):
+            assets = common_assets_data.get(pair_key) or {}
+            strategy = self.strategies.get(pair_key)
+            if strategy is None:
+                if not assets:
+                    continue
+                strategy = self._start_pair(pair_key, assets)
+                if strategy is None:
+                    continue
+            added, removed = strategy.update_assets(assets)
+            if not added and not removed:
+                continue
+            changed = True
+            self.screener.remove_pair(pair_key)
+            self.screener.add_pair(pair_key, strategy.name1, strategy.name2, strategy.screening_assets())
+            logger.info(f"AssetReload - {pair_key}: added {len(added)}, removed {len(removed)} assets "
+                        f"({len(strategy.plan)} in total).")
+        if not changed:
+            logger.info("AssetReload - Asset files changed, but pair assets are the same.")
+            return
+        after = pair_symbols(self.strategies)
+        self.market_data.set_symbols(after)
+        update_streaming(self.exchanges, before, after)
+
+    async def close(self):
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+
+class CrossAssetReloader:
+    """Przeładowanie uniwersum CrossVenueArbitrageStrategy i symboli jej snapshotu."""
+    def __init__(self, exchanges, strategy, market_data):
+        self.exchanges = exchanges
+        self.strategy = strategy
+        self.market_data = market_data
+
+    def apply(self, common_assets_data):
+        before = universe_symbols(self.strategy.assets)
+        universe = build_universe(common_assets_data, cross_quote=CONFIG.get("CROSS_QUOTE_MATCHING", True))
+        added, removed = self.strategy.update_universe(universe)
+        after = universe_symbols(self.strategy.assets)
+        if after == before:
+            logger.info("AssetReload - Asset files changed, but the cross-venue universe is the same.")
+            return
+        logger.info(f"AssetReload - Cross-venue universe: added {len(added)}, removed {len(removed)} assets "
+                    f"({len(self.strategy.assets)} in total).")
+        self.market_data.set_symbols(after)
+        update_streaming(self.exchanges, before, after)
@@ -0,0 +1,309 @@
+import argparse
+import asyncio
+import bisect
+import gzip
+import json
+import logging
+import os
+import time
+from config import CONFIG
+
+logger = logging.getLogger("arbitrage")
+
+# Nagrywanie i odtwarzanie odpowiedzi REST giełd. Plik na giełdę: <katalog>/<giełda>.jsonl.gz,
+# linie "czas\tendpoint\tklucz\tJSON" (klucz to symbol albo pusty dla fetch_tickers/load_markets; dla fetch_tickers
+# z listą symboli, np. kursów ConversionRates, klucz to posortowane symbole rozdzielone przecinkami).
+# Zapisujemy tylko pola używane przez strategie, a nie pełne odpowiedzi ccxt.
+
+TICKER_FIELDS = ("symbol", "timestamp", "received", "bid", "ask", "last", "bidVolume", "askVolume", "quoteVolume")
+
+def compact_ticker(ticker):
+    return {field: ticker.get(field) for field in TICKER_FIELDS}
+
+def compact_result(endpoint, result):
+    if endpoint == "fetch_ticker":
+        return compact_ticker(result)
+    if endpoint == "fetch_tickers":
+        return {symbol: compact_ticker(ticker) for symbol, ticker in result.items()}
+    if endpoint == "fetch_order_book":
+        return {"symbol": result.get("symbol"), "timestamp": result.get("timestamp"), "received": result.get("received"),
+                "bids": [level[:2] for level in result.get("bids", [])],
+                "asks": [level[:2] for level in result.get("asks", [])]}
+    if endpoint == "load_markets":
+        return sorted(result)
+    return result  # np. fee_rate
+
+def tickers_key(symbols):
+    # Klucz zapytania fetch_tickers – pusty dla pełnego snapshotu, aby podzbiór nie zastąpił go przy odtwarzaniu
+    return ",".join(sorted(symbols)) if symbols else ""
+
+class RecordingExchange:
+    """
+    Adapter giełdy, który przekazuje wywołania do prawdziwego adaptera i zapisuje odpowiedzi do pliku
+    (partiami, w wątku w tle). Pozostałe atrybuty (fee_rate, start_streaming, ...) są przekazywane bez zmian.
+    """
+    def __init__(self, name, exchange, record_dir=None, batch_size=500):
+        self.name = name
+        self.display_name = getattr(exchange, "display_name", name)  # etykieta nagrywanej giełdy w logach okazji
+        self._exchange = exchange
+        record_dir = record_dir or CONFIG.get("BACKTEST_RECORD_DIR")
+        os.makedirs(record_dir, exist_ok=True)
+        self.path = os.path.join(record_dir, f"{name}.jsonl.gz")
+        self.batch_size = batch_size
+        self._lines = []
+        self._flushing = None
+        self._record("fee_rate", "", exchange.fee_rate)
+        self._record("display_name", "", self.display_name)
+
+    def __getattr__(self, attr):
+        return getattr(self._exchange, attr)
+
+    def _record(self, endpoint, key, result):
+        if result is None:
+            return
+        payload = json.dumps(compact_result(endpoint, result), separators=(",", ":"))
+        self._lines.append(f"{time.time():.3f}\t{endpoint}\t{key}\t{payload}\n")
+        if len(self._lines) >= self.batch_size and self._flushing is None:
+            self._flushing = asyncio.create_task(self.flush())
+
+    def _write(self, lines):
+        with gzip.open(self.path, "at", encoding="utf-8") as f:
+            f.writelines(lines)
+
+    async def flush(self):
+        lines, self._lines = self._lines, []
+        try:
+            if lines:
+                await asyncio.to_thread(self._write, lines)
+        finally:
+            self._flushing = None
+
+    async def load_markets(self):
+        markets = await self._exchange.load_markets()
+        self._record("load_markets", "", markets)
+        return markets
+
+    async def fetch_ticker(self, symbol):
+        ticker = await self._exchange.fetch_ticker(symbol)
+        self._record("fetch_ticker", symbol, ticker)
+        return ticker
+
+    async def fetch_tickers(self, symbols=None):
+        tickers = await self._exchange.fetch_tickers(symbols)
+        self._record("fetch_tickers", tickers_key(symbols), tickers)
+        return tickers
+
+    async def fetch_order_book(self, symbol, limit=None):
+        order_book = await self._exchange.fetch_order_book(symbol, limit)
+        self._record("fetch_order_book", symbol, order_book)
+        return order_book
+
+    async def close(self):
+        if self._flushing is not None:
+            await self._flushing
+        await self.flush()
+        await self._exchange.close()
+
+class ReplayClock:
+    """
+    Czas symulacji. speed > 0 – czas płynie speed razy szybciej niż rzeczywisty;
+    speed = 0 – czas stoi i przesuwa go tylko advance() (tryb "najszybciej jak się da").
+    """
+    def __init__(self, start, speed=1.0):
+        self.start = start
+        self.speed = speed
+        self._current = start
+        self._started_at = time.monotonic()
+
+    def now(self):
+        if self.speed > 0:
+            return self.start + (time.monotonic() - self._started_at) * self.speed
+        return self._current
+
+    def advance(self, timestamp):
+        self._current = timestamp
+
+class SimulatedExchange:
+    """
+    Adapter z tym samym interfejsem co adaptery w exchanges/ (fetch_ticker, fetch_tickers, fetch_order_book,
+    load_markets), zwracający ostatnią nagraną odpowiedź sprzed bieżącego czasu ReplayClock.
+    """
+    def __init__(self, name, path, clock=None, lookahead=1.0):
+        self.name = name
+        self.clock = clock
+        # Order book pobierany w reakcji na snapshot tickerów jest nagrany chwilę po nim – dopuszczamy to przesunięcie
+        self.lookahead = lookahead
+        self.records = {}  # {(endpoint, klucz): ([czasy], [JSON])} – JSON parsowany dopiero przy odczycie
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            for line in f:
+                timestamp, endpoint, key, payload = line.rstrip("\n").split("\t", 3)
+                times, payloads = self.records.setdefault((endpoint, key), ([], []))
+                times.append(float(timestamp))
+                payloads.append(payload)
+        for times, payloads in self.records.values():
+            if any(a > b for a, b in zip(times, times[1:])):
+                order = sorted(range(len(times)), key=times.__getitem__)
+                times[:] = [times[i] for i in order]
+                payloads[:] = [payloads[i] for i in order]
+        fee_rates = self.records.pop(("fee_rate", ""), None)
+        self.fee_rate = json.loads(fee_rates[1][-1]) if fee_rates else 0.1
+        # Etykieta nagranej giełdy (starsze nagrania jej nie mają – wtedy nazwa z pliku)
+        display_names = self.records.pop(("display_name", ""), None)
+        self.display_name = json.loads(display_names[1][-1]) if display_names else name
+
+    def time_range(self):
+        starts = [times[0] for times, _ in self.records.values()]
+        ends = [times[-1] for times, _ in self.records.values()]
+        return (min(starts), max(ends)) if starts else (None, None)
+
+    def timestamps(self):
+        # Chwile nagranych tickerów – kroki symulacji w trybie speed=0 (zapytania o podzbiór symboli, np. kursy
+        # walut, nie wyznaczają kroków)
+        return sorted({t for (endpoint, key), (times, _) in self.records.items()
+                       if endpoint == "fetch_ticker" or (endpoint == "fetch_tickers" and not key) for t in times})
+
+    def _latest(self, endpoint, key, lookahead=0.0):
+        entry = self.records.get((endpoint, key))
+        if entry is None:
+            return None
+        times, payloads = entry
+        i = bisect.bisect_right(times, self.clock.now() + lookahead) - 1
+        return json.loads(payloads[i]) if i >= 0 else None
+
+    async def load_markets(self):
+        symbols = self._latest("load_markets", "")
+        if symbols is None:
+            symbols = sorted({key for endpoint, key in self.records if key})
+        return {symbol: {"symbol": symbol} for symbol in symbols}
+
+    async def fetch_ticker(self, symbol):
+        ticker = self._latest("fetch_ticker", symbol)
+        if ticker is None:
+            tickers = self._latest("fetch_tickers", "")
+            ticker = tickers.get(symbol) if tickers else None
+        return ticker
+
+    async def fetch_tickers(self, symbols=None):
+        if symbols:
+            tickers = self._latest("fetch_tickers", tickers_key(symbols))
+            if tickers is not None:
+                return tickers
+        tickers = self._latest("fetch_tickers", "")
+        if tickers is None:
+            # Nagranie bez zapytań zbiorczych – składamy snapshot z tickerów pobieranych per symbol
+            tickers = {}
+            for endpoint, key in self.records:
+                if endpoint == "fetch_ticker":
+                    ticker = self._latest(endpoint, key)
+                    if ticker is not None:
+                        tickers[key] = ticker
+        if symbols:
+            tickers = {symbol: tickers[symbol] for symbol in symbols if symbol in tickers}
+        return tickers
+
+    async def fetch_order_book(self, symbol, limit=None):
+        order_book = self._latest("fetch_order_book", symbol, self.lookahead)
+        if order_book is not None and limit is not None:
+            order_book["bids"] = order_book["bids"][:limit]
+            order_book["asks"] = order_book["asks"][:limit]
+        return order_book
+
+    async def close(self):
+        pass
+
+def load_simulated_exchanges(record_dir, speed=0.0):
+    exchanges = {}
+    for filename in sorted(os.listdir(record_dir)):
+        if filename.endswith(".jsonl.gz"):
+            name = filename[:-len(".jsonl.gz")]
+            exchanges[name] = SimulatedExchange(name, os.path.join(record_dir, filename))
+    start = min(exchange.time_range()[0] for exchange in exchanges.values()) if exchanges else 0
+    clock = ReplayClock(start, speed)
+    for exchange in exchanges.values():
+        exchange.clock = clock
+    return exchanges, clock
+
+async def run_backtest(record_dir, speed=0.0, per_symbol=False, common_assets_file="common_assets.json"):
+    """
+    Uruchamia strategie par na nagranych danych. Przy speed=0 czas symulacji przesuwa się po kolejnych
+    nagranych chwilach (co najmniej co SNAPSHOT_INTERVAL sekund), a po każdym kroku wykonywany jest jeden
+    przebieg każdej strategii – bez czekania w czasie rzeczywistym.
+    """
+    from arbitrage import PairArbitrageStrategy
+    from market_data import MarketDataHub
+    from screening import TickerScreener
+    from asset_reload import pair_symbols
+
+    exchanges, clock = load_simulated_exchanges(record_dir, speed)
+    with open(common_assets_file, "r", encoding="utf-8") as f:
+        common_assets_data = json.load(f)
+    strategies = {}
+    for pair_key, assets in common_assets_data.items():
+        names = pair_key.split("-")
+        if len(names) != 2 or not assets or names[0] not in exchanges or names[1] not in exchanges:
+            continue
+        strategies[pair_key] = PairArbitrageStrategy(exchanges[names[0]], exchanges[names[1]], assets, pair_name=pair_key)
+    if not strategies:
+        logger.error(f"Backtest - No exchange pairs with recordings in {record_dir}")
+        return
+
+    market_data = screener = None
+    if not per_symbol:
+        # Symbole snapshotu – ze skompilowanych planów strategii, jak w main.run_pair_arbitrage
+        symbols = pair_symbols(strategies)
+        screener = TickerScreener({name: exchanges[name].fee_rate for name in symbols})
+        market_data = MarketDataHub({name: exchanges[name] for name in symbols}, symbols=symbols, screener=screener)
+    pair_strategies = []
+    for pair_key, strategy in strategies.items():
+        strategy.set_market_data(market_data)
+        if strategy.scheduler is not None:
+            # Priorytety i maksymalny odstęp sprawdzeń liczone w czasie symulacji
+            strategy.scheduler.clock = clock.now
+        strategy.clock = clock.now  # wiek notowań również
+        if screener is not None:
+            screener.add_pair(pair_key, strategy.name1, strategy.name2, strategy.screening_assets())
+        pair_strategies.append(strategy)
+
+    started = time.monotonic()
+    if speed > 0:
+        tasks = [asyncio.create_task(strategy.run()) for strategy in pair_strategies]
+        if market_data is not None:
+            tasks.append(asyncio.create_task(market_data.run()))
+        end = max(exchange.time_range()[1] for exchange in exchanges.values())
+        try:
+            while clock.now() < end:
+                await asyncio.sleep(1)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+        steps = None
+    else:
+        interval = CONFIG.get("SNAPSHOT_INTERVAL", 1)
+        steps = 0
+        last = None
+        for timestamp in sorted({t for exchange in exchanges.values() for t in exchange.timestamps()}):
+            if last is not None and timestamp - last < interval:
+                continue
+            last = timestamp
+            clock.advance(timestamp)
+            if market_data is not None:
+                await market_data.refresh()
+            for strategy in pair_strategies:
+                if market_data is not None:
+                    await strategy.scan(market_data.candidates.get(strategy.pair_name, []))
+                else:
+                    await strategy.scan()
+            steps += 1
+    logger.info(f"Backtest - Replayed {record_dir} in {time.monotonic() - started:.2f}s"
+                + (f" ({steps} steps)" if steps is not None else ""))
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Run the pair strategies on recorded exchange responses")
+    parser.add_argument("record_dir", help="directory with <exchange>.jsonl.gz recordings (BACKTEST_RECORD_DIR)")
+    parser.add_argument("--speed", type=float, default=0.0, help="replay speed multiplier, 0 = as fast as possible")
+    parser.add_argument("--per-symbol", action="store_true", help="fetch tickers per symbol instead of the shared snapshot hub")
+    parser.add_argument("--assets", default="common_assets.json")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(run_backtest(args.record_dir, args.speed, args.per_symbol, args.assets))
@@ -0,0 +1,315 @@
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import resource
+import statistics
+import sys
+import tempfile
+import time
+import ccxt.async_support as ccxt
+
+# Benchmark gorącej ścieżki bez sieci: adaptery z exchanges/ dostają zamiast klienta ccxt FakeExchangeClient
+# (opóźnienia, limity zapytań po stronie "giełdy", losowe błędy, N symboli), a benchmark uruchamia
+# common_assets.main i run_arbitrage_for_all_pairs w katalogu tymczasowym. Ziarno RNG jest stałe,
+# więc wyniki są powtarzalne i nadają się do porównań w CI (--json, --max-cycle-time).
+
+EXCHANGE_NAMES = ("binance", "kucoin", "bitget", "bitstamp")
+
+class FakeExchangeClient:
+    """
+    Zastępuje klienta ccxt.async_support w adapterze: te same nazwy metod i format odpowiedzi.
+    Ceny to błądzenie losowe wokół wspólnej ceny symbolu; inject() podbija cenę na tej giełdzie,
+    tworząc okazję o znanym momencie pojawienia się.
+    """
+    def __init__(self, name, symbols, rng, latency=0.05, jitter=0.02, error_rate=0.0, server_rate=None, levels=20):
+        self.id = name
+        self.symbols = symbols  # {symbol: cena bazowa}
+        self.rng = rng
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.server_rate = server_rate  # zapytań na sekundę po stronie "giełdy"; None = bez limitu
+        self.levels = levels
+        self.offsets = {}  # {symbol: mnożnik ceny} – wstrzyknięte rozjazdy cen
+        self.requests = {}  # {endpoint: liczba zapytań}
+        self.errors = 0
+        self.rate_limited = 0
+        self.last_response_headers = {}
+        self._tokens = server_rate or 0
+        self._updated = time.monotonic()
+
+    async def _request(self, endpoint):
+        self.requests[endpoint] = self.requests.get(endpoint, 0) + 1
+        await asyncio.sleep(max(0.0, self.rng.gauss(self.latency, self.jitter)))
+        if self.server_rate:
+            now = time.monotonic()
+            self._tokens = min(self.server_rate, self._tokens + (now - self._updated) * self.server_rate)
+            self._updated = now
+            if self._tokens < 1:
+                self.rate_limited += 1
+                self.last_response_headers = {"Retry-After": "1"}
+                raise ccxt.RateLimitExceeded(f"{self.id} 429 Too Many Requests")
+            self._tokens -= 1
+        if self.error_rate and self.rng.random() < self.error_rate:
+            self.errors += 1
+            raise ccxt.NetworkError(f"{self.id} simulated network error")
+
+    def price(self, symbol):
+        base = self.symbols[symbol]
+        # Małe wahania (±0,2%), żeby ticker zmieniał się między cyklami, ale nie dawał fałszywych okazji
+        return base * self.offsets.get(symbol, 1.0) * (1 + self.rng.uniform(-0.002, 0.002))
+
+    def ticker(self, symbol):
+        price = self.price(symbol)
+        return {"symbol": symbol, "timestamp": int(time.time() * 1000), "bid": price * 0.9995,
+                "ask": price * 1.0005, "last": price, "quoteVolume": 1e6}
+
+    async def load_markets(self):
+        await self._request("load_markets")
+        return {symbol: {"symbol": symbol} for symbol in self.symbols}
+
+    async def fetch_ticker(self, symbol):
+        await self._request("fetch_ticker")
+        if symbol not in self.symbols:
+            raise ccxt.BadSymbol(f"{self.id} does not have market symbol {symbol}")
+        return self.ticker(symbol)
+
+    async def fetch_tickers(self, symbols=None):
+        await self._request("fetch_tickers")
+        return {symbol: self.ticker(symbol) for symbol in (symbols or self.symbols) if symbol in self.symbols}
+
+    async def fetch_order_book(self, symbol, limit=None):
+        await self._request("fetch_order_book")
+        if symbol not in self.symbols:
+            raise ccxt.BadSymbol(f"{self.id} does not have market symbol {symbol}")
+        price = self.price(symbol)
+        depth = min(limit or self.levels, self.levels)
+        size = max(500 / price, 50)  # co najmniej 500 jednostek quote na poziom, a wolumen ponad MIN_LIQUIDITY
+        return {"symbol": symbol, "timestamp": int(time.time() * 1000),
+                "bids": [[price * (1 - 0.0005 * (i + 1)), size] for i in range(depth)],
+                "asks": [[price * (1 + 0.0005 * (i + 1)), size] for i in range(depth)]}
+
+    async def close(self):
+        pass
+
+def create_exchanges(n_symbols, seed, latency, error_rate, server_rate, rate_scale):
+    from exchanges.binance import BinanceExchange
+    from exchanges.kucoin import KucoinExchange
+    from exchanges.bitget import BitgetExchange
+    from exchanges.bitstamp import BitstampExchange
+    rng = random.Random(seed)
+    universe = {f"SYM{i}/USDT": rng.uniform(0.001, 100) for i in range(n_symbols)}
+    universe["EUR/USDT"] = 1.08
+    classes = {"binance": BinanceExchange, "kucoin": KucoinExchange, "bitget": BitgetExchange, "bitstamp": BitstampExchange}
+    exchanges = {}
+    for name in EXCHANGE_NAMES:
+        # Każda giełda notuje ok. 80% symboli – pary giełd mają różne zbiory wspólnych aktywów
+        listed = {symbol: price for symbol, price in universe.items() if symbol == "EUR/USDT" or rng.random() < 0.8}
+        adapter = classes[name]()
+        adapter.exchange = FakeExchangeClient(name, listed, random.Random(rng.random()), latency=latency,
+                                              error_rate=error_rate, server_rate=server_rate)
+        adapter.rate_limiter.scale(rate_scale)
+        exchanges[name] = adapter
+    return exchanges
+
+def timed(cls, method, samples):
+    # Podmienia metodę async klasy na wersję mierzącą czas wywołań; zwraca funkcję przywracającą oryginał
+    original = getattr(cls, method)
+
+    async def wrapper(self, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return await original(self, *args, **kwargs)
+        finally:
+            samples.append(time.perf_counter() - start)
+
+    setattr(cls, method, wrapper)
+    return lambda: setattr(cls, method, original)
+
+class DetectionHandler(logging.Handler):
+    # Czas od wstrzyknięcia rozjazdu ceny do pojawienia się rekordu w logu okazji
+    def __init__(self, injections):
+        super().__init__()
+        self.injections = injections  # {symbol: czas wstrzyknięcia}
+        self.latencies = []
+
+    def emit(self, record):
+        asset = record.args[1] if isinstance(record.args, tuple) and len(record.args) > 1 else None
+        # Argument "Asset" to SymbolPlan strategii (w logu jako {giełda: symbol})
+        symbols = (asset.symbol1, asset.symbol2) if hasattr(asset, "symbol1") else [asset]
+        for symbol in symbols:
+            injected = self.injections.pop(symbol, None)
+            if injected is not None:
+                self.latencies.append(record.created - injected)
+
+async def inject_opportunities(exchanges, assets, injections, rng, interval, hold, spread):
+    # Rozjazdy wstrzykujemy tylko dla aktywów z common_assets.json – tylko te są skanowane
+    names = list(exchanges)
+    while True:
+        await asyncio.sleep(interval)
+        name = rng.choice(names)
+        client = exchanges[name].exchange
+        candidates = sorted(symbol for symbol in assets if symbol in client.symbols and symbol not in injections)
+        if not candidates:
+            continue
+        symbol = rng.choice(candidates)
+        client.offsets[symbol] = 1 + spread / 100
+        injections[symbol] = time.time()
+        asyncio.get_running_loop().call_later(hold, client.offsets.pop, symbol, None)
+
+def summary(samples):
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return {"count": len(samples), "mean": statistics.fmean(samples), "p50": ordered[len(ordered) // 2],
+            "p95": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], "max": ordered[-1]}
+
+def request_stats(exchanges, elapsed):
+    stats = {}
+    for name, adapter in exchanges.items():
+        client = adapter.exchange
+        total = sum(client.requests.values())
+        stats[name] = {"requests": dict(client.requests), "per_second": total / elapsed if elapsed else 0.0,
+                       "errors": client.errors, "rate_limited": client.rate_limited}
+        client.requests.clear()
+        client.errors = client.rate_limited = 0
+    return stats
+
+def redirect_logs(workdir):
+    # Logery z arbitrage.py mogły zostać skonfigurowane przed chdir (np. gdy arbitrage zaimportowały testy) –
+    # wtedy pisałyby do plików w repozytorium, więc podpinamy je od nowa do plików w workdir
+    from arbitrage import setup_logger
+    for name, filename in (("arbitrage", "arbitrage.log"), ("arbitrage_opportunities", "arbitrage_opportunities.log")):
+        logger = logging.getLogger(name)
+        for handler in list(logger.handlers):
+            logger.removeHandler(handler)
+        setup_logger(name, os.path.join(workdir, filename))
+
+async def run_benchmark(args):
+    from config import CONFIG
+    import common_assets
+    import main as app
+    from arbitrage import PairArbitrageStrategy, opp_logger
+    from cross_venue import CrossVenueArbitrageStrategy
+    from market_data import MarketDataHub
+
+    CONFIG["ARBITRAGE_MODE"] = args.mode
+    CONFIG["STREAMING"] = False
+    # Fałszywe klienty zastępują klienta ccxt, więc szybka ścieżka (bezpośrednie HTTP) i procesy tickerów są wyłączone
+    CONFIG["RAW_MARKET_DATA"] = False
+    CONFIG["SHARDED_WORKERS"] = 0
+    exchanges = create_exchanges(args.symbols, args.seed, args.latency, args.error_rate, args.server_rate, args.rate_scale)
+    results = {"symbols": args.symbols, "mode": args.mode, "seed": args.seed}
+
+    # Etap 1: tworzenie listy wspólnych aktywów (zimny start, bez cache na dysku)
+    start = time.perf_counter()
+    await common_assets.main(exchanges)
+    elapsed = time.perf_counter() - start
+    results["discovery"] = {"seconds": elapsed, "exchanges": request_stats(exchanges, elapsed)}
+    with open("common_assets.json", "r", encoding="utf-8") as f:
+        assets = {symbol for pair_assets in json.load(f).values() for symbol in pair_assets}
+    results["discovery"]["common_assets"] = len(assets)
+
+    # Etap 2: arbitraż przez args.duration sekund z wstrzykiwanymi okazjami
+    refresh_samples, scan_samples = [], []
+    restore = [timed(MarketDataHub, "refresh", refresh_samples),
+               timed(PairArbitrageStrategy, "scan", scan_samples),
+               timed(CrossVenueArbitrageStrategy, "scan", scan_samples)]
+    injections = {}
+    detector = DetectionHandler(injections)
+    opp_logger.addHandler(detector)
+    rng = random.Random(args.seed + 1)
+    start = time.perf_counter()
+    arbitrage_task = asyncio.create_task(app.run_arbitrage_for_all_pairs(exchanges))
+    injector = asyncio.create_task(inject_opportunities(exchanges, assets, injections, rng, args.inject_interval,
+                                                        args.inject_hold, args.inject_spread))
+    try:
+        await asyncio.wait_for(asyncio.shield(arbitrage_task), timeout=args.duration)
+    except asyncio.TimeoutError:
+        pass
+    finally:
+        for task in (injector, arbitrage_task):
+            task.cancel()
+        await asyncio.gather(injector, arbitrage_task, return_exceptions=True)
+        opp_logger.removeHandler(detector)
+        for undo in restore:
+            undo()
+    elapsed = time.perf_counter() - start
+    results["arbitrage"] = {
+        "seconds": elapsed,
+        "snapshot_refresh": summary(refresh_samples),
+        "scan": summary(scan_samples),
+        "detection_latency": summary(detector.latencies),
+        "missed_injections": len(injections),
+        "exchanges": request_stats(exchanges, elapsed),
+    }
+    results["max_rss_mb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    for exchange in exchanges.values():
+        await exchange.close()
+    return results
+
+def print_report(results):
+    print(f"Symbols: {results['symbols']}, mode: {results['mode']}, seed: {results['seed']}")
+    for stage in ("discovery", "arbitrage"):
+        data = results[stage]
+        print(f"\n{stage}: {data['seconds']:.2f}s" + (f", {data['common_assets']} common assets" if "common_assets" in data else ""))
+        for name, stats in data["exchanges"].items():
+            print(f"  {name:<9} {stats['per_second']:8.1f} req/s  errors {stats['errors']}  429 {stats['rate_limited']}  {stats['requests']}")
+        for key in ("snapshot_refresh", "scan", "detection_latency"):
+            if key in data:
+                value = data[key]
+                if value is None:
+                    print(f"  {key:<18} no samples")
+                else:
+                    print(f"  {key:<18} n={value['count']} mean={value['mean'] * 1000:.1f}ms p50={value['p50'] * 1000:.1f}ms "
+                          f"p95={value['p95'] * 1000:.1f}ms max={value['max'] * 1000:.1f}ms")
+        if "missed_injections" in data:
+            print(f"  missed injections  {data['missed_injections']}")
+    print(f"\nmax RSS: {results['max_rss_mb']:.1f} MB")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark discovery and the arbitrage loop against in-process fake exchanges")
+    parser.add_argument("--symbols", type=int, default=200, help="number of symbols per exchange universe")
+    parser.add_argument("--duration", type=float, default=20, help="seconds of arbitrage loop to measure")
+    parser.add_argument("--mode", choices=["cross", "pairs"], default="cross")
+    parser.add_argument("--latency", type=float, default=0.05, help="mean simulated response time in seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests failing with a network error")
+    parser.add_argument("--server-rate", type=float, default=None, help="server-side requests/s before 429 (default: unlimited)")
+    parser.add_argument("--rate-scale", type=float, default=1.0, help="multiplier for the client-side RATE_LIMITS")
+    parser.add_argument("--inject-interval", type=float, default=2.0, help="seconds between planted opportunities")
+    parser.add_argument("--inject-hold", type=float, default=5.0, help="seconds a planted opportunity lasts")
+    parser.add_argument("--inject-spread", type=float, default=5.0, help="planted price divergence in percent")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", help="write results to this file")
+    parser.add_argument("--max-cycle-time", type=float, help="fail (exit 1) if p95 of snapshot refresh + scan exceeds this many seconds")
+    args = parser.parse_args(argv)
+    if args.json:
+        args.json = os.path.abspath(args.json)
+
+    # Pliki logów, cache i common_assets.json trafiają do katalogu tymczasowego, nie do repozytorium
+    workdir = tempfile.mkdtemp(prefix="arbitrage-bench-")
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        redirect_logs(workdir)
+        results = asyncio.run(run_benchmark(args))
+    finally:
+        os.chdir(cwd)
+    print_report(results)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    if args.max_cycle_time is not None:
+        arbitrage = results["arbitrage"]
+        cycle = sum(arbitrage[key]["p95"] for key in ("snapshot_refresh", "scan") if arbitrage[key])
+        if cycle > args.max_cycle_time:
+            print(f"p95 cycle time {cycle:.3f}s exceeds {args.max_cycle_time}s")
+            return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    sys.exit(main())
@@ -1,54 +1,182 @@
 import asyncio
 import json
 import logging
+import time
 from config import CONFIG
+from utils import exchange_label
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 
-async def load_markets_for_exchange(exchange, allowed_quotes):
+async def load_markets_for_exchange(exchange, allowed_quotes, ids=None):
+    # ids – opcjonalny słownik uzupełniany id rynków giełdy ({symbol: id}) dla cache odkrywania
     try:
-        logger.info(f"Loading markets for: {exchange.__class__.__name__}")
+        logger.info(f"Loading markets for: {exchange_label(exchange)}")
         markets = await exchange.load_markets()
         result = {}
-        for symbol in markets:
+        for symbol, market in markets.items():
             if "/" in symbol:
                 base, quote = symbol.split("/")
                 if quote in allowed_quotes:
                     result[symbol] = symbol
+                    if ids is not None and market.get("id") and market.get("spot", True):
+                        ids[symbol] = market["id"]
         return result
     except Exception as e:
-        logger.error(f"Error loading markets for {exchange.__class__.__name__}: {e}")
+        logger.error(f"Error loading markets for {exchange_label(exchange)}: {e}")
         return {}
 
-async def get_total_volume(exchange, symbol, side='asks', levels=1):
+def load_discovery_cache(filename=None):
+    filename = filename or CONFIG.get("DISCOVERY_CACHE_FILE", "discovery_cache.json")
+    try:
+        with open(filename, "r", encoding="utf-8") as f:
+            cache = json.load(f)
+    except FileNotFoundError:
+        cache = {}
+    except Exception as e:
+        logger.warning(f"Failed to load discovery cache {filename}: {e}")
+        cache = {}
+    cache.setdefault("markets", {})
+    cache.setdefault("liquidity", {})
+    return cache
+
+def save_discovery_cache(cache, filename=None):
+    filename = filename or CONFIG.get("DISCOVERY_CACHE_FILE", "discovery_cache.json")
+    try:
+        with open(filename, "w", encoding="utf-8") as f:
+            json.dump(cache, f)
+    except Exception as e:
+        logger.error(f"Error saving discovery cache to {filename}: {e}")
+
+async def load_markets_cached(name, exchange, allowed_quotes, cache):
+    """
+    Rynki giełdy z cache na dysku, jeśli są młodsze niż MARKETS_CACHE_TTL i pobrano je dla tych samych quote;
+    w przeciwnym razie load_markets przez API. Nieudanego pobrania nie zapisujemy do cache.
+    Z cache adapter dostaje też id rynków, więc szybka ścieżka (exchanges/raw.py) pobiera order booki
+    bez load_markets. Zapytania przez ccxt (giełdy bez szybkiej ścieżki) nadal ładują rynki przy pierwszym użyciu.
+    """
+    entry = cache["markets"].get(name)
+    ttl = CONFIG.get("MARKETS_CACHE_TTL", 3600)
+    if entry and entry.get("quotes") == sorted(allowed_quotes) and time.time() - entry.get("updated", 0) < ttl:
+        logger.info(f"Using cached markets for {name} ({len(entry['symbols'])} symbols)")
+        seed_market_ids(exchange, entry)
+        return {symbol: symbol for symbol in entry["symbols"]}
+    ids = {}
+    markets = await load_markets_for_exchange(exchange, allowed_quotes, ids)
+    if markets:
+        cache["markets"][name] = {"updated": time.time(), "quotes": sorted(allowed_quotes), "symbols": sorted(markets),
+                                  "ids": ids}
+    elif entry and entry.get("quotes") == sorted(allowed_quotes):
+        logger.warning(f"Falling back to stale cached markets for {name}")
+        seed_market_ids(exchange, entry)
+        return {symbol: symbol for symbol in entry["symbols"]}
+    return markets
+
+def seed_market_ids(exchange, entry):
+    # Starsze wpisy cache (bez "ids") i adaptery bez szybkiej ścieżki (np. replay) są pomijane
+    seed = getattr(exchange, "seed_symbol_map", None)
+    if seed is not None and entry.get("ids"):
+        seed(entry["ids"])
+
+async def load_all_markets(exchanges, allowed_quotes, cache):
+    # Każda giełda jest ładowana raz i wszystkie równolegle (zamiast dwa razy na każdą parę po kolei)
+    names = list(exchanges.keys())
+    results = await asyncio.gather(*(load_markets_cached(name, exchanges[name], allowed_quotes, cache) for name in names))
+    return dict(zip(names, results))
+
+async def get_book_volumes(exchange, symbol, levels=1):
     """
-    Pobiera order book dla symbolu i sumuje wolumeny z pierwszych 'levels' pozycji po danej stronie (asks lub bids).
+    Jeden order book na symbol: zwraca (wolumen asks, wolumen bids) z pierwszych 'levels' poziomów
+    lub None, jeśli pobranie się nie udało.
     """
     try:
-        order_book = await exchange.fetch_order_book(symbol)
-        levels_list = order_book.get(side, [])
-        total_volume = sum(volume for price, volume in levels_list[:levels])
-        return total_volume
+        order_book = await exchange.fetch_order_book(symbol, levels)
+        if order_book is None:
+            return None
+        asks = sum(volume for price, volume in order_book.get("asks", [])[:levels])
+        bids = sum(volume for price, volume in order_book.get("bids", [])[:levels])
+        return asks, bids
+    except asyncio.CancelledError:
+        raise
     except Exception as e:
-        logger.error(f"Error fetching order book for {symbol} on {exchange.__class__.__name__}: {e}")
-        return 0
+        logger.error(f"Error fetching order book for {symbol} on {exchange_label(exchange)}: {e}")
+        return None
 
-async def get_common_assets_for_pair(name1, exchange1, name2, exchange2, allowed_quotes):
+def needs_liquidity_check(entry, required_liq, levels, now):
     """
-    Pobiera rynki dla dwóch giełd i zwraca wspólne symbole (pełne symbole, np. "ABC/USDT" lub "ABC/EUR").
+    Wynik z cache jest ponownie używany, jeśli jest młodszy niż LIQUIDITY_CACHE_TTL, sprawdzano tę samą liczbę
+    poziomów i wolumen nie leży blisko progu (w granicach LIQUIDITY_RECHECK_MARGIN) – tylko takie symbole
+    mogą zmienić status przy kolejnym sprawdzeniu.
+    """
+    if entry is None or entry.get("levels") != levels:
+        return True
+    if now - entry.get("checked", 0) >= CONFIG.get("LIQUIDITY_CACHE_TTL", 6 * 3600):
+        return True
+    margin = CONFIG.get("LIQUIDITY_RECHECK_MARGIN", 0.5)
+    return any(required_liq * (1 - margin) <= volume <= required_liq * (1 + margin) for volume in (entry["asks"], entry["bids"]))
+
+async def check_liquidity_for_symbols(exchanges, wanted, cache):
+    """
+    Wolumeny order booków dla par (giełda, symbol) z wanted. Każdy order book jest pobierany co najwyżej raz
+    (wspólnie dla wszystkich par giełd), równolegle – tempo ogranicza TokenBucketLimiter adaptera
+    i DISCOVERY_CONCURRENCY. Zwraca {giełda: {symbol: (asks, bids)}}.
+    """
+    min_liq = CONFIG.get("MIN_LIQUIDITY", {})
+    levels = CONFIG.get("LIQUIDITY_LEVELS_TO_CHECK", 1)
+    now = time.time()
+    volumes = {}
+    to_check = []
+    for name, symbol in sorted(wanted):
+        entry = cache["liquidity"].get(name, {}).get(symbol)
+        if needs_liquidity_check(entry, min_liq.get(symbol.split("/")[1], 0), levels, now):
+            to_check.append((name, symbol))
+        else:
+            volumes.setdefault(name, {})[symbol] = (entry["asks"], entry["bids"])
+    logger.info(f"Liquidity check: {len(to_check)} order books to fetch, {len(wanted) - len(to_check)} reused from cache")
+
+    semaphore = asyncio.Semaphore(CONFIG.get("DISCOVERY_CONCURRENCY", 20))
+
+    async def check(name, symbol):
+        async with semaphore:
+            return await get_book_volumes(exchanges[name], symbol, levels)
+
+    results = await asyncio.gather(*(check(name, symbol) for name, symbol in to_check))
+    for (name, symbol), result in zip(to_check, results):
+        if result is None:
+            volumes.setdefault(name, {})[symbol] = (0, 0)
+            continue
+        volumes.setdefault(name, {})[symbol] = result
+        cache["liquidity"].setdefault(name, {})[symbol] = {"asks": result[0], "bids": result[1], "levels": levels, "checked": now}
+    # Symbole, które zniknęły z giełdy, usuwamy z cache
+    for name, listing in cache["liquidity"].items():
+        listed = cache["markets"].get(name, {}).get("symbols")
+        if listed is not None:
+            listed = set(listed)
+            for symbol in [symbol for symbol in listing if symbol not in listed]:
+                del listing[symbol]
+    return volumes
+
+async def get_common_assets_for_pair(name1, exchange1, name2, exchange2, allowed_quotes, markets=None, volumes=None, cache=None):
+    """
+    Zwraca wspólne symbole dwóch giełd (pełne symbole, np. "ABC/USDT" lub "ABC/EUR").
     Następnie – jeśli w CONFIG FILTER_LOW_LIQUIDITY=True – dla każdego symbolu sprawdza sumaryczny wolumen
     z pierwszych N pozycji order booka (ustalonych przez LIQUIDITY_LEVELS_TO_CHECK) dla obu giełd.
     Jeśli wolumen jest mniejszy niż minimalny (MIN_LIQUIDITY dla danego quote), symbol jest pomijany.
+    Rynki (markets) i wolumeny (volumes) można przekazać już pobrane – main() pobiera je raz dla wszystkich par.
     """
-    markets1 = await load_markets_for_exchange(exchange1, allowed_quotes)
-    markets2 = await load_markets_for_exchange(exchange2, allowed_quotes)
-    common_symbols = set(markets1.keys()).intersection(set(markets2.keys()))
+    own_cache = cache is None
+    if own_cache:
+        cache = load_discovery_cache()
+    if markets is None:
+        markets = await load_all_markets({name1: exchange1, name2: exchange2}, allowed_quotes, cache)
+    common_symbols = set(markets[name1].keys()).intersection(set(markets[name2].keys()))
     logger.info(f"Found {len(common_symbols)} common symbols for {name1} and {name2} before liquidity filtering")
     # Jeśli filtrowanie płynności jest włączone, odfiltrowujemy symbole
     if CONFIG.get("FILTER_LOW_LIQUIDITY", False):
+        if volumes is None:
+            wanted = {(name, symbol) for symbol in common_symbols for name in (name1, name2)}
+            volumes = await check_liquidity_for_symbols({name1: exchange1, name2: exchange2}, wanted, cache)
         min_liq = CONFIG.get("MIN_LIQUIDITY", {})
-        levels_to_check = CONFIG.get("LIQUIDITY_LEVELS_TO_CHECK", 1)
         filtered_symbols = set()
         for symbol in common_symbols:
             try:
@@ -57,14 +185,16 @@ async def get_common_assets_for_pair(name1, exchange1, name2, exchange2, allowed
                 logger.error(f"Invalid symbol format {symbol}: {e}")
                 continue
             required_liq = min_liq.get(quote, 0)
-            vol1 = await get_total_volume(exchange1, symbol, side='asks', levels=levels_to_check)
-            vol2 = await get_total_volume(exchange2, symbol, side='bids', levels=levels_to_check)
+            vol1 = volumes.get(name1, {}).get(symbol, (0, 0))[0]
+            vol2 = volumes.get(name2, {}).get(symbol, (0, 0))[1]
             if vol1 >= required_liq and vol2 >= required_liq:
                 filtered_symbols.add(symbol)
             else:
                 logger.info(f"Skipping {symbol} due to low liquidity: exchange1 asks: {vol1}, exchange2 bids: {vol2}, required: {required_liq}")
         common_symbols = filtered_symbols
         logger.info(f"{len(common_symbols)} common symbols remain for {name1} and {name2} after liquidity filtering")
+    if own_cache:
+        save_discovery_cache(cache)
     common = {}
     for symbol in common_symbols:
         common[symbol] = {name1: symbol, name2: symbol}
@@ -121,39 +251,43 @@ async def modify_common_assets(common_assets, remove_file="assets_to_remove.json
                     logger.info(f"Configuration {config_key}: added asset {entry}.")
     return common_assets
 
-async def main():
+async def main(exchanges=None):
+    # exchanges – adaptery giełd (domyślnie współdzielone z exchanges.base.get_exchanges); nie są tu zamykane
     logger.info("Starting creation of common assets list (by full symbol and quote)")
-    from exchanges.binance import BinanceExchange
-    from exchanges.kucoin import KucoinExchange
-    from exchanges.bitget import BitgetExchange
-    from exchanges.bitstamp import BitstampExchange
-    binance = BinanceExchange()
-    kucoin = KucoinExchange()
-    bitget = BitgetExchange()
-    bitstamp = BitstampExchange()
-    exchanges = {
-        "binance": binance,
-        "kucoin": kucoin,
-        "bitget": bitget,
-        "bitstamp": bitstamp
-    }
+    if exchanges is None:
+        from exchanges.base import get_exchanges
+        exchanges = get_exchanges()
     common_assets = {}
     names = list(exchanges.keys())
-    for i in range(len(names)):
-        for j in range(i + 1, len(names)):
-            name1 = names[i]
-            name2 = names[j]
-            logger.info(f"Comparing assets for pair: {name1} - {name2}")
-            mapping = await get_common_assets_for_pair(name1, exchanges[name1], name2, exchanges[name2], allowed_quotes=CONFIG["ALLOWED_QUOTES"])
-            common_assets[f"{name1}-{name2}"] = mapping
+    allowed_quotes = CONFIG["ALLOWED_QUOTES"]
+    cache = load_discovery_cache()
+    markets = await load_all_markets(exchanges, allowed_quotes, cache)
+    pairs = [(names[i], names[j]) for i in range(len(names)) for j in range(i + 1, len(names))]
+    volumes = None
+    if CONFIG.get("FILTER_LOW_LIQUIDITY", False):
+        # Order booki wszystkich par sprawdzamy w jednym równoległym przebiegu, bez powtórzeń
+        wanted = set()
+        for name1, name2 in pairs:
+            for symbol in set(markets[name1]) & set(markets[name2]):
+                wanted.update(((name1, symbol), (name2, symbol)))
+        volumes = await check_liquidity_for_symbols(exchanges, wanted, cache)
+    save_discovery_cache(cache)
+    for name1, name2 in pairs:
+        logger.info(f"Comparing assets for pair: {name1} - {name2}")
+        mapping = await get_common_assets_for_pair(name1, exchanges[name1], name2, exchanges[name2], allowed_quotes,
+                                                   markets=markets, volumes=volumes, cache=cache)
+        common_assets[f"{name1}-{name2}"] = mapping
     common_assets = await modify_common_assets(common_assets)
     save_common_assets(common_assets)
     for pair, assets in common_assets.items():
         logger.info(f"Pair {pair} has {len(assets)} common assets.")
-    await binance.close()
-    await kucoin.close()
-    await bitget.close()
-    await bitstamp.close()
+
+async def run_standalone():
+    from exchanges.base import close_exchanges
+    try:
+        await main()
+    finally:
+        await close_exchanges()
 
 if __name__ == '__main__':
-    asyncio.run(main())
+    asyncio.run(run_standalone())
@@ -39,6 +39,21 @@ CONFIG = {
     
     # Liczba pierwszych poziomów order booka, z których sumujemy wolumen
     "LIQUIDITY_LEVELS_TO_CHECK": 10,
+
+    # Cache tworzenia listy wspólnych aktywów (opcja 1): rynki giełd i wyniki sprawdzenia płynności
+    "DISCOVERY_CACHE_FILE": "discovery_cache.json",
+
+    # Ważność (w sekundach) zapisanych rynków giełd – w tym czasie load_markets nie jest wywoływane
+    "MARKETS_CACHE_TTL": 3600,
+
+    # Ważność (w sekundach) zapisanego wyniku sprawdzenia płynności symbolu
+    "LIQUIDITY_CACHE_TTL": 6 * 3600,
+
+    # Symbole z wolumenem w granicach ±50% od MIN_LIQUIDITY są sprawdzane przy każdym odświeżeniu
+    "LIQUIDITY_RECHECK_MARGIN": 0.5,
+
+    # Maksymalna liczba order booków pobieranych równolegle przy sprawdzaniu płynności
+    "DISCOVERY_CONCURRENCY": 20,
     
     # Ustawienia arbitrażu:
    
@@ -49,5 +64,185 @@ CONFIG = {
     "ABSURD_THRESHOLD": 100,
     
     # liczba poziomów order booka do agregacji
-    "ORDERBOOK_LEVELS": 10
+    "ORDERBOOK_LEVELS": 10,
+
+    # Maksymalna kwota (w walucie quote) przy wyznaczaniu optymalnej wielkości transakcji (None = cała pobrana głębokość)
+    "MAX_INVESTMENT_AMOUNT": None,
+
+    # Binarny plik z ocenionymi okazjami (tablica strukturalna NumPy, odczyt: opportunity_store.load_opportunities);
+    # None wyłącza zapis
+    "OPPORTUNITY_STORE": "opportunities.bin",
+
+    # Liczba rekordów zapisywanych jednym blokiem oraz maksymalny czas (w sekundach) między zapisami
+    "OPPORTUNITY_BATCH_SIZE": 256,
+    "OPPORTUNITY_FLUSH_INTERVAL": 5,
+
+    # Co ile sekund (najwyżej) logować powtarzalny komunikat etapu tickerów dla tego samego symbolu
+    # (np. "Ticker profit below threshold"); 0 – logować każdy
+    "LOG_SAMPLE_INTERVAL": 60,
+
+    # Katalog z zaimportowanymi historycznymi logami okazji (python history.py import ...)
+    "HISTORY_STORE": "history_store",
+
+    # Maksymalna przerwa (w sekundach) między obserwacjami okazji, które liczą się jako jeden epizod
+    "HISTORY_MAX_GAP": 120,
+
+    # Drabinka wielkości transakcji (wielokrotności kwoty inwestycji) liczona dla każdej okazji
+    "SIZE_LADDER": [0.5, 1, 2, 5],
+
+    # Tryb arbitrażu: "cross" – jedna strategia szukająca najlepszej giełdy kupna i sprzedaży wśród wszystkich giełd,
+    # "pairs" – osobna strategia dla każdej pary giełd z common_assets.json
+    "ARBITRAGE_MODE": "cross",
+
+    # Czy w trybie "cross" porównywać to samo aktywo notowane w różnych quote (np. X/EUR na Bitstamp z X/USDT)
+    "CROSS_QUOTE_MATCHING": True,
+
+    # Ważność (w sekundach) kursów walut quote względem USDT w ConversionRates
+    "FX_TTL": 60,
+
+    # Giełda, z której ConversionRates pobiera kursy; gdy nie ma jej wśród skonfigurowanych – pierwsza dostępna
+    "FX_EXCHANGE": "binance",
+
+    # Wyszukiwanie cykli (trójkątnych i wielonogowych) na grafie log-cen wszystkich rynków z ALLOWED_QUOTES,
+    # uruchamiane obok głównego trybu arbitrażu
+    "TRIANGULAR_ARBITRAGE": False,
+
+    # Minimalny zysk cyklu (w %, po opłatach), od którego cykl trafia do logu okazji
+    "TRIANGULAR_MIN_PROFIT": 0.1,
+
+    # Koszt (w %) przeniesienia waluty między giełdami; None – tylko cykle w obrębie jednej giełdy
+    "TRIANGULAR_TRANSFER_COST": None,
+
+    # Maksymalna liczba aktywów sprawdzanych równolegle w jednej parze giełd
+    # (dodatkowo ograniczana budżetem zapytań giełd z RATE_LIMITS)
+    "SCAN_CONCURRENCY": 20,
+
+    # Adaptacyjna kolejność sprawdzania symboli: przy tickerach pobieranych per symbol (bez MarketDataHub)
+    # częściej sprawdzane są symbole, których spread jest blisko ARBITRAGE_THRESHOLD lub szybko się zmienia;
+    # w trybie snapshotu ta sama kolejność wybiera kandydatów ze screeningu do pobrania order booków
+    "ADAPTIVE_POLLING": True,
+
+    # Jaka część budżetu zapytań giełdy (RATE_LIMITS) przypada na jeden przebieg jednej pary giełd
+    "POLL_BUDGET_SHARE": 0.3,
+
+    # Maksymalny czas (w sekundach) między kolejnymi sprawdzeniami dowolnego symbolu
+    "POLL_MAX_INTERVAL": 60,
+
+    # Jaka część budżetu order booków giełdy (RATE_LIMITS) przypada na kandydatów ze screeningu jednej pary
+    # w jednym przebiegu snapshotu; nadmiarowi kandydaci są sprawdzani według priorytetu PollingScheduler
+    "CANDIDATE_BUDGET_SHARE": 0.5,
+
+    # Maksymalny czas (w sekundach), przez jaki kandydat ze screeningu może czekać na sprawdzenie order booków
+    "CANDIDATE_MAX_INTERVAL": 10,
+
+    # Waga najnowszego pomiaru w średniej i wariancji spreadu (0–1)
+    "POLL_EWMA_ALPHA": 0.2,
+
+    # Co ile sekund pobierać zbiorczy snapshot tickerów (fetch_tickers) z każdej giełdy
+    "SNAPSHOT_INTERVAL": 1,
+
+    # Szybka ścieżka danych rynkowych: best bid/ask z najtańszych zbiorczych endpointów giełd i order booki
+    # z jawnym limitem głębokości, dekodowane bez ujednoliconego parsowania ccxt (exchanges/raw.py)
+    "RAW_MARKET_DATA": True,
+
+    # Wspólny termin (w sekundach) na pobranie obu nóg okazji (tickery, order booki) – pobieranych równolegle
+    "LEG_FETCH_TIMEOUT": 5,
+
+    # Maksymalna różnica czasu (w sekundach) między notowaniami obu nóg; większa oznacza pozorny spread
+    # (znaczniki czasu giełd, a gdy ich brak – czas odebrania odpowiedzi). None wyłącza sprawdzenie
+    "MAX_LEG_SKEW": 2,
+
+    # Maksymalny wiek (w sekundach) notowania użytego do oceny okazji; None wyłącza sprawdzenie
+    "MAX_QUOTE_AGE": 5,
+
+    # Liczba procesów pobierających tickery (giełdy są rozdzielane między procesy), które publikują ceny
+    # we wspólnej pamięci (price_board.py) czytanej przez strategie; 0 – wszystko w jednym procesie
+    "SHARDED_WORKERS": 0,
+
+    # Jaka część limitu zapytań giełdy (RATE_LIMITS) przypada na proces tickerów (reszta – order booki strategii)
+    "SHARD_RATE_SHARE": 0.5,
+
+    # Po ilu sekundach bez aktualizacji cena z pamięci współdzielonej jest pomijana
+    "BOARD_MAX_AGE": 10,
+
+    # Co ile sekund sprawdzać zmiany common_assets.json, assets_to_add.json i assets_to_remove.json
+    # (aktywa działających strategii są wtedy przeładowywane bez restartu); 0 wyłącza obserwowanie plików
+    "ASSET_RELOAD_INTERVAL": 5,
+
+    # Czas życia (w sekundach) odpowiedzi w cache adapterów giełd – osobno dla każdego endpointu
+    "CACHE_TTL": {
+         "fetch_ticker": 0.3,
+         "fetch_tickers": 0.5,
+         "fetch_order_book": 0.3
+    },
+
+    # Maksymalna liczba odpowiedzi przechowywanych w cache jednego adaptera
+    "CACHE_MAX_SIZE": 2048,
+
+    # Tryb strumieniowy (WebSocket): tickery i order booki utrzymywane lokalnie zamiast odpytywania REST
+    "STREAMING": False,
+
+    # Po ilu sekundach bez aktualizacji dane ze strumienia uznajemy za nieaktualne (wtedy zapytanie idzie przez REST)
+    "STREAM_MAX_AGE": 5,
+
+    # Maksymalna liczba order booków utrzymywanych ze strumienia na jednej giełdzie
+    "STREAM_MAX_BOOKS": 200,
+
+    # Opóźnienie (w sekundach) przed ponowną subskrypcją po błędzie lub luce w sekwencji
+    "STREAM_RESYNC_DELAY": 1,
+
+    # Nadpisanie adresów WebSocket, np. {"binance": "ws://127.0.0.1:8765"} dla lokalnego serwera stream_replay.py
+    "STREAM_WS_URLS": {},
+
+    # Katalog, do którego zapisywane są surowe wiadomości strumienia (None = bez nagrywania),
+    # np. "recordings/stream" – katalog recordings/ jest pomijany przez git
+    "STREAM_RECORD_DIR": None,
+
+    # Pula połączeń HTTP adaptera giełdy (jedna długo żyjąca sesja na giełdę, współdzielona przez odkrywanie
+    # wspólnych aktywów i skanowanie): limit – łącznie otwartych połączeń, limit_per_host – połączeń do jednego hosta,
+    # keepalive_timeout – ile sekund trzymać bezczynne połączenie, ttl_dns_cache – czas życia wpisów cache DNS
+    "HTTP_POOL": {
+         "limit": 100,
+         "limit_per_host": 20,
+         "keepalive_timeout": 60,
+         "ttl_dns_cache": 300
+    },
+
+    # Port lokalnego endpointu z metrykami w formacie Prometheusa (http://METRICS_HOST:METRICS_PORT/metrics);
+    # None wyłącza endpoint
+    "METRICS_HOST": "127.0.0.1",
+    "METRICS_PORT": 9108,
+
+    # Katalog, do którego nagrywane są odpowiedzi REST giełd (tickery, order booki, rynki) do backtestów
+    # w backtest.py (None = bez nagrywania), np. "recordings/backtest"
+    "BACKTEST_RECORD_DIR": None,
+
+    # Limity zapytań per giełda (kubełek tokenów): rate – jednostki wagi na sekundę, capacity – maksymalny burst,
+    # weights – waga zapytania dla endpointu, depth_weights – waga order booka zależna od limitu głębokości
+    "RATE_LIMITS": {
+         "binance": {
+              "rate": 90,   # limit Binance: 6000 wagi / minutę
+              "capacity": 180,
+              "weights": {"fetch_ticker": 2, "fetch_tickers": 80, "fetch_order_book": 5, "load_markets": 40,
+                          "book_ticker": 2, "book_tickers": 4},
+              "depth_weights": [(100, 5), (500, 25), (1000, 50), (5000, 250)]
+         },
+         "kucoin": {
+              "rate": 60,   # limit KuCoin: 2000 wagi / 30 s dla zapytań publicznych
+              "capacity": 120,
+              "weights": {"fetch_ticker": 2, "fetch_tickers": 15, "fetch_order_book": 3, "load_markets": 10,
+                          "book_ticker": 2, "book_tickers": 15},
+              "depth_weights": [(20, 2), (100, 4)]
+         },
+         "bitget": {
+              "rate": 18,   # limit Bitget: 20 zapytań / s na endpoint rynkowy
+              "capacity": 20,
+              "weights": {"fetch_ticker": 1, "fetch_tickers": 1, "fetch_order_book": 1, "load_markets": 2}
+         },
+         "bitstamp": {
+              "rate": 8,
+              "capacity": 8,
+              "weights": {"fetch_ticker": 1, "fetch_tickers": 1, "fetch_order_book": 1, "load_markets": 2}
+         }
+    }
 }
@@ -0,0 +1,230 @@
+import asyncio
+import logging
+import time
+from config import CONFIG
+from utils import calculate_effective_buy, calculate_effective_sell, stale_quote, ticker_quotes
+from arbitrage import PairArbitrageStrategy
+from metrics import SCAN_DURATION, SCAN_QUEUE_DEPTH
+
+logger = logging.getLogger("arbitrage")
+
+def build_universe(common_assets_data, cross_quote=False, base_quote="USDT"):
+    """
+    Łączy listy aktywów wszystkich par z common_assets.json w jedno uniwersum:
+    {symbol kanoniczny: {giełda: symbol na tej giełdzie}}.
+    Przy cross_quote=True symbole o różnych quote (np. X/EUR i X/USDT) trafiają pod wspólny klucz
+    "X/USDT" – ceny są wtedy porównywane po przeliczeniu kursem z ConversionRates. Jeśli giełda
+    notuje aktywo w kilku quote, wybieramy base_quote.
+    """
+    universe = {}
+    for pair_key, assets in common_assets_data.items():
+        names = pair_key.split("-")
+        if len(names) != 2 or not assets:
+            continue
+        for asset, mapping in assets.items():
+            for name in names:
+                symbol = mapping.get(name) if isinstance(mapping, dict) else None
+                symbol = symbol or asset
+                if "/" not in symbol:
+                    continue
+                key = asset
+                if cross_quote and "/" in asset:
+                    key = f"{asset.split('/')[0]}/{base_quote}"
+                listing = universe.setdefault(key, {})
+                if name not in listing or symbol.split("/")[1] == base_quote:
+                    listing[name] = symbol
+    # Aktywo ma sens tylko, jeśli jest notowane na co najmniej dwóch giełdach
+    return {asset: listing for asset, listing in universe.items() if len(listing) >= 2}
+
+class BestQuoteBook:
+    """
+    Dla każdego symbolu kanonicznego trzyma efektywne (po opłatach) ceny kupna i sprzedaży na wszystkich
+    giełdach oraz najtańszą giełdę kupna i najdroższą giełdę sprzedaży. Aktualizacja jednej ceny kosztuje
+    O(liczby giełd), niezależnie od liczby par giełd.
+    """
+    def __init__(self, fee_rates, threshold=None, absurd_threshold=None):
+        self.venues = list(fee_rates)  # np. ["binance", "kucoin", ...]
+        self.venue_index = {name: i for i, name in enumerate(self.venues)}
+        self.buy_multipliers = [calculate_effective_buy(1.0, fee_rates[name]) for name in self.venues]
+        self.sell_multipliers = [calculate_effective_sell(1.0, fee_rates[name]) for name in self.venues]
+        self.threshold = threshold if threshold is not None else CONFIG.get("ARBITRAGE_THRESHOLD", 2)
+        self.absurd_threshold = absurd_threshold if absurd_threshold is not None else CONFIG.get("ABSURD_THRESHOLD", 100)
+        self.asks = {}  # {symbol: [ask per giełda lub None]}
+        self.bids = {}  # {symbol: [bid per giełda lub None]}
+        self.best = {}  # {symbol: (giełda kupna, efektywny ask, giełda sprzedaży, efektywny bid)}
+        self.opportunities = {}  # {symbol: zysk %} – symbole z zyskiem w [threshold, absurd_threshold)
+
+    def update(self, venue, symbol, bid, ask):
+        i = self.venue_index[venue]
+        asks = self.asks.get(symbol)
+        if asks is None:
+            asks = self.asks[symbol] = [None] * len(self.venues)
+            self.bids[symbol] = [None] * len(self.venues)
+        bids = self.bids[symbol]
+        if asks[i] == ask and bids[i] == bid:
+            return
+        asks[i] = ask
+        bids[i] = bid
+        self._recompute(symbol, asks, bids)
+
+    def remove(self, venue, symbol):
+        if symbol not in self.asks:
+            return
+        i = self.venue_index[venue]
+        self.asks[symbol][i] = None
+        self.bids[symbol][i] = None
+        self._recompute(symbol, self.asks[symbol], self.bids[symbol])
+
+    def discard(self, symbol):
+        # Symbol usunięty z uniwersum
+        for prices in (self.asks, self.bids, self.best, self.opportunities):
+            prices.pop(symbol, None)
+
+    def _recompute(self, symbol, asks, bids):
+        buy_venue = sell_venue = None
+        best_ask = best_bid = None
+        for j in range(len(self.venues)):
+            if asks[j]:
+                effective_ask = asks[j] * self.buy_multipliers[j]
+                if best_ask is None or effective_ask < best_ask:
+                    buy_venue, best_ask = j, effective_ask
+            if bids[j]:
+                effective_bid = bids[j] * self.sell_multipliers[j]
+                if best_bid is None or effective_bid > best_bid:
+                    sell_venue, best_bid = j, effective_bid
+        self.opportunities.pop(symbol, None)
+        if buy_venue is None or sell_venue is None:
+            self.best.pop(symbol, None)
+            return
+        self.best[symbol] = (self.venues[buy_venue], best_ask, self.venues[sell_venue], best_bid)
+        if buy_venue != sell_venue:
+            profit = (best_bid - best_ask) / best_ask * 100
+            if self.threshold <= profit < self.absurd_threshold:
+                self.opportunities[symbol] = profit
+
+    def raw_prices(self, symbol, buy_venue, sell_venue):
+        # Ceny bez opłat (przy porównaniu różnych quote już przeliczone na USDT)
+        return self.asks[symbol][self.venue_index[buy_venue]], self.bids[symbol][self.venue_index[sell_venue]]
+
+class CrossVenueArbitrageStrategy:
+    """
+    Jedna strategia dla wszystkich giełd naraz: po każdym snapshocie tickerów aktualizuje BestQuoteBook
+    i dla symboli z wystarczającym zyskiem sprawdza order booki najlepszej giełdy kupna i sprzedaży.
+    """
+    def __init__(self, exchanges, universe, market_data, pair_name="cross-venue", fx=None, recorder=None):
+        self.exchanges = exchanges  # {"binance": BinanceExchange(), ...}
+        self.assets = universe  # {symbol kanoniczny: {giełda: symbol}}
+        self.market_data = market_data
+        self.pair_name = pair_name
+        self.fx = fx  # ConversionRates – ceny w innym quote niż USDT przeliczamy przed porównaniem
+        self.recorder = recorder  # OpportunityRecorder przekazywany strategiom par z etapu order booków
+        self.book = BestQuoteBook({name: exchange.fee_rate for name, exchange in exchanges.items()})
+        self.concurrency = CONFIG.get("SCAN_CONCURRENCY", 20)
+        self.last_cycle_time = None
+        self._pairs = {}  # (giełda kupna, giełda sprzedaży) -> PairArbitrageStrategy używana do etapu order booków
+
+    def update_universe(self, universe):
+        """
+        Przeładowanie uniwersum w trakcie pracy (np. po zmianie common_assets.json). Giełdy spoza strategii są pomijane;
+        usunięte symbole znikają z BestQuoteBook, a plany symboli ze zmienionym mapowaniem są kompilowane od nowa.
+        Ceny pozostałych symboli zostają. Zwraca (dodane, usunięte) symbole.
+        """
+        universe = {symbol: {venue: venue_symbol for venue, venue_symbol in listing.items() if venue in self.exchanges}
+                    for symbol, listing in universe.items()}
+        universe = {symbol: listing for symbol, listing in universe.items() if len(listing) >= 2}
+        removed = [symbol for symbol in self.assets if symbol not in universe]
+        added = [symbol for symbol in universe if symbol not in self.assets]
+        for symbol in removed:
+            self.book.discard(symbol)
+        for symbol in removed + [symbol for symbol in universe if symbol in self.assets and universe[symbol] != self.assets[symbol]]:
+            for venue in set(self.assets[symbol]).difference(universe.get(symbol, ())):
+                self.book.remove(venue, symbol)
+            for pair in self._pairs.values():
+                pair.remove_asset(symbol)
+        self.assets = universe
+        return added, removed
+
+    def apply_snapshot(self):
+        now = time.time()
+        for symbol, listing in self.assets.items():
+            for venue, venue_symbol in listing.items():
+                ticker = self.market_data.get_ticker(venue, venue_symbol)
+                if ticker is None:
+                    continue
+                if stale_quote((ticker.get("timestamp"), ticker.get("received")), now):
+                    # Giełda, której snapshot się nie odświeża, nie może wyznaczać najlepszej ceny
+                    self.book.remove(venue, symbol)
+                    continue
+                bid, ask = ticker_quotes(ticker)
+                quote = venue_symbol.split("/")[1]
+                if quote != "USDT":
+                    rate = self.fx.rate(quote) if self.fx is not None else None
+                    if rate is None or bid is None or ask is None:
+                        self.book.remove(venue, symbol)
+                        continue
+                    bid, ask = bid * rate, ask * rate
+                self.book.update(venue, symbol, bid, ask)
+
+    def _pair(self, buy_venue, sell_venue):
+        key = (buy_venue, sell_venue)
+        if key not in self._pairs:
+            self._pairs[key] = PairArbitrageStrategy(self.exchanges[buy_venue], self.exchanges[sell_venue], {},
+                                                     pair_name=f"{buy_venue}-{sell_venue}", market_data=self.market_data,
+                                                     fx=self.fx, recorder=self.recorder)
+        return self._pairs[key]
+
+    async def check_symbol(self, symbol, profit):
+        best = self.book.best.get(symbol)
+        if best is None or symbol not in self.assets:
+            # Symbol usunięty przez przeładowanie uniwersum w trakcie przebiegu
+            return
+        buy_venue, _, sell_venue, _ = best
+        buy_price, sell_price = self.book.raw_prices(symbol, buy_venue, sell_venue)
+        pair = self._pair(buy_venue, sell_venue)
+        plan = pair.plan.get(symbol)
+        if plan is None:
+            # Plan aktywa dla danej pary giełd kompilujemy przy pierwszej okazji i zachowujemy
+            listing = self.assets[symbol]
+            plan = pair.add_asset(symbol, {buy_venue: listing[buy_venue], sell_venue: listing[sell_venue]})
+            if plan is None:
+                return
+        if not pair.fresh_snapshot(plan):
+            # Nogi najlepszej giełdy kupna i sprzedaży z różnych chwil dają pozorny spread
+            return
+        await pair.check_liquidity(plan, 1, profit, buy_price, sell_price)
+
+    async def scan(self):
+        semaphore = asyncio.Semaphore(self.concurrency)
+        candidates = list(self.book.opportunities.items())
+
+        queue_depth = SCAN_QUEUE_DEPTH.labels(self.pair_name)
+        queue_depth.set(len(candidates))
+
+        async def check(symbol, profit):
+            try:
+                async with semaphore:
+                    await self.check_symbol(symbol, profit)
+            finally:
+                queue_depth.dec()
+
+        start = time.monotonic()
+        results = await asyncio.gather(*(check(symbol, profit) for symbol, profit in candidates), return_exceptions=True)
+        for (symbol, _), result in zip(candidates, results):
+            if isinstance(result, Exception):
+                logger.error("%s - Error checking %s: %s", self.pair_name, symbol, result)
+        self.last_cycle_time = time.monotonic() - start
+        SCAN_DURATION.labels(self.pair_name).observe(self.last_cycle_time)
+        logger.info(f"{self.pair_name} - Scan cycle of {len(candidates)} candidates out of {len(self.assets)} assets "
+                    f"finished in {self.last_cycle_time:.2f}s.")
+
+    async def run(self):
+        logger.info(f"{self.pair_name} - Starting cross-venue strategy for {len(self.assets)} assets on {len(self.exchanges)} exchanges.")
+        cycle = 0
+        try:
+            while True:
+                cycle = await self.market_data.wait_for_update(cycle)
+                self.apply_snapshot()
+                await self.scan()
+        except asyncio.CancelledError:
+            logger.info(f"{self.pair_name} - Cross-venue strategy cancelled.")
+            return
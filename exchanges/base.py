@@ -0,0 +1,271 @@
+import asyncio
+import importlib
+import logging
+import socket
+import ssl
+import time
+import aiohttp
+import certifi
+import ccxt.async_support as ccxt
+from config import CONFIG
+from exchanges.request_cache import RequestCache
+from exchanges.rate_limiter import get_rate_limiter
+from exchanges.streaming import MarketStream
+from exchanges.raw import RAW_APIS, SymbolMap, loads, order_book, rebind
+from log_queue import SampledLog
+
+logger = logging.getLogger("arbitrage")
+# Błąd pobrania z tej samej giełdy i endpointu powtarza się zwykle w każdym cyklu – logujemy go próbkowo
+sampled_logger = SampledLog(logger)
+
+# Parametry giełd obsługiwanych przez ExchangeAdapter. Klucze API: CONFIG["<NAZWA>_API_KEY"] i CONFIG["<NAZWA>_SECRET"].
+# concurrency – maksymalna liczba równoczesnych zapytań REST adaptera (None = bez limitu poza RATE_LIMITS)
+EXCHANGES = {
+    "binance": {"display_name": "Binance", "fee_rate": 0.1, "options": {'default type': 'spot'}},
+    "kucoin": {"display_name": "Kucoin", "fee_rate": 0.1, "concurrency": 5},
+    "bitget": {"display_name": "Bitget", "fee_rate": 0.1},
+    "bitstamp": {"display_name": "Bitstamp", "fee_rate": 0.25},
+}
+
+def create_session():
+    """
+    Długo żyjąca sesja HTTP jednej giełdy: keep-alive, limit połączeń i cache DNS według CONFIG["HTTP_POOL"].
+    Musi być tworzona w działającej pętli zdarzeń.
+    """
+    settings = CONFIG.get("HTTP_POOL", {})
+    connector = aiohttp.TCPConnector(
+        ssl=ssl.create_default_context(cafile=certifi.where()),
+        limit=settings.get("limit", 100),
+        limit_per_host=settings.get("limit_per_host", 20),
+        keepalive_timeout=settings.get("keepalive_timeout", 60),
+        ttl_dns_cache=settings.get("ttl_dns_cache", 300),
+        enable_cleanup_closed=True,
+        family=socket.AF_UNSPEC,
+        happy_eyeballs_delay=0,
+    )
+    return aiohttp.ClientSession(connector=connector, trust_env=False)
+
+ADAPTER_CLASSES = {}  # {nazwa: podklasa z exchanges/<nazwa>.py} – nazwa klasy trafia do logów okazji
+
+class ExchangeAdapter:
+    """
+    Wspólny adapter giełdy: klient ccxt (bez wbudowanego limitera – limity obsługuje TokenBucketLimiter),
+    cache odpowiedzi, opcjonalny strumień WebSocket i własna, dostrojona sesja HTTP przekazana do ccxt.
+    Sesja jest tworzona przy pierwszym zapytaniu i zamykana w close() (ccxt nie zamyka sesji, której nie utworzył).
+    """
+    name = None
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if cls.name:
+            ADAPTER_CLASSES[cls.name] = cls
+
+    def __init__(self, name=None):
+        self.name = name or self.name
+        spec = EXCHANGES[self.name]
+        self.display_name = spec.get("display_name", self.name)
+        self.session = None
+        self.exchange = getattr(ccxt, spec.get("ccxt_id", self.name))({
+            'apiKey': CONFIG[f"{self.name.upper()}_API_KEY"],
+            'secret': CONFIG[f"{self.name.upper()}_SECRET"],
+            'enableRateLimit': False,  # limity obsługuje wspólny TokenBucketLimiter
+            'session': None,  # własna sesja adaptera (ustawiana w _open)
+            'options': dict(spec.get("options", {})),
+        })
+        self.fee_rate = spec.get("fee_rate", 0.1)
+        self.cache = RequestCache()
+        self.rate_limiter = get_rate_limiter(self.name)
+        self.stream = None  # MarketStream – opcjonalny tryb strumieniowy (WebSocket)
+        concurrency = spec.get("concurrency")
+        self.semaphore = asyncio.Semaphore(concurrency) if concurrency else None
+        # Publiczne API giełdy dla szybkiej ścieżki (best bid/ask, order book z limitem) z pominięciem parsowania ccxt
+        # (None dla giełd bez opisu w RAW_APIS – wtedy zawsze ccxt)
+        api = RAW_APIS.get(self.name)
+        self.api = api() if api is not None else None
+        self.raw = CONFIG.get("RAW_MARKET_DATA", True) and self.api is not None
+        self.symbol_map = None
+        self.last_response_headers = None  # nagłówki ostatniej odpowiedzi szybkiej ścieżki (Retry-After dla limitera)
+
+    def _open(self):
+        if self.session is None or self.session.closed:
+            self.session = create_session()
+            self.exchange.session = self.session
+
+    async def _request(self, endpoint, *args, client=None, **kwargs):
+        # client=self – metody szybkiej ścieżki adaptera (book_tickers, book_ticker, depth) zamiast klienta ccxt
+        self._open()
+        client = client or self.exchange
+        if self.semaphore is None:
+            return await self.rate_limiter.run(client, endpoint, *args, **kwargs)
+        async with self.semaphore:
+            return await self.rate_limiter.run(client, endpoint, *args, **kwargs)
+
+    async def _get(self, path, params=None):
+        timeout = aiohttp.ClientTimeout(total=self.exchange.timeout / 1000)
+        async with self.session.get(self.api.base_url + path, params=params, timeout=timeout) as response:
+            self.last_response_headers = response.headers
+            if response.status == 429:
+                raise ccxt.RateLimitExceeded(f"{self.name} GET {path} 429")
+            if response.status == 418:
+                raise ccxt.DDoSProtection(f"{self.name} GET {path} 418")
+            if response.status >= 400:
+                raise ccxt.ExchangeError(f"{self.name} GET {path} {response.status}")
+            return loads(await response.read())
+
+    async def _symbols(self):
+        # Id rynków giełdy potrzebne szybkiej ścieżce pochodzą z rynków załadowanych przez ccxt
+        # (albo z cache odkrywania aktywów – seed_symbol_map)
+        if self.symbol_map is None:
+            markets = self.exchange.markets or await self.load_markets()
+            self.symbol_map = SymbolMap(markets)
+        return self.symbol_map
+
+    def seed_symbol_map(self, ids):
+        # {symbol: id rynku} z cache odkrywania – pierwsze zapytanie szybkiej ścieżki nie czeka na load_markets.
+        # Pełne rynki załadowane później (load_markets) zastępują tę mapę
+        if self.symbol_map is None:
+            self.symbol_map = SymbolMap({symbol: {"id": market_id} for symbol, market_id in ids.items()})
+
+    async def book_tickers(self, symbol_map=None, wanted=None):
+        # Z symbol_map wynik jest od razu przetłumaczony na symbole ccxt (w obrębie zapytania liczonego przez limiter)
+        path, params = self.api.tickers_request()
+        tickers = self.api.parse_tickers(await self._get(path, params))
+        return tickers if symbol_map is None else rebind(tickers, symbol_map, wanted)
+
+    async def book_ticker(self, market_id):
+        path, params = self.api.ticker_request(market_id)
+        return self.api.parse_ticker(await self._get(path, params), market_id)
+
+    async def depth(self, market_id, limit, levels=None):
+        path, params = self.api.depth_request(market_id, limit)
+        return self.api.parse_depth(await self._get(path, params), levels)
+
+    async def load_markets(self):
+        markets = await self._request("load_markets")
+        self.symbol_map = SymbolMap(markets)
+        return markets
+
+    def start_streaming(self, symbols):
+        if self.stream is None:
+            self.stream = MarketStream.for_exchange(self.name, self.exchange)
+        self.stream.start(symbols)
+
+    async def fetch_ticker(self, symbol):
+        if self.stream is not None:
+            ticker = self.stream.get_ticker(symbol)
+            if ticker is not None:
+                return ticker
+        return await self.cache.get_or_fetch("fetch_ticker", symbol, lambda: self._fetch_ticker(symbol))
+
+    async def fetch_tickers(self, symbols=None):
+        if self.stream is not None:
+            tickers = self.stream.get_tickers(symbols)
+            if tickers:
+                return tickers
+        key = tuple(sorted(symbols)) if symbols else None
+        return await self.cache.get_or_fetch("fetch_tickers", key, lambda: self._fetch_tickers(symbols))
+
+    async def fetch_order_book(self, symbol, limit=None):
+        if self.stream is not None:
+            order_book = self.stream.get_order_book(symbol, limit)
+            if order_book is not None:
+                return order_book
+            # Pierwsze zapytanie idzie przez REST, kolejne czytają lokalny order book ze strumienia
+            self.stream.subscribe_order_book(symbol, limit)
+        return await self.cache.get_or_fetch("fetch_order_book", (symbol, limit), lambda: self._fetch_order_book(symbol, limit))
+
+    async def _fetch_ticker(self, symbol):
+        try:
+            if self.raw:
+                market_id = (await self._symbols()).ids.get(symbol)
+                if market_id is not None:
+                    ticker = await self._request("book_ticker", market_id, client=self)
+                    if ticker is not None:
+                        ticker.symbol = symbol
+                        ticker.received = time.time()
+                    return ticker
+            ticker = await self._request("fetch_ticker", symbol)
+            ticker["received"] = time.time()
+            return ticker
+        except asyncio.CancelledError:
+            # Propagujemy anulowanie, aby główny kod mógł go obsłużyć
+            raise
+        except Exception as e:
+            self._log_failure("fetch_ticker", e)
+            return None
+
+    async def _fetch_tickers(self, symbols=None):
+        try:
+            if self.raw:
+                symbol_map = await self._symbols()
+                tickers = await self._request("book_tickers", symbol_map, set(symbols) if symbols else None, client=self)
+                received = time.time()
+                for ticker in tickers.values():
+                    ticker.received = received
+                return tickers
+            tickers = await self._request("fetch_tickers", symbols)
+            received = time.time()
+            for ticker in tickers.values():
+                ticker["received"] = received
+            return tickers
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self._log_failure("fetch_tickers", e)
+            return None
+
+    async def _fetch_order_book(self, symbol, limit=None):
+        # limit – liczba potrzebnych poziomów; giełda dostaje najbliższy dozwolony limit nie mniejszy od niego
+        depth_limit = self.api.depth_limit(limit) if self.api is not None else None
+        weight = self.rate_limiter.order_book_weight(depth_limit)
+        try:
+            book = None
+            if self.raw:
+                market_id = (await self._symbols()).ids.get(symbol)
+                if market_id is not None:
+                    bids, asks, timestamp = await self._request("depth", market_id, depth_limit, limit,
+                                                                client=self, weight=weight)
+                    book = order_book(symbol, bids, asks, timestamp)
+            if book is None:
+                book = await self._request("fetch_order_book", symbol, depth_limit, weight=weight)
+            book["received"] = time.time()
+            return book
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self._log_failure("fetch_order_book", e)
+            return None
+
+    def _log_failure(self, endpoint, error):
+        # Nieudane zapytanie zlicza już TokenBucketLimiter.run (EXCHANGE_REQUESTS z outcome "error" lub "rate_limited")
+        sampled_logger.warning((self.name, endpoint), "%s - Error in %s: %s", self.display_name, endpoint, error)
+
+    async def close(self):
+        if self.stream is not None:
+            await self.stream.close()
+        await self.exchange.close()
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+# Współdzielone adaptery: odkrywanie wspólnych aktywów i skanowanie używają tych samych instancji (i połączeń)
+_adapters = {}
+
+def get_exchange(name):
+    adapter = _adapters.get(name)
+    if adapter is None:
+        if name not in ADAPTER_CLASSES:
+            try:
+                importlib.import_module(f"exchanges.{name}")
+            except ModuleNotFoundError:
+                pass
+        adapter = _adapters[name] = ADAPTER_CLASSES.get(name, ExchangeAdapter)(name)
+    return adapter
+
+def get_exchanges(names=None):
+    return {name: get_exchange(name) for name in (names or EXCHANGES)}
+
+async def close_exchanges():
+    adapters = list(_adapters.values())
+    _adapters.clear()
+    await asyncio.gather(*(adapter.close() for adapter in adapters), return_exceptions=True)
@@ -1,41 +1,4 @@
-import ccxt.async_support as ccxt
-import asyncio
-from config import CONFIG
+from exchanges.base import ExchangeAdapter
 
-class KucoinExchange:
-    def __init__(self):
-        self.exchange = ccxt.kucoin({
-            'apiKey': CONFIG["KUCOIN_API_KEY"],
-            'secret': CONFIG["KUCOIN_SECRET"],
-            'enableRateLimit': True,
-        })
-        self.fee_rate = 0.1
-        self.semaphore = asyncio.Semaphore(5)
-
-    async def load_markets(self):
-        return await self.exchange.load_markets()
-
-    async def fetch_ticker(self, symbol):
-        try:
-            async with self.semaphore:
-                ticker = await self.exchange.fetch_ticker(symbol)
-                return ticker
-        except asyncio.CancelledError:
-            raise
-        except Exception as e:
-            print(f"Error fetching ticker from Kucoin: {e}")
-            return None
-
-    async def fetch_order_book(self, symbol):
-        try:
-            async with self.semaphore:
-                order_book = await self.exchange.fetch_order_book(symbol)
-                return order_book
-        except asyncio.CancelledError:
-            raise
-        except Exception as e:
-            print(f"Error fetching order book from Kucoin: {e}")
-            return None
-
-    async def close(self):
-        await self.exchange.close()
+class KucoinExchange(ExchangeAdapter):
+    name = "kucoin"
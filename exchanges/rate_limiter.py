@@ -0,0 +1,152 @@
+import asyncio
+import logging
+import time
+import ccxt.async_support as ccxt
+from config import CONFIG
+from metrics import EXCHANGE_REQUESTS, EXCHANGE_LATENCY, RATE_LIMITER_WAIT, RATE_LIMITER_WAITING
+
+logger = logging.getLogger("arbitrage")
+
+class TokenBucketLimiter:
+    """
+    Kubełek tokenów dla jednej giełdy: każde zapytanie zużywa tyle tokenów, ile wynosi jego waga
+    (np. order book Binance o większej głębokości kosztuje więcej niż ticker). Po odpowiedzi 429/418
+    tempo jest obniżane i wstrzymywane na czas cooldownu, a po kolejnych udanych zapytaniach wraca do bazowego.
+    """
+    def __init__(self, name, rate, capacity, weights=None, depth_weights=None,
+                 backoff_factor=0.5, recovery_step=0.02, cooldown=5, ban_cooldown=60):
+        self.name = name
+        self.base_rate = rate  # tokeny (jednostki wagi) na sekundę
+        self.rate = rate
+        self.min_rate = rate / 20
+        self.capacity = capacity
+        self.weights = weights or {}  # np. {"fetch_ticker": 2, "fetch_tickers": 80}
+        self.depth_weights = depth_weights or []  # [(maksymalny limit, waga), ...] dla fetch_order_book
+        self.backoff_factor = backoff_factor
+        self.recovery_step = recovery_step
+        self.cooldown = cooldown
+        self.ban_cooldown = ban_cooldown
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0
+        self._lock = asyncio.Lock()
+        self._wait_metric = RATE_LIMITER_WAIT.labels(name)
+        self._waiting_metric = RATE_LIMITER_WAITING.labels(name)
+
+    def weight(self, endpoint):
+        return self.weights.get(endpoint, 1)
+
+    def order_book_weight(self, limit=None):
+        if limit is not None:
+            for max_limit, weight in self.depth_weights:
+                if limit <= max_limit:
+                    return weight
+        return self.weight("fetch_order_book")
+
+    def scale(self, factor):
+        # Zmienia budżet limitera, np. gdy limit giełdy dzielony jest między kilka procesów
+        self.base_rate *= factor
+        self.rate *= factor
+        self.min_rate *= factor
+        self.capacity *= factor
+        self.tokens *= factor
+
+    def limits(self):
+        # Budżet limitera do późniejszego przywrócenia przez restore() (zamiast odwracania scale() dzieleniem)
+        return self.base_rate, self.min_rate, self.capacity
+
+    def restore(self, limits):
+        self.base_rate, self.min_rate, self.capacity = limits
+        self.rate = self.base_rate
+        self.tokens = min(self.tokens, self.capacity)
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, weight=1):
+        # Lock jest sprawiedliwy (FIFO), więc równoległe wywołania nie startują jednocześnie,
+        # tylko kolejno czekają na uzupełnienie kubełka
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self.blocked_until:
+                    await asyncio.sleep(self.blocked_until - now)
+                    continue
+                self._refill(now)
+                # Zapytania cięższe niż pojemność kubełka przepuszczamy przy pełnym kubełku (tokeny schodzą poniżej zera)
+                needed = min(weight, self.capacity)
+                if self.tokens >= needed:
+                    self.tokens -= weight
+                    return
+                await asyncio.sleep((needed - self.tokens) / self.rate)
+
+    def on_success(self):
+        if self.rate < self.base_rate:
+            self.rate = min(self.base_rate, self.rate + self.base_rate * self.recovery_step)
+
+    def on_rate_limited(self, banned=False, retry_after=None):
+        self._refill(time.monotonic())
+        self.rate = max(self.min_rate, self.rate * self.backoff_factor)
+        self.tokens = min(self.tokens, 0)
+        pause = retry_after if retry_after else (self.ban_cooldown if banned else self.cooldown)
+        self.blocked_until = max(self.blocked_until, time.monotonic() + pause)
+        logger.warning(f"{self.name} - Rate limited ({'418' if banned else '429'}), "
+                       f"pausing {pause:.1f}s and lowering rate to {self.rate:.2f}/s")
+
+    async def run(self, client, endpoint, *args, weight=None, **kwargs):
+        """
+        Wywołuje metodę klienta ccxt (np. "fetch_ticker") po pobraniu tokenów z kubełka.
+        Wyjątki są przekazywane dalej – adapter decyduje, jak je obsłużyć.
+        """
+        queued_at = time.monotonic()
+        self._waiting_metric.inc()
+        try:
+            await self.acquire(self.weight(endpoint) if weight is None else weight)
+        finally:
+            self._waiting_metric.dec()
+        started = time.monotonic()
+        self._wait_metric.observe(started - queued_at)
+        outcome = "error"
+        try:
+            result = await getattr(client, endpoint)(*args, **kwargs)
+            outcome = "ok"
+        except ccxt.RateLimitExceeded:
+            outcome = "rate_limited"
+            self.on_rate_limited(retry_after=_retry_after(client))
+            raise
+        except ccxt.DDoSProtection:
+            outcome = "banned"
+            self.on_rate_limited(banned=True, retry_after=_retry_after(client))
+            raise
+        except asyncio.CancelledError:
+            outcome = "cancelled"
+            raise
+        finally:
+            EXCHANGE_REQUESTS.labels(self.name, endpoint, outcome).inc()
+            EXCHANGE_LATENCY.labels(self.name, endpoint, outcome).observe(time.monotonic() - started)
+        self.on_success()
+        return result
+
+def _retry_after(client):
+    headers = getattr(client, "last_response_headers", None) or {}
+    value = headers.get("Retry-After") or headers.get("retry-after")
+    try:
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+rate_limiters = {}
+
+def get_rate_limiter(name):
+    # Jeden limiter na giełdę, wspólny dla wszystkich instancji adaptera (limity są liczone per IP)
+    if name not in rate_limiters:
+        settings = CONFIG.get("RATE_LIMITS", {}).get(name, {})
+        rate_limiters[name] = TokenBucketLimiter(
+            name,
+            rate=settings.get("rate", 10),
+            capacity=settings.get("capacity", 10),
+            weights=settings.get("weights"),
+            depth_weights=settings.get("depth_weights"),
+        )
+    return rate_limiters[name]
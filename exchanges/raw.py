@@ -0,0 +1,220 @@
+import bisect
+import sys
+from abc import ABC, abstractmethod
+
+try:
+    import orjson
+    loads = orjson.loads
+except ImportError:  # orjson jest opcjonalny – bez niego zwykły json
+    import json
+    loads = json.loads
+
+# Szybka ścieżka danych rynkowych z pominięciem ujednoliconego parsowania ccxt: najtańsze publiczne endpointy
+# giełd (zbiorczy best bid/ask, order book z jawnym limitem głębokości), odpowiedzi dekodowane do zwartych obiektów.
+# Identyfikatory rynków (np. "BTCUSDT") tłumaczy adapter na symbole ccxt z załadowanych rynków.
+
+class BookTicker:
+    """Najlepsza oferta kupna/sprzedaży jednego symbolu; get() i [] jak w słowniku tickera ccxt."""
+    __slots__ = ("symbol", "bid", "ask", "bidVolume", "askVolume", "last", "timestamp", "received")
+
+    def __init__(self, symbol, bid, ask, bid_volume=None, ask_volume=None, last=None, timestamp=None):
+        self.symbol = symbol
+        self.bid = bid
+        self.ask = ask
+        self.bidVolume = bid_volume
+        self.askVolume = ask_volume
+        # None, gdy endpoint nie podaje ostatniej transakcji (np. bookTicker Binance) – ceny między giełdami
+        # porównujemy po bid/ask (utils.ticker_quotes), więc nie podstawiamy tu środka spreadu
+        self.last = last
+        self.timestamp = timestamp
+        self.received = None  # czas odebrania odpowiedzi (s) – ustawia adapter
+
+    def get(self, key, default=None):
+        return getattr(self, key, default)
+
+    def __getitem__(self, key):
+        return getattr(self, key)
+
+    def __repr__(self):
+        return f"BookTicker({self.symbol}, bid={self.bid}, ask={self.ask}, last={self.last})"
+
+def _float(value):
+    return float(value) if value not in (None, "") else None
+
+def _levels(rows, limit=None):
+    if limit is not None:
+        rows = rows[:limit]
+    return [(float(row[0]), float(row[1])) for row in rows]
+
+class RawApi(ABC):
+    """
+    Opis publicznego REST API jednej giełdy: ścieżki i parametry zapytań oraz parsowanie odpowiedzi.
+    Zapytania: (ścieżka, parametry); parse_* zwracają {id rynku: BookTicker} lub (bids, asks, timestamp).
+    Podklasy bez którejś z metod abstrakcyjnych nie da się utworzyć – błąd wychodzi przy starcie adaptera.
+    """
+    base_url = None
+    depth_limits = None  # dozwolone wartości limitu order booka (rosnąco); None – giełda nie przyjmuje limitu
+
+    def depth_limit(self, levels):
+        if levels is None or self.depth_limits is None:
+            return None
+        i = bisect.bisect_left(self.depth_limits, levels)
+        return self.depth_limits[min(i, len(self.depth_limits) - 1)]
+
+    @abstractmethod
+    def tickers_request(self):
+        ...
+
+    @abstractmethod
+    def ticker_request(self, market_id):
+        ...
+
+    @abstractmethod
+    def depth_request(self, market_id, limit):
+        ...
+
+    @abstractmethod
+    def parse_tickers(self, data):
+        ...
+
+    def parse_ticker(self, data, market_id):
+        return self.parse_tickers(data).get(market_id)
+
+    def parse_depth(self, data, limit=None):
+        return _levels(data["bids"], limit), _levels(data["asks"], limit), data.get("timestamp")
+
+class BinanceRaw(RawApi):
+    base_url = "https://api.binance.com"
+    depth_limits = (5, 10, 20, 50, 100, 500, 1000, 5000)
+
+    def tickers_request(self):
+        return "/api/v3/ticker/bookTicker", None
+
+    def ticker_request(self, market_id):
+        return "/api/v3/ticker/bookTicker", {"symbol": market_id}
+
+    def depth_request(self, market_id, limit):
+        return "/api/v3/depth", {"symbol": market_id, "limit": limit or 100}
+
+    def parse_tickers(self, data):
+        if isinstance(data, dict):
+            data = [data]
+        return {row["symbol"]: BookTicker(row["symbol"], float(row["bidPrice"]), float(row["askPrice"]),
+                                          float(row["bidQty"]), float(row["askQty"])) for row in data}
+
+class KucoinRaw(RawApi):
+    base_url = "https://api.kucoin.com"
+    depth_limits = (20, 100)
+
+    def tickers_request(self):
+        return "/api/v1/market/allTickers", None
+
+    def ticker_request(self, market_id):
+        return "/api/v1/market/orderbook/level1", {"symbol": market_id}
+
+    def depth_request(self, market_id, limit):
+        return f"/api/v1/market/orderbook/level2_{limit or 100}", {"symbol": market_id}
+
+    def parse_tickers(self, data):
+        data = data["data"]
+        timestamp = data.get("time")
+        return {row["symbol"]: BookTicker(row["symbol"], _float(row.get("buy")), _float(row.get("sell")),
+                                          _float(row.get("bestBidSize")), _float(row.get("bestAskSize")),
+                                          _float(row.get("last")), timestamp)
+                for row in data["ticker"]}
+
+    def parse_ticker(self, data, market_id):
+        row = data["data"]
+        if not row:
+            return None
+        return BookTicker(market_id, _float(row.get("bestBid")), _float(row.get("bestAsk")), _float(row.get("bestBidSize")),
+                          _float(row.get("bestAskSize")), _float(row.get("price")), row.get("time"))
+
+    def parse_depth(self, data, limit=None):
+        data = data["data"]
+        return _levels(data["bids"], limit), _levels(data["asks"], limit), data.get("time")
+
+class BitgetRaw(RawApi):
+    base_url = "https://api.bitget.com"
+    depth_limits = (5, 15, 50, 100, 150)
+
+    def tickers_request(self):
+        return "/api/v2/spot/market/tickers", None
+
+    def ticker_request(self, market_id):
+        return "/api/v2/spot/market/tickers", {"symbol": market_id}
+
+    def depth_request(self, market_id, limit):
+        return "/api/v2/spot/market/orderbook", {"symbol": market_id, "type": "step0", "limit": limit or 150}
+
+    def parse_tickers(self, data):
+        return {row["symbol"]: BookTicker(row["symbol"], _float(row.get("bidPr")), _float(row.get("askPr")),
+                                          _float(row.get("bidSz")), _float(row.get("askSz")),
+                                          _float(row.get("lastPr")), _float(row.get("ts")))
+                for row in data["data"]}
+
+    def parse_depth(self, data, limit=None):
+        data = data["data"]
+        return _levels(data["bids"], limit), _levels(data["asks"], limit), _float(data.get("ts"))
+
+class BitstampRaw(RawApi):
+    base_url = "https://www.bitstamp.net"
+    depth_limits = None  # order book Bitstamp jest zawsze pełny – przycinamy go przy parsowaniu
+
+    def tickers_request(self):
+        return "/api/v2/ticker/", None
+
+    def ticker_request(self, market_id):
+        return f"/api/v2/ticker/{market_id}/", None
+
+    def depth_request(self, market_id, limit):
+        return f"/api/v2/order_book/{market_id}/", None
+
+    def _ticker(self, row, market_id):
+        timestamp = _float(row.get("timestamp"))
+        return BookTicker(market_id, _float(row.get("bid")), _float(row.get("ask")), last=_float(row.get("last")),
+                          timestamp=timestamp * 1000 if timestamp else None)
+
+    def parse_tickers(self, data):
+        tickers = {}
+        for row in data:
+            market_id = row["pair"].replace("/", "").lower()
+            tickers[market_id] = self._ticker(row, market_id)
+        return tickers
+
+    def parse_ticker(self, data, market_id):
+        return self._ticker(data, market_id)
+
+    def parse_depth(self, data, limit=None):
+        timestamp = _float(data.get("microtimestamp"))
+        return _levels(data["bids"], limit), _levels(data["asks"], limit), timestamp / 1000 if timestamp else None
+
+RAW_APIS = {"binance": BinanceRaw, "kucoin": KucoinRaw, "bitget": BitgetRaw, "bitstamp": BitstampRaw}
+
+class SymbolMap:
+    """Tłumaczenie id rynku giełdy <-> symbol ccxt (tylko rynki spot); symbole są internowane."""
+    def __init__(self, markets):
+        self.ids = {}
+        self.symbols = {}
+        for symbol, market in markets.items():
+            if not market.get("spot", True) or not market.get("id"):
+                continue
+            symbol = sys.intern(symbol)
+            self.ids[symbol] = market["id"]
+            self.symbols[market["id"]] = symbol
+
+def rebind(tickers, symbol_map, wanted=None):
+    # {id rynku: BookTicker} -> {symbol ccxt: BookTicker}, opcjonalnie tylko dla wanted
+    result = {}
+    symbols = symbol_map.symbols
+    for market_id, ticker in tickers.items():
+        symbol = symbols.get(market_id)
+        if symbol is None or (wanted is not None and symbol not in wanted):
+            continue
+        ticker.symbol = symbol
+        result[symbol] = ticker
+    return result
+
+def order_book(symbol, bids, asks, timestamp=None):
+    # Ten sam kształt co order book ccxt (bids/asks jako listy [cena, wolumen]), bez pozostałych pól
+    return {"symbol": symbol, "bids": bids, "asks": asks, "timestamp": int(timestamp) if timestamp else None}
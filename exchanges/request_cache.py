@@ -0,0 +1,50 @@
+import asyncio
+import time
+from collections import OrderedDict
+from config import CONFIG
+
+class RequestCache:
+    """
+    Łączy identyczne zapytania będące w toku w jedno (single-flight) i przechowuje wyniki
+    przez krótki czas (TTL ustawiany osobno dla każdego endpointu) w ograniczonym rozmiarem cache LRU.
+    """
+    def __init__(self, ttl=None, max_size=None):
+        self.ttl = ttl if ttl is not None else CONFIG.get("CACHE_TTL", {})  # np. {"fetch_ticker": 0.3}
+        self.max_size = max_size if max_size is not None else CONFIG.get("CACHE_MAX_SIZE", 2048)
+        self._entries = OrderedDict()  # (endpoint, key) -> (expires_at, value)
+        self._in_flight = {}  # (endpoint, key) -> asyncio.Task
+
+    async def get_or_fetch(self, endpoint, key, fetch):
+        cache_key = (endpoint, key)
+        entry = self._entries.get(cache_key)
+        if entry is not None:
+            expires_at, value = entry
+            if expires_at > time.monotonic():
+                self._entries.move_to_end(cache_key)
+                return value
+            del self._entries[cache_key]
+
+        task = self._in_flight.get(cache_key)
+        if task is None:
+            task = asyncio.ensure_future(fetch())
+            self._in_flight[cache_key] = task
+            task.add_done_callback(lambda t: self._store(cache_key, t))
+        # shield: anulowanie jednego z oczekujących nie przerywa zapytania współdzielonego z innymi
+        return await asyncio.shield(task)
+
+    def _store(self, cache_key, task):
+        self._in_flight.pop(cache_key, None)
+        if task.cancelled() or task.exception() is not None:
+            return
+        value = task.result()
+        ttl = self.ttl.get(cache_key[0], 0)
+        # Nie zapamiętujemy błędów (adaptery zwracają wtedy None)
+        if value is None or ttl <= 0:
+            return
+        self._entries[cache_key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(cache_key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
@@ -0,0 +1,204 @@
+import asyncio
+import json
+import logging
+import queue
+import threading
+import time
+import ccxt.pro as ccxtpro
+from config import CONFIG
+
+logger = logging.getLogger("arbitrage")
+
+class StreamRecorder:
+    """
+    Zapis surowych wiadomości strumienia do pliku w wątku w tle (jak logi w log_queue.py) – pętla zdarzeń
+    tylko wrzuca gotową linię do kolejki, a wątek zapisuje wszystkie oczekujące linie jednym write.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.queue = queue.SimpleQueue()
+        self.thread = threading.Thread(target=self._run, name=f"stream-recorder-{path}", daemon=True)
+        self.thread.start()
+
+    def write(self, line):
+        self.queue.put(line)
+
+    def _run(self):
+        with open(self.path, "a", encoding="utf-8") as f:
+            while True:
+                lines = [self.queue.get()]
+                while not self.queue.empty():
+                    lines.append(self.queue.get())
+                done = lines[-1] is None
+                f.write("".join(line for line in lines if line is not None))
+                f.flush()
+                if done:
+                    return
+
+    def close(self):
+        # Zapisuje linie, które są jeszcze w kolejce, i kończy wątek
+        self.queue.put(None)
+        self.thread.join()
+
+class MarketStream:
+    """
+    Opcjonalny tryb strumieniowy (WebSocket) dla adaptera giełdy. Subskrybuje kanał book-ticker
+    (lub tickery / order booki, jeśli giełda go nie ma) oraz kanały różnicowe order booków i trzyma
+    aktualny stan w pamięci. Lokalne order booki prowadzi ccxt.pro: nakłada delty, sprawdza numery
+    sekwencji / sumy kontrolne, a przy luce odrzuca książkę – po ponownej subskrypcji pobiera snapshot REST.
+    Każdy ticker i order book ze strumienia dostaje "received" (czas zegara ściennego, jak w odpowiedziach REST),
+    więc bramka wieku notowań (utils.stale_legs) obejmuje też nogi ze strumienia.
+    """
+    def __init__(self, name, client, max_age=None, record_file=None):
+        self.name = name
+        self.client = client  # klient ccxt.pro
+        self.max_age = max_age if max_age is not None else CONFIG.get("STREAM_MAX_AGE", 5)
+        self.tickers = {}  # {symbol: ticker}
+        self.order_books = {}  # {symbol: order book utrzymywany przez ccxt.pro}
+        self.received = {}  # {("ticker" | "book", symbol): czas odebrania (time.monotonic) – świeżość w get_*}
+        self._tasks = {}
+        self._book_limits = {}  # {symbol: liczba poziomów subskrypcji order booka (None = pełna książka)}
+        self._record = StreamRecorder(record_file) if record_file else None
+        if self._record is not None:
+            self._wrap_handler()
+
+    @classmethod
+    def for_exchange(cls, name, rest_client):
+        # Klient WebSocket z tymi samymi kluczami co klient REST adaptera
+        client = getattr(ccxtpro, rest_client.id)({
+            'apiKey': rest_client.apiKey,
+            'secret': rest_client.secret,
+            'enableRateLimit': True,
+        })
+        ws_url = CONFIG.get("STREAM_WS_URLS", {}).get(name)
+        if ws_url:
+            # Np. lokalny serwer odtwarzający nagrany strumień (stream_replay.py)
+            client.urls['api']['ws'] = _replace_urls(client.urls['api']['ws'], ws_url)
+        record_dir = CONFIG.get("STREAM_RECORD_DIR")
+        record_file = f"{record_dir}/{name}.jsonl" if record_dir else None
+        return cls(name, client, record_file=record_file)
+
+    def _wrap_handler(self):
+        # Zapisujemy surowe wiadomości (czas odebrania + JSON), aby móc je później odtworzyć; JSON powstaje od razu,
+        # bo ccxt.pro może zmieniać obiekt wiadomości, a zapis do pliku robi wątek StreamRecorder
+        handle_message = self.client.handle_message
+
+        def recording_handler(client, message):
+            self._record.write(f"{time.time()}\t{json.dumps(message)}\n")
+            return handle_message(client, message)
+
+        self.client.handle_message = recording_handler
+
+    def start(self, symbols):
+        symbols = sorted(symbols)
+        if not symbols:
+            return
+        if self.client.has.get("watchBidsAsks"):
+            self._spawn("bids_asks", self._watch_tickers("watch_bids_asks", symbols))
+        elif self.client.has.get("watchTickers"):
+            self._spawn("tickers", self._watch_tickers("watch_tickers", symbols))
+        else:
+            # Brak kanału tickerów (np. Bitstamp) – najlepsze ceny bierzemy z order booków
+            for symbol in symbols:
+                self.subscribe_order_book(symbol)
+        logger.info(f"{self.name} - Streaming market data for {len(symbols)} symbols.")
+
+    def subscribe_order_book(self, symbol, limit=None):
+        # Subskrypcja z mniejszą głębokością niż potrzebna jest wznawiana z nowym limitem
+        if symbol in self._book_limits:
+            current = self._book_limits[symbol]
+            if current is None or (limit is not None and current >= limit):
+                return
+        elif len(self._book_limits) >= CONFIG.get("STREAM_MAX_BOOKS", 200):
+            return
+        self._book_limits[symbol] = limit
+        self._spawn(("book", symbol), self._watch_order_book(symbol, limit))
+
+    def _spawn(self, key, coro):
+        # Ponowne start() (np. po przeładowaniu aktywów) zastępuje subskrypcję tickerów nową, z pełną listą symboli
+        previous = self._tasks.get(key)
+        if previous is not None:
+            previous.cancel()
+        self._tasks[key] = asyncio.create_task(coro)
+
+    async def _watch_tickers(self, method, symbols):
+        while True:
+            try:
+                tickers = await getattr(self.client, method)(symbols)
+                now, received = time.monotonic(), time.time()
+                for symbol, ticker in tickers.items():
+                    # Kanał book-ticker nie podaje ostatniej ceny transakcji – last zostaje None (porównujemy bid/ask)
+                    ticker["received"] = received
+                    self.tickers[symbol] = ticker
+                    self.received[("ticker", symbol)] = now
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"{self.name} - Ticker stream error, resubscribing: {e}")
+                await asyncio.sleep(CONFIG.get("STREAM_RESYNC_DELAY", 1))
+
+    async def _watch_order_book(self, symbol, limit):
+        while True:
+            try:
+                order_book = await self.client.watch_order_book(symbol, limit)
+                order_book["received"] = time.time()
+                self.order_books[symbol] = order_book
+                self.received[("book", symbol)] = time.monotonic()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Luka w sekwencji lub błędna suma kontrolna: porzucamy lokalną książkę, ponowna
+                # subskrypcja zaczyna od świeżego snapshotu REST
+                self.order_books.pop(symbol, None)
+                logger.warning(f"{self.name} - Order book stream for {symbol} out of sync, resyncing: {e}")
+                await asyncio.sleep(CONFIG.get("STREAM_RESYNC_DELAY", 1))
+
+    def _fresh(self, kind, symbol):
+        received = self.received.get((kind, symbol))
+        return received is not None and time.monotonic() - received <= self.max_age
+
+    def get_order_book(self, symbol, limit=None):
+        if symbol not in self.order_books or not self._fresh("book", symbol):
+            return None
+        order_book = self.order_books[symbol]
+        subscribed = self._book_limits.get(symbol)
+        if limit is not None and subscribed is not None and subscribed < limit:
+            return None  # płytsza subskrypcja – odpowiedź z REST, a subscribe_order_book ją pogłębi
+        if limit is None:
+            return order_book
+        return {"symbol": symbol, "bids": order_book["bids"][:limit], "asks": order_book["asks"][:limit],
+                "timestamp": order_book.get("timestamp"), "received": order_book.get("received")}
+
+    def get_ticker(self, symbol):
+        if symbol in self.tickers and self._fresh("ticker", symbol):
+            return self.tickers[symbol]
+        order_book = self.get_order_book(symbol)
+        if order_book is None or not order_book.get("asks") or not order_book.get("bids"):
+            return None
+        bid, ask = order_book["bids"][0][0], order_book["asks"][0][0]
+        return {"symbol": symbol, "bid": bid, "ask": ask, "last": None, "timestamp": order_book.get("timestamp"),
+                "received": order_book.get("received")}
+
+    def get_tickers(self, symbols=None):
+        symbols = symbols if symbols is not None else set(self.tickers) | set(self.order_books)
+        result = {}
+        for symbol in symbols:
+            ticker = self.get_ticker(symbol)
+            if ticker is not None:
+                result[symbol] = ticker
+        return result
+
+    async def close(self):
+        for task in self._tasks.values():
+            task.cancel()
+        await asyncio.gather(*self._tasks.values(), return_exceptions=True)
+        self._tasks.clear()
+        self._book_limits.clear()
+        await self.client.close()
+        if self._record is not None:
+            await asyncio.to_thread(self._record.close)
+
+def _replace_urls(urls, url):
+    if isinstance(urls, dict):
+        return {key: _replace_urls(value, url) for key, value in urls.items()}
+    return url
@@ -0,0 +1,87 @@
+import asyncio
+import logging
+import time
+from config import CONFIG
+
+logger = logging.getLogger("arbitrage")
+
+class ConversionRates:
+    """
+    Długo żyjący serwis kursów względem USDT dla walut quote z ALLOWED_QUOTES i CONVERT_INVESTMENT.
+    Kursy są odświeżane w tle jednym zapytaniem fetch_tickers (na giełdzie FX_EXCHANGE) i ważne przez FX_TTL sekund,
+    więc przeliczenia na gorącej ścieżce nie wykonują żadnych zapytań sieciowych.
+    """
+    def __init__(self, exchange, quotes=None, ttl=None, base="USDT"):
+        self.exchange = exchange  # adapter giełdy, np. BinanceExchange() współdzielony ze strategiami
+        self.base = base
+        if quotes is None:
+            quotes = set(CONFIG.get("ALLOWED_QUOTES", [])) | set(CONFIG.get("CONVERT_INVESTMENT", {}))
+        self.quotes = sorted(q for q in quotes if q != base)
+        self.ttl = ttl if ttl is not None else CONFIG.get("FX_TTL", 60)
+        self.rates = {}  # {quote: ile USDT kosztuje 1 jednostka quote}
+        self.updated_at = {}
+
+    async def refresh(self):
+        if not self.quotes:
+            return
+        symbols = [f"{quote}/{self.base}" for quote in self.quotes]
+        tickers = await self.exchange.fetch_tickers(symbols)
+        if not tickers:
+            logger.warning("ConversionRates - Failed to refresh conversion rates, keeping previous values.")
+            return
+        now = time.monotonic()
+        for quote, symbol in zip(self.quotes, symbols):
+            ticker = tickers.get(symbol)
+            price = ticker.get("last") if ticker else None
+            if price is None and ticker and ticker.get("bid") and ticker.get("ask"):
+                # Do przeliczenia kwot wystarczy środek spreadu, gdy ticker (np. bookTicker) nie ma ostatniej transakcji
+                price = (ticker["bid"] + ticker["ask"]) / 2
+            if price:
+                self.rates[quote] = price
+                self.updated_at[quote] = now
+
+    def rate(self, quote):
+        # Kurs quote -> USDT lub None, jeśli nie jest znany albo jest starszy niż TTL
+        if quote == self.base:
+            return 1.0
+        updated = self.updated_at.get(quote)
+        if updated is None or time.monotonic() - updated > self.ttl:
+            return None
+        return self.rates[quote]
+
+    def to_base(self, amount, quote):
+        rate = self.rate(quote)
+        return amount * rate if rate is not None else None
+
+    def from_base(self, amount, quote):
+        rate = self.rate(quote)
+        return amount / rate if rate is not None else None
+
+    def factor(self, from_quote, to_quote):
+        # Mnożnik przeliczający kwotę w from_quote na to_quote (np. przychód w EUR na USDT)
+        if from_quote == to_quote:
+            return 1.0
+        rate_from = self.rate(from_quote)
+        rate_to = self.rate(to_quote)
+        if rate_from is None or rate_to is None:
+            return None
+        return rate_from / rate_to
+
+    @classmethod
+    def for_exchanges(cls, exchanges, **kwargs):
+        # Kursy z giełdy FX_EXCHANGE, a gdy nie ma jej wśród adapterów – z pierwszej dostępnej
+        name = CONFIG.get("FX_EXCHANGE", "binance")
+        if name not in exchanges:
+            fallback = next(iter(exchanges))
+            logger.warning(f"ConversionRates - FX exchange {name} is not configured, using {fallback} instead.")
+            name = fallback
+        return cls(exchanges[name], **kwargs)
+
+    async def run(self):
+        try:
+            while True:
+                await self.refresh()
+                # Odświeżamy z zapasem, aby kursy nie wygasły między odświeżeniami
+                await asyncio.sleep(self.ttl / 2)
+        except asyncio.CancelledError:
+            return
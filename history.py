@@ -0,0 +1,411 @@
+import argparse
+import json
+import logging
+import os
+import re
+import shutil
+import sys
+from datetime import datetime
+import numpy as np
+from config import CONFIG
+
+logger = logging.getLogger("history")
+
+# Import historycznych logów okazji (arbitrage_opportunities.log i pliki "2025-03-0x ... - INFO - Pair: ...")
+# do kolumnowego magazynu w katalogu HISTORY_STORE:
+#   records.npy – tablica strukturalna posortowana po (asset, para, czas), czytana przez mmap
+#                 (import scala posortowane przebiegi plików blokami – merge_runs),
+#   index.npy   – początek i koniec każdej grupy (asset, para) w records.npy,
+#   names.json  – słowniki nazw par, aktywów, giełd i walut quote (w rekordach są tylko numery).
+
+RECORD_DTYPE = np.dtype([
+    ("timestamp", "f8"),
+    ("asset", "u4"),
+    ("pair", "u2"),
+    ("buy_exchange", "u1"),
+    ("sell_exchange", "u1"),
+    ("quote", "u1"),
+    ("effective_buy", "f8"),
+    ("effective_sell", "f8"),
+    ("ticker_profit", "f4"),
+    ("liquidity_profit", "f4"),
+    ("profit", "f8"),
+    ("invested", "f8"),
+    ("qty", "f8"),
+])
+
+INDEX_DTYPE = np.dtype([("asset", "u4"), ("pair", "u2"), ("start", "i8"), ("end", "i8")])
+
+NUMBER = rb"([-+\d.eE]+|nan|inf)"
+LINE_RE = re.compile(
+    rb"^(\d{4}-\d\d-\d\d) (\d\d):(\d\d):(\d\d),(\d{3}) - \w+ - Pair: ([^ |]+) \| Asset: (.*?) \| "
+    rb"Buy \(([^)]+?) eff\.\): " + NUMBER + rb" \| Sell \(([^)]+?) eff\.\): " + NUMBER + rb" \| "
+    rb"Ticker Profit: " + NUMBER + rb"% \| Liquidity Profit: " + NUMBER + rb"% \| "
+    rb"Profit \(([^)]+)\): " + NUMBER + rb" \| Invested \([^)]+\): " + NUMBER + rb" \| Qty Purchased: " + NUMBER
+)
+SYMBOL_RE = re.compile(rb"'([^']+/[^']+)'")
+
+CHUNK_SIZE = 4 * 1024 * 1024
+RUN_ROWS = 1_000_000  # rekordów w jednym posortowanym przebiegu zapisywanym na dysk
+MERGE_BLOCK_ROWS = 1_000_000  # łącznie rekordów wczytanych ze wszystkich przebiegów naraz przy scalaniu
+KEY_FIELDS = ("asset", "pair", "timestamp")
+
+class Names:
+    # Dwukierunkowy słownik nazwa <-> numer dla jednej kolumny tekstowej
+    def __init__(self, values=None):
+        self.values = list(values or [])
+        self.ids = {value: i for i, value in enumerate(self.values)}
+
+    def id(self, value):
+        i = self.ids.get(value)
+        if i is None:
+            i = self.ids[value] = len(self.values)
+            self.values.append(value)
+        return i
+
+    def get(self, value):
+        return self.ids.get(value)
+
+def exchange_name(raw):
+    # "Bitget" (etykieta giełdy), "BitgetExchange" (klasa adaptera w starszych logach) i "bitget" to ta sama giełda
+    name = raw.decode("utf-8").lower()
+    return name[:-len("exchange")] if name.endswith("exchange") else name
+
+def iter_lines(path, chunk_size=CHUNK_SIZE):
+    # Plik czytany kawałkami – w pamięci jest najwyżej jeden kawałek i niepełna ostatnia linia
+    with open(path, "rb") as f:
+        rest = b""
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            lines = (rest + chunk).split(b"\n")
+            rest = lines.pop()
+            yield from lines
+        if rest:
+            yield rest
+
+def parse_file(path, names, chunk_rows=100000):
+    """
+    Generator tablic RECORD_DTYPE (po chunk_rows wierszy) z jednego pliku logu. Linie w innym formacie
+    (np. komunikaty strategii trójkątnej) są pomijane.
+    """
+    day_start = {}
+    rows = []
+    for line in iter_lines(path):
+        match = LINE_RE.match(line)
+        if match is None:
+            continue
+        (day, hour, minute, second, millis, pair, asset, buy, effective_buy, sell, effective_sell,
+         ticker_profit, liquidity_profit, quote, profit, invested, qty) = match.groups()
+        start = day_start.get(day)
+        if start is None:
+            start = day_start[day] = datetime.strptime(day.decode(), "%Y-%m-%d").timestamp()
+        timestamp = start + int(hour) * 3600 + int(minute) * 60 + int(second) + int(millis) / 1000
+        symbol = SYMBOL_RE.search(asset)
+        symbol = (symbol.group(1) if symbol else asset).decode("utf-8")
+        rows.append((timestamp, names["assets"].id(symbol), names["pairs"].id(pair.decode("utf-8")),
+                     names["exchanges"].id(exchange_name(buy)), names["exchanges"].id(exchange_name(sell)),
+                     names["quotes"].id(quote.decode("utf-8")), float(effective_buy), float(effective_sell),
+                     float(ticker_profit), float(liquidity_profit), float(profit), float(invested), float(qty)))
+        if len(rows) >= chunk_rows:
+            yield np.array(rows, dtype=RECORD_DTYPE)
+            rows = []
+    if rows:
+        yield np.array(rows, dtype=RECORD_DTYPE)
+
+def sort_order(records):
+    # Kolejność magazynu: (asset, para, czas), a przy równym kluczu pozostałe pola – identyczne rekordy sąsiadują
+    keys = [records[field] for field in reversed(RECORD_DTYPE.names) if field not in KEY_FIELDS]
+    return np.lexsort(keys + [records["timestamp"], records["pair"], records["asset"]])
+
+def _groups(records):
+    return (records["asset"].astype(np.uint64) << np.uint64(16)) | records["pair"].astype(np.uint64)
+
+def _key(record):
+    return (int(record["asset"]) << 16) | int(record["pair"]), float(record["timestamp"])
+
+def _count_le(records, groups, key):
+    # Liczba początkowych rekordów posortowanego bloku z kluczem (grupa, czas) <= key
+    group, timestamp = key
+    lo = np.searchsorted(groups, group, "left")
+    hi = np.searchsorted(groups, group, "right")
+    return int(lo + np.searchsorted(records["timestamp"][lo:hi], timestamp, "right"))
+
+def merge_runs(runs, write, block_rows=MERGE_BLOCK_ROWS):
+    """
+    Scala przebiegi posortowane przez sort_order (np. zmapowane pliki .npy), czytając z każdego po block_rows
+    rekordów, i przekazuje kolejne posortowane partie bez duplikatów do write. Zwraca liczbę zapisanych rekordów.
+    """
+    cursors = [0] * len(runs)
+    blocks = [None] * len(runs)
+    tail_key, tail = None, set()  # klucz i bajty ostatnio zapisanych rekordów – duplikaty na granicy partii
+    written = 0
+    while True:
+        for i, run in enumerate(runs):
+            if (blocks[i] is None or len(blocks[i][0]) == 0) and cursors[i] < len(run):
+                block = np.asarray(run[cursors[i]:cursors[i] + block_rows])
+                cursors[i] += len(block)
+                blocks[i] = (block, _groups(block))
+        active = [i for i, block in enumerate(blocks) if block is not None and len(block[0])]
+        if not active:
+            return written
+        # Granica partii: najmniejszy ostatni klucz wczytanych bloków – rekordy do niej nie mają już poprzedników
+        bound = min(_key(blocks[i][0][-1]) for i in active)
+        parts = []
+        for i in active:
+            block, groups = blocks[i]
+            n = _count_le(block, groups, bound)
+            parts.append(block[:n])
+            blocks[i] = (block[n:], groups[n:])
+        batch = np.concatenate(parts)
+        batch = batch[sort_order(batch)]
+        keep = np.ones(len(batch), dtype=bool)
+        keep[1:] = batch[1:] != batch[:-1]
+        if tail:
+            for j in range(_count_le(batch, _groups(batch), tail_key)):
+                if batch[j].tobytes() in tail:
+                    keep[j] = False
+        batch = batch[keep]
+        if len(batch) == 0:
+            continue
+        last_key = _key(batch[-1])
+        if last_key != tail_key:
+            tail_key, tail = last_key, set()
+        for record in batch[::-1]:
+            if _key(record) != last_key:
+                break
+            tail.add(record.tobytes())
+        write(batch)
+        written += len(batch)
+
+class HistoryStore:
+    def __init__(self, path=None):
+        self.path = path or CONFIG.get("HISTORY_STORE", "history_store")
+        self.names = {key: Names() for key in ("assets", "pairs", "exchanges", "quotes")}
+        self.records = np.empty(0, dtype=RECORD_DTYPE)
+        self.index = np.empty(0, dtype=INDEX_DTYPE)
+
+    @classmethod
+    def open(cls, path=None):
+        store = cls(path)
+        if os.path.exists(os.path.join(store.path, "names.json")):
+            with open(os.path.join(store.path, "names.json"), "r", encoding="utf-8") as f:
+                store.names = {key: Names(values) for key, values in json.load(f).items()}
+            store.records = np.load(os.path.join(store.path, "records.npy"), mmap_mode="r")
+            store.index = np.load(os.path.join(store.path, "index.npy"))
+        return store
+
+    def import_files(self, paths):
+        """
+        Nowe rekordy są dołączane do istniejących; powtórnie zaimportowane linie są odrzucane. Pliki są czytane
+        kawałkami po RUN_ROWS rekordów, każdy kawałek jest sortowany i zapisywany jako przebieg obok magazynu,
+        a records.npy powstaje przez scalenie przebiegów z istniejącymi rekordami – w pamięci jest najwyżej jeden
+        kawałek i po jednym bloku z każdego przebiegu (razem MERGE_BLOCK_ROWS rekordów).
+        """
+        os.makedirs(self.path, exist_ok=True)
+        runs = [self.records] if len(self.records) else []
+        run_paths = []
+        try:
+            for path in paths:
+                count = 0
+                for chunk in parse_file(path, self.names, chunk_rows=RUN_ROWS):
+                    run_path = os.path.join(self.path, f"run-{len(run_paths)}.npy")
+                    np.save(run_path, chunk[sort_order(chunk)])
+                    run_paths.append(run_path)
+                    runs.append(np.load(run_path, mmap_mode="r"))
+                    count += len(chunk)
+                logger.info("%s: %d records", path, count)
+            block_rows = max(1024, MERGE_BLOCK_ROWS // max(len(runs), 1))
+            raw_path = os.path.join(self.path, "records.raw")
+            with open(raw_path, "wb") as f:
+                total = merge_runs(runs, lambda batch: f.write(batch.tobytes()), block_rows)
+            self._write_records(raw_path, total)
+        finally:
+            runs.clear()
+            for run_path in run_paths:
+                os.remove(run_path)
+        self.records = np.load(os.path.join(self.path, "records.npy"), mmap_mode="r")
+        self.index = self._build_index(self.records)
+        self._save_meta()
+        return len(self.records)
+
+    def _write_records(self, raw_path, count):
+        # Nagłówek .npy (rozmiar znany dopiero po scaleniu) i dane scalone strumieniowo, bez wczytywania do pamięci
+        path = os.path.join(self.path, "records.npy")
+        with open(f"{path}.tmp", "wb") as f:
+            np.lib.format.write_array_header_1_0(f, {"descr": np.lib.format.dtype_to_descr(RECORD_DTYPE),
+                                                     "fortran_order": False, "shape": (count,)})
+            with open(raw_path, "rb") as raw:
+                shutil.copyfileobj(raw, f)
+        os.remove(raw_path)
+        os.replace(f"{path}.tmp", path)
+
+    @staticmethod
+    def _build_index(records):
+        if len(records) == 0:
+            return np.empty(0, dtype=INDEX_DTYPE)
+        boundaries = np.flatnonzero((np.diff(records["asset"]) != 0) | (np.diff(records["pair"]) != 0)) + 1
+        starts = np.concatenate(([0], boundaries))
+        ends = np.concatenate((boundaries, [len(records)]))
+        index = np.empty(len(starts), dtype=INDEX_DTYPE)
+        index["asset"] = records["asset"][starts]
+        index["pair"] = records["pair"][starts]
+        index["start"] = starts
+        index["end"] = ends
+        return index
+
+    def save(self):
+        os.makedirs(self.path, exist_ok=True)
+        np.save(os.path.join(self.path, "records.npy"), self.records)
+        self._save_meta()
+
+    def _save_meta(self):
+        np.save(os.path.join(self.path, "index.npy"), self.index)
+        with open(os.path.join(self.path, "names.json"), "w", encoding="utf-8") as f:
+            json.dump({key: names.values for key, names in self.names.items()}, f)
+
+    def asset_ids(self, asset):
+        # "BROCCOLI" pasuje do wszystkich symboli "BROCCOLI/...", pełny symbol tylko do siebie
+        values = self.names["assets"].values
+        return [i for i, symbol in enumerate(values) if symbol == asset or symbol.startswith(asset + "/")]
+
+    def groups(self, asset=None, pair=None):
+        # Wiersze indeksu pasujące do filtrów – wybór odbywa się na małym indeksie, nie na rekordach
+        mask = np.ones(len(self.index), dtype=bool)
+        if asset is not None:
+            mask &= np.isin(self.index["asset"], self.asset_ids(asset))
+        if pair is not None:
+            pair_id = self.names["pairs"].get(pair)
+            if pair_id is None:
+                return self.index[:0]
+            mask &= self.index["pair"] == pair_id
+        return self.index[mask]
+
+    def select(self, asset=None, pair=None, since=None, until=None):
+        # Rekordy wybranych grup (po kolei grupami, w każdej grupie rosnąco po czasie)
+        groups = self.groups(asset, pair)
+        if len(groups) == 0:
+            return self.records[:0]
+        if len(groups) == len(self.index):
+            records = np.asarray(self.records)
+        else:
+            records = np.concatenate([self.records[start:end] for start, end in zip(groups["start"], groups["end"])])
+        mask = np.ones(len(records), dtype=bool)
+        if since is not None:
+            mask &= records["timestamp"] >= since
+        if until is not None:
+            mask &= records["timestamp"] < until
+        return records if mask.all() else records[mask]
+
+    def frequency(self, pair=None, since=None, until=None, min_profit=None, top=20):
+        # Liczba obserwacji na aktywo, malejąco
+        if since is None and until is None and min_profit is None:
+            groups = self.groups(pair=pair)
+            counts = np.bincount(groups["asset"], weights=groups["end"] - groups["start"],
+                                 minlength=len(self.names["assets"].values))
+        else:
+            records = self.select(pair=pair, since=since, until=until)
+            if min_profit is not None:
+                records = records[records["liquidity_profit"] >= min_profit]
+            counts = np.bincount(records["asset"], minlength=len(self.names["assets"].values))
+        order = np.argsort(counts)[::-1][:top]
+        return [(self.names["assets"].values[i], int(counts[i])) for i in order if counts[i] > 0]
+
+    def persistence(self, asset, pair=None, max_gap=None, min_profit=None):
+        """
+        Epizody okazji: kolejne obserwacje tego samego aktywa i pary oddalone o najwyżej max_gap sekund
+        należą do jednego epizodu. Zwraca listę (para, początek, koniec, liczba obserwacji, maks. zysk %).
+        """
+        max_gap = max_gap if max_gap is not None else CONFIG.get("HISTORY_MAX_GAP", 120)
+        records = self.select(asset, pair)
+        if min_profit is not None:
+            records = records[records["liquidity_profit"] >= min_profit]
+        if len(records) == 0:
+            return []
+        # Rekordy są posortowane po (asset, para, czas), więc nowy epizod zaczyna się przy zmianie grupy lub dużej przerwie
+        breaks = ((np.diff(records["timestamp"]) > max_gap) | (np.diff(records["pair"]) != 0)
+                  | (np.diff(records["asset"]) != 0))
+        starts = np.concatenate(([0], np.flatnonzero(breaks) + 1))
+        ends = np.concatenate((starts[1:], [len(records)]))
+        best = np.maximum.reduceat(records["liquidity_profit"], starts)
+        return [(self.names["pairs"].values[records["pair"][s]], float(records["timestamp"][s]),
+                 float(records["timestamp"][e - 1]), int(e - s), float(p)) for s, e, p in zip(starts, ends, best)]
+
+    def profits(self, asset=None, pair=None, field="liquidity_profit", since=None, until=None, bins=10):
+        # Rozkład zysku: percentyle i histogram
+        values = self.select(asset, pair, since, until)[field].astype(float)
+        values = values[np.isfinite(values)]
+        if len(values) == 0:
+            return None
+        percentiles = dict(zip((5, 25, 50, 75, 95), np.percentile(values, [5, 25, 50, 75, 95])))
+        counts, edges = np.histogram(values, bins=bins)
+        return {"count": len(values), "mean": float(values.mean()), "max": float(values.max()),
+                "percentiles": percentiles, "histogram": list(zip(edges[:-1], edges[1:], counts))}
+
+def parse_time(value):
+    return datetime.fromisoformat(value).timestamp() if value else None
+
+def format_time(timestamp):
+    return datetime.fromtimestamp(timestamp).strftime("%Y-%m-%d %H:%M:%S")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Import and query historical arbitrage opportunity logs")
+    parser.add_argument("--store", default=None, help="store directory (default: HISTORY_STORE from config)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    importer = commands.add_parser("import", help="parse log files into the store")
+    importer.add_argument("files", nargs="+")
+
+    filters = argparse.ArgumentParser(add_help=False)
+    filters.add_argument("--pair", help="exchange pair, e.g. kucoin-bitget")
+    filters.add_argument("--since", help="ISO time, e.g. 2025-03-09 00:00")
+    filters.add_argument("--until", help="ISO time")
+
+    frequency = commands.add_parser("freq", parents=[filters], help="number of opportunities per asset")
+    frequency.add_argument("--min-profit", type=float)
+    frequency.add_argument("--top", type=int, default=20)
+
+    persistence = commands.add_parser("persistence", help="how long opportunities for an asset persisted")
+    persistence.add_argument("asset", help="base asset (BROCCOLI) or full symbol (BROCCOLI/USDT)")
+    persistence.add_argument("--pair")
+    persistence.add_argument("--max-gap", type=float, help="seconds between sightings that still count as one episode")
+    persistence.add_argument("--min-profit", type=float)
+
+    profits = commands.add_parser("profits", parents=[filters], help="profit distribution")
+    profits.add_argument("asset", nargs="?")
+    profits.add_argument("--field", default="liquidity_profit", choices=["liquidity_profit", "ticker_profit", "profit"])
+    profits.add_argument("--bins", type=int, default=10)
+
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    store = HistoryStore.open(args.store)
+
+    if args.command == "import":
+        total = store.import_files(args.files)
+        print(f"Store {store.path}: {total} records, {len(store.index)} asset/pair groups")
+    elif args.command == "freq":
+        for asset, count in store.frequency(args.pair, parse_time(args.since), parse_time(args.until), args.min_profit, args.top):
+            print(f"{asset:<24} {count}")
+    elif args.command == "persistence":
+        episodes = store.persistence(args.asset, args.pair, args.max_gap, args.min_profit)
+        if not episodes:
+            print(f"No records for {args.asset}")
+            return
+        durations = np.array([end - start for _, start, end, _, _ in episodes])
+        for pair, start, end, count, best in episodes:
+            print(f"{pair:<20} {format_time(start)} -> {format_time(end)}  {end - start:8.0f}s  {count:5d} sightings  max {best:.2f}%")
+        print(f"{len(episodes)} episodes, longest {durations.max():.0f}s, median {np.median(durations):.0f}s, "
+              f"total {durations.sum():.0f}s")
+    elif args.command == "profits":
+        result = store.profits(args.asset, args.pair, args.field, parse_time(args.since), parse_time(args.until), args.bins)
+        if result is None:
+            print("No records")
+            return
+        print(f"{result['count']} records, mean {result['mean']:.4f}, max {result['max']:.4f}")
+        print("percentiles: " + ", ".join(f"p{p}={v:.4f}" for p, v in result["percentiles"].items()))
+        for low, high, count in result["histogram"]:
+            print(f"[{low:10.4f}, {high:10.4f})  {count}")
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,119 @@
+import atexit
+import logging
+import numbers
+import queue
+import time
+from logging.handlers import QueueHandler, QueueListener
+from config import CONFIG
+
+# Wszystkie zapisy logów do plików (łącznie z rotacją) odbywają się w wątkach QueueListener –
+# wątek pętli zdarzeń tylko wrzuca rekord do kolejki.
+
+_listeners = []
+
+# Typy argumentów, które można bezpiecznie sformatować później w wątku QueueListener
+IMMUTABLE_ARGS = (str, bytes, numbers.Number, type(None))
+
+def snapshot_arg(arg):
+    # Argument zmienny (dict, lista, obiekt z atrybutami) jest zamieniany na napis jeszcze w wątku wywołującym
+    if isinstance(arg, (*IMMUTABLE_ARGS, Lazy)):
+        return arg
+    if type(arg) is tuple:
+        return tuple(snapshot_arg(item) for item in arg)
+    return str(arg)
+
+class DeferredQueueHandler(QueueHandler):
+    """
+    Standardowy QueueHandler formatuje cały komunikat jeszcze w wątku wywołującym (prepare). Tutaj rekord trafia
+    do kolejki z niesformatowanym komunikatem, a składa go dopiero handler docelowy w wątku QueueListener.
+    Argumenty niezmienne (liczby, napisy) przechodzą bez zmian; zmienne (dict, SymbolPlan) są zamieniane na
+    napis od razu, bo przed sformatowaniem mogłyby się zmienić. Lazy też przechodzi bez zmian – obiekty
+    przekazane do Lazy nie mogą być później modyfikowane (order booki w logach są świeżymi obiektami z każdego sprawdzenia).
+    """
+    def prepare(self, record):
+        if isinstance(record.args, dict):
+            record.args = {key: snapshot_arg(value) for key, value in record.args.items()}
+        elif record.args:
+            record.args = tuple(snapshot_arg(arg) for arg in record.args)
+        return record
+
+def queued(handler):
+    # Opakowuje handler plikowy: zwraca handler do podpięcia pod logger, a właściwy zapis robi wątek w tle
+    log_queue = queue.SimpleQueue()
+    listener = QueueListener(log_queue, handler, respect_handler_level=True)
+    listener.start()
+    _listeners.append(listener)
+    return DeferredQueueHandler(log_queue)
+
+def stop_listeners():
+    # Opróżnia kolejki i zatrzymuje wątki (wywoływane automatycznie przy wyjściu z programu)
+    while _listeners:
+        _listeners.pop().stop()
+
+atexit.register(stop_listeners)
+
+class _Dispatch(logging.Handler):
+    # Rekord z procesu potomnego trafia do loggera o tej samej nazwie w tym procesie (i do jego handlerów plikowych)
+    def emit(self, record):
+        logging.getLogger(record.name).handle(record)
+
+def process_listener(log_queue):
+    # Odbiera rekordy wysłane przez worker_logging z procesów potomnych; zatrzymanie: listener.stop()
+    listener = QueueListener(log_queue, _Dispatch())
+    listener.start()
+    return listener
+
+def worker_logging(log_queue, level=logging.INFO):
+    # W procesie potomnym: wszystkie rekordy idą kolejką (multiprocessing) do procesu głównego, gdzie zapisują
+    # je te same handlery co logi tego procesu (app.log, arbitrage.log). Standardowy QueueHandler formatuje
+    # komunikat przed wysłaniem, więc rekord da się przesłać między procesami.
+    root = logging.getLogger()
+    root.handlers = [QueueHandler(log_queue)]
+    root.setLevel(level)
+
+class Lazy:
+    """
+    Wartość liczona dopiero przy formatowaniu komunikatu (w wątku logowania), np. Lazy(book.levels) jako argument
+    loggera. Funkcja i jej argumenty nie mogą być później modyfikowane przez wywołującego.
+    """
+    __slots__ = ("func", "args")
+
+    def __init__(self, func, *args):
+        self.func = func
+        self.args = args
+
+    def __str__(self):
+        return str(self.func(*self.args))
+
+class SampledLog:
+    """
+    Ogranicza powtarzalne komunikaty (np. "below threshold" dla tego samego symbolu w każdym cyklu):
+    dla danego klucza przepuszcza najwyżej jeden komunikat na interval sekund, a przy następnym
+    dopisuje, ile podobnych pominięto. interval=0 wyłącza próbkowanie.
+    """
+    def __init__(self, logger, interval=None):
+        self.logger = logger
+        self.interval = interval if interval is not None else CONFIG.get("LOG_SAMPLE_INTERVAL", 60)
+        self.state = {}  # {klucz: [czas ostatniego komunikatu, liczba pominiętych]}
+
+    def log(self, level, key, msg, *args):
+        if not self.logger.isEnabledFor(level):
+            return
+        if self.interval > 0:
+            now = time.monotonic()
+            entry = self.state.get(key)
+            if entry is not None and now - entry[0] < self.interval:
+                entry[1] += 1
+                return
+            suppressed = entry[1] if entry is not None else 0
+            self.state[key] = [now, 0]
+            if suppressed:
+                msg += " (%d similar messages suppressed)"
+                args += (suppressed,)
+        self.logger.log(level, msg, *args)
+
+    def info(self, key, msg, *args):
+        self.log(logging.INFO, key, msg, *args)
+
+    def warning(self, key, msg, *args):
+        self.log(logging.WARNING, key, msg, *args)
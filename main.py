@@ -1,13 +1,20 @@
 import asyncio
 import signal
 import logging
-import json
 from config import CONFIG
-from exchanges.binance import BinanceExchange
-from exchanges.kucoin import KucoinExchange
-from exchanges.bitget import BitgetExchange
-from exchanges.bitstamp import BitstampExchange
+from exchanges.base import get_exchanges
 from arbitrage import PairArbitrageStrategy
+from market_data import MarketDataHub
+from price_board import ShardedMarketData
+from screening import TickerScreener
+from cross_venue import CrossVenueArbitrageStrategy, build_universe
+from fx import ConversionRates
+from opportunity_store import create_recorder
+from log_queue import queued
+from backtest import RecordingExchange
+from metrics import start_metrics_server
+from triangular import TriangularEngine, TriangularArbitrageStrategy
+from asset_reload import AssetWatcher, PairAssetReloader, CrossAssetReloader, load_asset_universe, pair_symbols, universe_symbols
 import common_assets
 
 def setup_logging():
@@ -18,7 +25,7 @@ def setup_logging():
         logger.handlers.clear()
     file_handler = logging.FileHandler('app.log', mode='a', encoding='utf-8')
     file_handler.setFormatter(formatter)
-    logger.addHandler(file_handler)
+    logger.addHandler(queued(file_handler))
 
 async def shutdown(loop):
     logging.info("Shutdown initiated, cancelling tasks...")
@@ -35,14 +42,12 @@ def install_signal_handlers(loop):
         loop.add_signal_handler(sig, lambda: asyncio.create_task(shutdown(loop)))
 
 async def run_arbitrage_for_all_pairs(exchanges):
-    try:
-        with open("common_assets.json", "r") as f:
-            common_assets_data = json.load(f)
-    except Exception as e:
-        logging.error(f"Failed to load common_assets.json: {e}")
+    # Te same pliki (z assets_to_add.json / assets_to_remove.json) obserwuje AssetWatcher w trakcie pracy
+    common_assets_data = await load_asset_universe()
+    if common_assets_data is None:
         return
 
-    tasks = []
+    strategies = []
     for pair_key, assets in common_assets_data.items():
         if not assets:
             logging.info(f"No common assets for pair {pair_key}")
@@ -56,24 +61,138 @@ async def run_arbitrage_for_all_pairs(exchanges):
         if not ex1 or not ex2:
             logging.error(f"Exchanges not found for pair: {pair_key}")
             continue
-        strategy = PairArbitrageStrategy(ex1, ex2, assets, pair_name=pair_key)
+        strategies.append((pair_key, ex1, ex2, assets))
+    if not strategies:
+        logging.info("No arbitrage tasks to run.")
+        return
+
+    # Jeden serwis kursów walut (quote -> USDT) odświeżany w tle, współdzielony przez wszystkie strategie
+    fx = ConversionRates.for_exchanges(exchanges)
+    fx_task = asyncio.create_task(fx.run())
+    # Zapis okazji do pliku binarnego w partiach, poza pętlą zdarzeń
+    background = [fx_task]
+    recorder = create_recorder()
+    if recorder is not None:
+        background.append(asyncio.create_task(recorder.run()))
+    try:
+        # Rynki wyszukiwania cykli ładowane przed startem – ich tickery trafiają do wspólnego snapshotu strategii
+        triangular = await load_triangular_engine(exchanges) if CONFIG.get("TRIANGULAR_ARBITRAGE", False) else None
+        if CONFIG.get("ARBITRAGE_MODE", "cross") == "cross":
+            await run_cross_venue_arbitrage(exchanges, {pair_key: assets for pair_key, _, _, assets in strategies}, fx,
+                                            recorder, triangular)
+        else:
+            await run_pair_arbitrage(exchanges, strategies, fx, recorder, triangular)
+    finally:
+        for task in background:
+            task.cancel()
+        await asyncio.gather(*background, return_exceptions=True)
+
+async def run_pair_arbitrage(exchanges, strategies, fx, recorder=None, triangular=None):
+    # Jeden wspólny snapshot tickerów na giełdę zamiast zapytań per symbol i per para,
+    # przesiewany wektorowo dla wszystkich par naraz
+    running = {pair_key: PairArbitrageStrategy(ex1, ex2, assets, pair_name=pair_key, fx=fx, recorder=recorder)
+               for pair_key, ex1, ex2, assets in strategies}
+    # Snapshot zawiera tylko symbole giełd ze skompilowanych planów (a nie klucze aktywów z common_assets.json)
+    symbols = pair_symbols(running)
+    start_streaming(exchanges, symbols)
+    screener = TickerScreener({name: exchanges[name].fee_rate for name in symbols}, fx=fx)
+    market_data = create_market_data({name: exchanges[name] for name in symbols}, symbols, screener)
+    tasks = []
+    for pair_key, strategy in running.items():
+        strategy.set_market_data(market_data)
+        screener.add_pair(pair_key, strategy.name1, strategy.name2, strategy.screening_assets())
         tasks.append(asyncio.create_task(strategy.run()))
-    if tasks:
+    # Zmiany plików aktywów trafiają do działających strategii bez ich restartu
+    reloader = PairAssetReloader(exchanges, running, screener, market_data, fx=fx, recorder=recorder)
+    background = [asyncio.create_task(market_data.run()), asyncio.create_task(AssetWatcher(reloader.apply).run())]
+    background += start_triangular_arbitrage(triangular, exchanges, market_data)
+    try:
         await asyncio.gather(*tasks)
+    finally:
+        for task in background:
+            task.cancel()
+        await asyncio.gather(*background, return_exceptions=True)
+        await reloader.close()
+
+def create_market_data(exchanges, symbols, screener=None):
+    # Przy SHARDED_WORKERS > 0 tickery pobierają osobne procesy, a ceny trafiają do pamięci współdzielonej
+    if CONFIG.get("SHARDED_WORKERS", 0):
+        return ShardedMarketData(exchanges, symbols=symbols, screener=screener)
+    return MarketDataHub(exchanges, symbols=symbols, screener=screener)
+
+def start_streaming(exchanges, symbols):
+    # Tryb strumieniowy: adaptery utrzymują tickery i order booki w pamięci zamiast odpytywać REST
+    if not CONFIG.get("STREAMING", False):
+        return
+    for name, exchange_symbols in symbols.items():
+        exchanges[name].start_streaming(exchange_symbols)
+
+async def run_cross_venue_arbitrage(exchanges, common_assets_data, fx, recorder=None, triangular=None):
+    # Jedna strategia dla wszystkich giełd zamiast osobnej strategii dla każdej pary giełd
+    universe = build_universe(common_assets_data, cross_quote=CONFIG.get("CROSS_QUOTE_MATCHING", True))
+    symbols = universe_symbols(universe)
+    venues = {name: exchanges[name] for name in symbols}
+    start_streaming(venues, symbols)
+    market_data = create_market_data(venues, symbols)
+    strategy = CrossVenueArbitrageStrategy(venues, universe, market_data, fx=fx, recorder=recorder)
+    reloader = CrossAssetReloader(venues, strategy, market_data)
+    background = [asyncio.create_task(market_data.run()), asyncio.create_task(AssetWatcher(reloader.apply).run())]
+    background += start_triangular_arbitrage(triangular, exchanges, market_data)
+    try:
+        await strategy.run()
+    finally:
+        for task in background:
+            task.cancel()
+        await asyncio.gather(*background, return_exceptions=True)
+
+async def load_triangular_engine(exchanges):
+    # Graf obejmuje wszystkie rynki z ALLOWED_QUOTES, a nie tylko wspólne aktywa z common_assets.json.
+    # Zwraca (TriangularEngine, {giełda: symbole}) albo None, gdy żadna giełda nie ma rynków
+    engine = TriangularEngine()
+    names = list(exchanges.keys())
+    results = await asyncio.gather(*(common_assets.load_markets_for_exchange(exchanges[name], CONFIG["ALLOWED_QUOTES"])
+                                     for name in names))
+    symbols = {}
+    for name, markets in zip(names, results):
+        if not markets:
+            logging.error(f"No markets loaded for {name}, skipping it in triangular search")
+            continue
+        engine.add_markets(name, markets, exchanges[name].fee_rate)
+        symbols[name] = set(markets)
+    if not symbols:
+        return None
+    return engine, symbols
+
+def start_triangular_arbitrage(triangular, exchanges, market_data):
+    # Wyszukiwanie cykli czyta snapshot wspólnego MarketDataHub – bez drugiego fetch_tickers na giełdę w cyklu.
+    # ShardedMarketData trzyma ceny tylko w PriceBoard (bez słowników tickerów), więc wtedy cykle mają własny hub
+    if triangular is None:
+        return []
+    engine, symbols = triangular
+    venues = {name: exchanges[name] for name in symbols}
+    tasks = []
+    if isinstance(market_data, ShardedMarketData):
+        market_data = MarketDataHub(venues, symbols=symbols)
+        tasks.append(asyncio.create_task(market_data.run()))
     else:
-        logging.info("No arbitrage tasks to run.")
+        market_data.track(venues, symbols)
+    tasks.append(asyncio.create_task(TriangularArbitrageStrategy(engine, market_data).run()))
+    return tasks
 
 async def main():
     setup_logging()
     logging.info("Starting arbitrage program")
     
-    exchanges = {
-        "binance": BinanceExchange(),
-        "kucoin": KucoinExchange(),
-        "bitget": BitgetExchange(),
-        "bitstamp": BitstampExchange()
-    }
-    
+    # Jeden adapter (i jedna pula połączeń HTTP) na giełdę – wspólny dla odkrywania aktywów i arbitrażu
+    exchanges = get_exchanges()
+
+    if CONFIG.get("BACKTEST_RECORD_DIR"):
+        # Nagrywanie odpowiedzi giełd do późniejszego odtworzenia (python backtest.py <katalog>)
+        exchanges = {name: RecordingExchange(name, exchange) for name, exchange in exchanges.items()}
+
+    # Endpoint /metrics (Prometheus) działa przez cały czas życia programu
+    metrics_runner = await start_metrics_server()
+
     loop = asyncio.get_running_loop()
     install_signal_handlers(loop)
     
@@ -85,7 +204,7 @@ async def main():
         # Używamy asyncio.to_thread, aby asynchronicznie pobrać input
         choice = await asyncio.to_thread(input, "Your choice (1/2/3): ")
         if choice == "1":
-            await common_assets.main()  # common_assets.main() musi być asynchroniczne
+            await common_assets.main(exchanges)  # common_assets.main() musi być asynchroniczne
         elif choice == "2":
             await run_arbitrage_for_all_pairs(exchanges)
         elif choice == "3":
@@ -96,10 +215,10 @@ async def main():
             print("Invalid choice!")
     
     # Zamykamy instancje giełd
-    await exchanges["binance"].close()
-    await exchanges["kucoin"].close()
-    await exchanges["bitget"].close()
-    await exchanges["bitstamp"].close()
+    for exchange in exchanges.values():
+        await exchange.close()
+    if metrics_runner is not None:
+        await metrics_runner.cleanup()
 
 if __name__ == '__main__':
     try:
@@ -0,0 +1,90 @@
+import asyncio
+import logging
+import time
+from config import CONFIG
+from utils import normalize_symbol
+
+logger = logging.getLogger("arbitrage")
+
+class MarketDataHub:
+    """
+    Pobiera pełny zestaw tickerów z każdej giełdy jednym zapytaniem (fetch_tickers) na cykl
+    i udostępnia ten sam snapshot w pamięci wszystkim strategiom par.
+    """
+    def __init__(self, exchanges, symbols=None, interval=CONFIG.get("SNAPSHOT_INTERVAL", 1), screener=None):
+        self.exchanges = exchanges  # np. {"binance": BinanceExchange(), "kucoin": KucoinExchange()}
+        self.symbols = symbols or {}  # np. {"binance": {"ABC/USDT", ...}} – symbole używane przez strategie
+        self.tracked = {}  # {giełda: symbole} dodane przez track() – niezależne od przeładowań set_symbols
+        self.interval = interval
+        self.tickers = {}  # {"binance": {"ABC/USDT": ticker, ...}, ...}
+        self.updated_at = {}  # czas ostatniego udanego pobrania snapshotu dla danej giełdy
+        self.screener = screener  # TickerScreener – opcjonalny wektorowy screening snapshotu
+        self.candidates = {}  # {pair_name: [(asset, kierunek, zysk %, cena 1, cena 2), ...]} z ostatniego screeningu
+        self.cycle = 0
+        self._updated = asyncio.Condition()
+
+    async def _fetch_exchange(self, name):
+        exchange = self.exchanges[name]
+        tickers = await exchange.fetch_tickers()
+        if tickers is None:
+            return None
+        wanted = self.symbols.get(name)
+        if name in self.tracked:
+            wanted = self.tracked[name] if wanted is None else wanted | self.tracked[name]
+        snapshot = {}
+        for symbol, ticker in tickers.items():
+            symbol = normalize_symbol(symbol)
+            if wanted is None or symbol in wanted:
+                snapshot[symbol] = ticker
+        return snapshot
+
+    async def refresh(self):
+        names = list(self.exchanges.keys())
+        results = await asyncio.gather(*(self._fetch_exchange(name) for name in names), return_exceptions=True)
+        now = time.time()
+        for name, result in zip(names, results):
+            if isinstance(result, asyncio.CancelledError):
+                raise result
+            if isinstance(result, Exception) or result is None:
+                logger.warning(f"MarketDataHub - Failed to refresh tickers for {name}, keeping previous snapshot: {result}")
+                continue
+            self.tickers[name] = result
+            self.updated_at[name] = now
+        if self.screener is not None:
+            self.candidates = self.screener.screen(self.tickers)
+        self.cycle += 1
+        async with self._updated:
+            self._updated.notify_all()
+
+    def set_symbols(self, symbols):
+        # Nowy zestaw symboli strategii (przeładowanie aktywów) – obowiązuje od następnego snapshotu
+        self.symbols = symbols
+
+    def track(self, exchanges, symbols):
+        # Dodatkowe giełdy i symbole w tym samym snapshocie (np. rynki TriangularEngine), zamiast drugiego
+        # fetch_tickers na giełdę w cyklu; przeładowanie aktywów (set_symbols) ich nie usuwa
+        for name, exchange in exchanges.items():
+            self.exchanges.setdefault(name, exchange)
+        for name, exchange_symbols in symbols.items():
+            self.tracked.setdefault(name, set()).update(exchange_symbols)
+
+    def get_ticker(self, exchange_name, symbol):
+        return self.tickers.get(exchange_name, {}).get(symbol)
+
+    async def wait_for_update(self, last_cycle):
+        # Czeka na snapshot nowszy niż last_cycle i zwraca numer bieżącego cyklu
+        async with self._updated:
+            await self._updated.wait_for(lambda: self.cycle > last_cycle)
+            return self.cycle
+
+    async def run(self):
+        logger.info(f"MarketDataHub - Starting ticker snapshots for {len(self.exchanges)} exchanges.")
+        try:
+            while True:
+                start = time.monotonic()
+                await self.refresh()
+                elapsed = time.monotonic() - start
+                await asyncio.sleep(max(0, self.interval - elapsed))
+        except asyncio.CancelledError:
+            logger.info("MarketDataHub - Ticker snapshots cancelled.")
+            return
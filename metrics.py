@@ -0,0 +1,148 @@
+import bisect
+import logging
+import math
+from aiohttp import web
+from config import CONFIG
+
+logger = logging.getLogger("arbitrage")
+
+# Minimalny rejestr metryk w formacie tekstowym Prometheusa (bez zewnętrznej biblioteki).
+# Metryki są tworzone na poziomie modułu, a wartości dla konkretnych etykiet przez .labels(...).
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+_metrics = []
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(names, values, extra=None):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _format_value(value):
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value))
+
+class _Value:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount=1):
+        self.value += amount
+
+    def dec(self, amount=1):
+        self.value -= amount
+
+    def set(self, value):
+        self.value = value
+
+class _HistogramValue:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # ostatni kubełek to +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+class Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        _metrics.append(self)
+
+    def _new_child(self):
+        return _Value()
+
+    def labels(self, *values):
+        child = self._children.get(values)
+        if child is None:
+            child = self._children[values] = self._new_child()
+        return child
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for values, child in sorted(self._children.items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, values)} {_format_value(child.value)}")
+        return lines
+
+class Counter(Metric):
+    kind = "counter"
+
+class Gauge(Metric):
+    kind = "gauge"
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def _new_child(self):
+        return _HistogramValue(self.buckets)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for values, child in sorted(self._children.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), child.counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, values, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, values)} {_format_value(child.sum)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, values)} {child.count}")
+        return lines
+
+def render():
+    lines = []
+    for metric in _metrics:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+EXCHANGE_REQUESTS = Counter("arbitrage_exchange_requests_total", "Exchange API calls", ("exchange", "endpoint", "outcome"))
+EXCHANGE_LATENCY = Histogram("arbitrage_exchange_request_seconds", "Exchange API call latency (without rate limiter wait)",
+                             ("exchange", "endpoint", "outcome"))
+RATE_LIMITER_WAIT = Histogram("arbitrage_rate_limiter_wait_seconds", "Time spent waiting for rate limiter tokens", ("exchange",))
+RATE_LIMITER_WAITING = Gauge("arbitrage_rate_limiter_waiting", "Requests currently queued in the rate limiter", ("exchange",))
+SCAN_DURATION = Histogram("arbitrage_scan_cycle_seconds", "Duration of one scan cycle", ("pair",))
+SCAN_QUEUE_DEPTH = Gauge("arbitrage_scan_queue_depth", "Assets of the current scan cycle not yet checked", ("pair",))
+OPPORTUNITIES = Counter("arbitrage_opportunities_total", "Opportunities evaluated on order books", ("pair", "outcome"))
+
+async def handle_metrics(request):
+    return web.Response(body=render().encode("utf-8"),
+                        headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"})
+
+async def start_metrics_server(host=None, port=None):
+    # Lokalny endpoint GET /metrics; zwraca AppRunner (do zamknięcia przez runner.cleanup()) albo None, gdy wyłączony
+    port = port if port is not None else CONFIG.get("METRICS_PORT")
+    if not port:
+        return None
+    host = host or CONFIG.get("METRICS_HOST", "127.0.0.1")
+    app = web.Application()
+    app.router.add_get("/metrics", handle_metrics)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    try:
+        await web.TCPSite(runner, host, port).start()
+    except OSError as e:
+        logger.error(f"Metrics - Failed to start endpoint on {host}:{port}: {e}")
+        await runner.cleanup()
+        return None
+    logger.info(f"Metrics - Serving Prometheus metrics on http://{host}:{port}/metrics")
+    return runner
@@ -0,0 +1,171 @@
+import asyncio
+import logging
+import os
+import numpy as np
+from config import CONFIG
+
+logger = logging.getLogger("arbitrage")
+
+MAGIC = b"ARBOPP1\0"
+HEADER_SIZE = 64
+
+def opportunity_dtype(depth):
+    # Jeden rekord = jedna oceniona okazja; stała szerokość, więc plik da się czytać bezpośrednio przez memmap
+    return np.dtype([
+        ("timestamp", "f8"),  # czas uniksowy (s)
+        ("pair", "S24"),
+        ("asset", "S24"),  # waluta bazowa, np. b"WEMIX"
+        ("buy_exchange", "S12"),
+        ("sell_exchange", "S12"),
+        ("symbol_buy", "S24"),
+        ("symbol_sell", "S24"),
+        ("quote", "S8"),
+        ("direction", "u1"),
+        ("price_buy", "f8"),  # ceny z tickerów
+        ("price_sell", "f8"),
+        ("effective_buy", "f8"),  # średnie ceny z order booków po opłatach
+        ("effective_sell", "f8"),
+        ("ticker_profit", "f8"),  # %
+        ("liquidity_profit", "f8"),  # %
+        ("profit", "f8"),  # w walucie quote kupna
+        ("invested", "f8"),
+        ("qty", "f8"),
+        ("depth_exhausted", "?"),
+        ("ask_prices", "f8", (depth,)),  # poziomy order booka strony kupna (NaN dla brakujących)
+        ("ask_sizes", "f8", (depth,)),
+        ("bid_prices", "f8", (depth,)),
+        ("bid_sizes", "f8", (depth,)),
+    ])
+
+def _header(depth):
+    return (MAGIC + np.uint32(depth).tobytes()).ljust(HEADER_SIZE, b"\0")
+
+def _read_depth(path):
+    with open(path, "rb") as f:
+        header = f.read(HEADER_SIZE)
+    if len(header) < HEADER_SIZE or not header.startswith(MAGIC):
+        raise ValueError(f"{path} is not an opportunity store file")
+    return int(np.frombuffer(header, dtype=np.uint32, count=1, offset=len(MAGIC))[0])
+
+def load_opportunities(path=None):
+    """
+    Zwraca zapisane okazje jako tablicę strukturalną NumPy zmapowaną z pliku (np.memmap, tylko do odczytu) –
+    bez parsowania, np. records["liquidity_profit"].mean() czyta tylko potrzebne bajty.
+    Niepełny ostatni rekord (np. przerwany zapis) jest pomijany.
+    """
+    path = path or CONFIG.get("OPPORTUNITY_STORE", "opportunities.bin")
+    dtype = opportunity_dtype(_read_depth(path))
+    count = (os.path.getsize(path) - HEADER_SIZE) // dtype.itemsize
+    if count <= 0:
+        return np.empty(0, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode="r", offset=HEADER_SIZE, shape=(count,))
+
+class OpportunityRecorder:
+    """
+    Dopisuje okazje do bufora (tablica strukturalna o rozmiarze batch_size) bez żadnego I/O na pętli zdarzeń.
+    Pełny bufor albo upływ flush_interval sekund powoduje zapis całej partii w wątku (asyncio.to_thread);
+    nagłówek pliku jest przygotowywany przy pierwszym zapisie, również w tym wątku.
+    """
+    def __init__(self, path=None, depth=None, batch_size=None, flush_interval=None):
+        self.path = path or CONFIG.get("OPPORTUNITY_STORE", "opportunities.bin")
+        self.depth = depth if depth is not None else CONFIG.get("ORDERBOOK_LEVELS", 5)
+        self.batch_size = batch_size or CONFIG.get("OPPORTUNITY_BATCH_SIZE", 256)
+        self.flush_interval = flush_interval if flush_interval is not None else CONFIG.get("OPPORTUNITY_FLUSH_INTERVAL", 5)
+        self.dtype = opportunity_dtype(self.depth)
+        self._buffer = np.zeros(self.batch_size, dtype=self.dtype)
+        self._count = 0
+        self._full = asyncio.Event()
+        self._write_lock = asyncio.Lock()
+        self._prepared = False
+        self._truncated = set()  # pola, dla których już ostrzegaliśmy o obciętej wartości
+
+    def _prepare_file(self):
+        # Plik z inną głębokością order booka odkładamy na bok zamiast mieszać rekordy o różnych rozmiarach
+        if os.path.exists(self.path) and os.path.getsize(self.path) > 0:
+            try:
+                if _read_depth(self.path) == self.depth:
+                    return
+            except ValueError:
+                pass
+            backup = f"{self.path}.old"
+            logger.warning(f"OpportunityRecorder - {self.path} has a different layout, moving it to {backup}")
+            os.replace(self.path, backup)
+        with open(self.path, "wb") as f:
+            f.write(_header(self.depth))
+
+    def record(self, pair, asset, buy_exchange, sell_exchange, symbol_buy, symbol_sell, quote, direction,
+               price_buy, price_sell, effective_buy, effective_sell, ticker_profit, liquidity_profit,
+               profit, invested, qty, depth_exhausted, asks, bids, timestamp):
+        if self._count >= len(self._buffer):
+            # Zapis w toku nie nadąża – powiększamy bufor zamiast gubić rekordy
+            self._buffer = np.concatenate((self._buffer, np.zeros(self.batch_size, dtype=self.dtype)))
+        row = self._buffer[self._count]
+        row["timestamp"] = timestamp
+        for field, value in (("pair", pair), ("asset", asset), ("buy_exchange", buy_exchange), ("sell_exchange", sell_exchange),
+                             ("symbol_buy", symbol_buy), ("symbol_sell", symbol_sell), ("quote", quote)):
+            encoded = str(value).encode("utf-8")
+            if len(encoded) > self.dtype[field].itemsize and field not in self._truncated:
+                self._truncated.add(field)
+                logger.warning(f"OpportunityRecorder - {field} value {value!r} is longer than "
+                               f"{self.dtype[field].itemsize} bytes and is truncated in {self.path}")
+            row[field] = encoded
+        row["direction"] = direction
+        row["price_buy"] = price_buy
+        row["price_sell"] = price_sell
+        row["effective_buy"] = effective_buy
+        row["effective_sell"] = effective_sell
+        row["ticker_profit"] = ticker_profit
+        row["liquidity_profit"] = liquidity_profit
+        row["profit"] = profit
+        row["invested"] = invested
+        row["qty"] = qty
+        row["depth_exhausted"] = depth_exhausted
+        for side, prefix in ((asks, "ask"), (bids, "bid")):
+            prices, sizes = side.top(self.depth)
+            n = len(prices)
+            row[f"{prefix}_prices"][:n] = prices
+            row[f"{prefix}_prices"][n:] = np.nan
+            row[f"{prefix}_sizes"][:n] = sizes
+            row[f"{prefix}_sizes"][n:] = np.nan
+        self._count += 1
+        if self._count >= self.batch_size:
+            self._full.set()
+
+    def _write(self, batch):
+        if not self._prepared:
+            self._prepare_file()
+            self._prepared = True
+        with open(self.path, "ab") as f:
+            f.write(batch.tobytes())
+
+    async def flush(self):
+        async with self._write_lock:
+            if self._count == 0:
+                return
+            batch = self._buffer[:self._count].copy()
+            self._count = 0
+            self._full.clear()
+            await asyncio.to_thread(self._write, batch)
+
+    async def run(self):
+        try:
+            while True:
+                try:
+                    await asyncio.wait_for(self._full.wait(), timeout=self.flush_interval)
+                except asyncio.TimeoutError:
+                    pass
+                try:
+                    await self.flush()
+                except OSError as e:
+                    logger.error(f"OpportunityRecorder - Failed to write batch to {self.path}: {e}")
+        except asyncio.CancelledError:
+            # Przy zamykaniu zapisujemy to, co zostało w buforze
+            await self.flush()
+            return
+
+def create_recorder():
+    # Rejestrator dla strategii jednego uruchomienia (None, gdy OPPORTUNITY_STORE jest wyłączony). Tworzący go
+    # uruchamia run() obok strategii i anuluje je na końcu – bez tego bufor nigdy nie trafiłby na dysk
+    if not CONFIG.get("OPPORTUNITY_STORE"):
+        return None
+    return OpportunityRecorder()
@@ -0,0 +1,103 @@
+import numpy as np
+
+class BookSide:
+    """
+    Jedna strona order booka w ciągłych tablicach NumPy (ceny i wolumeny), posortowana od najlepszej ceny.
+    Wypełniana pełnym snapshotem (replace); skumulowane wolumeny i wartości (notional) są liczone leniwie,
+    dopiero przy pierwszym odczycie po zmianie.
+    """
+    __slots__ = ("descending", "prices", "sizes", "n", "_cum_size", "_cum_notional", "_dirty")
+
+    def __init__(self, descending, capacity=64):
+        self.descending = descending  # True dla bidów (od najwyższej ceny)
+        self.prices = np.empty(capacity)
+        self.sizes = np.empty(capacity)
+        self.n = 0
+        self._cum_size = np.empty(capacity)
+        self._cum_notional = np.empty(capacity)
+        self._dirty = False
+
+    def __len__(self):
+        return self.n
+
+    def _grow(self):
+        capacity = len(self.prices) * 2
+        for name in ("prices", "sizes", "_cum_size", "_cum_notional"):
+            old = getattr(self, name)
+            new = np.empty(capacity)
+            new[:self.n] = old[:self.n]
+            setattr(self, name, new)
+
+    def replace(self, levels):
+        # Pełny snapshot: levels to lista [cena, wolumen] (format ccxt), już posortowana od najlepszej ceny
+        count = len(levels)
+        while len(self.prices) < count:
+            self._grow()
+        if count:
+            data = np.asarray([level[:2] for level in levels], dtype=float)
+            self.prices[:count] = data[:, 0]
+            self.sizes[:count] = data[:, 1]
+        self.n = count
+        self._dirty = True
+
+    def _refresh(self):
+        if not self._dirty:
+            return
+        np.cumsum(self.sizes[:self.n], out=self._cum_size[:self.n])
+        np.cumsum(self.prices[:self.n] * self.sizes[:self.n], out=self._cum_notional[:self.n])
+        self._dirty = False
+
+    def top(self, depth=None):
+        # Widoki (bez kopiowania) na najlepsze poziomy: (ceny, wolumeny)
+        depth = self.n if depth is None else min(depth, self.n)
+        return self.prices[:depth], self.sizes[:depth]
+
+    def cumulative(self, depth=None):
+        # Widoki na skumulowany wolumen i skumulowaną wartość (cena × wolumen) od najlepszego poziomu
+        self._refresh()
+        depth = self.n if depth is None else min(depth, self.n)
+        return self._cum_size[:depth], self._cum_notional[:depth]
+
+    def best(self):
+        if self.n == 0:
+            return None
+        return float(self.prices[0]), float(self.sizes[0])
+
+    def levels(self, depth=None):
+        # Lista [cena, wolumen] – tylko na potrzeby logów
+        prices, sizes = self.top(depth)
+        return [[float(p), float(s)] for p, s in zip(prices, sizes)]
+
+    def __iter__(self):
+        prices, sizes = self.top()
+        return zip(prices.tolist(), sizes.tolist())
+
+class OrderBook:
+    """
+    Order book na dwóch BookSide. REST i strumienie ccxt.pro zwracają za każdym razem pełny (już scalony) book,
+    więc get_liquidity_info_async wczytuje go przez from_ccxt/load z jawnie ograniczoną głębokością.
+    """
+    __slots__ = ("symbol", "asks", "bids", "timestamp", "received")
+
+    def __init__(self, symbol=None, capacity=64):
+        self.symbol = symbol
+        self.asks = BookSide(False, capacity)
+        self.bids = BookSide(True, capacity)
+        self.timestamp = None  # znacznik giełdy (ms)
+        self.received = None  # czas odebrania odpowiedzi (s), jeśli adapter go zapisał
+
+    @classmethod
+    def from_ccxt(cls, order_book, depth=None, symbol=None):
+        book = cls(symbol or order_book.get("symbol"), capacity=max(depth or 0, 16))
+        book.load(order_book, depth)
+        return book
+
+    def load(self, order_book, depth=None):
+        asks = order_book.get("asks", [])
+        bids = order_book.get("bids", [])
+        if depth is not None:
+            asks, bids = asks[:depth], bids[:depth]
+        self.asks.replace(asks)
+        self.bids.replace(bids)
+        self.timestamp = order_book.get("timestamp")
+        self.received = order_book.get("received")
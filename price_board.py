@@ -0,0 +1,272 @@
+import asyncio
+import logging
+import multiprocessing
+import signal
+import time
+from multiprocessing import shared_memory
+import numpy as np
+from config import CONFIG
+from market_data import MarketDataHub
+from log_queue import process_listener, worker_logging
+from utils import normalize_symbol
+
+logger = logging.getLogger("arbitrage")
+
+# Tablica cen w pamięci współdzielonej: wiersz = giełda, kolumna = symbol, jeden slot = 64 bajty (linia cache).
+# Każdą giełdę zapisuje dokładnie jeden proces; spójność slotu zapewnia licznik sekwencji (seqlock):
+# nieparzysty w trakcie zapisu, a czytelnik odrzuca slot, którego licznik zmienił się w trakcie odczytu.
+BOARD_FIELDS = ("bid", "ask", "last", "bid_volume", "ask_volume", "timestamp", "received")
+BOARD_DTYPE = np.dtype([("seq", "<u8")] + [(field, "<f8") for field in BOARD_FIELDS])
+TICKER_KEYS = ("bid", "ask", "last", "bidVolume", "askVolume", "timestamp")
+
+class PriceBoard:
+    """
+    Najlepsze ceny (top of book) wszystkich giełd w multiprocessing.shared_memory. Proces pobierający tickery
+    publikuje je przez publish(), a proces strategii czyta slots bezpośrednio z pamięci – bez kopiowania
+    między procesami i bez pickle. name=None tworzy nowy blok, inaczej dołącza do istniejącego.
+    """
+    def __init__(self, exchanges, symbols, name=None):
+        self.exchanges = list(exchanges)
+        self.symbols = list(symbols)
+        self.exchange_index = {exchange: i for i, exchange in enumerate(self.exchanges)}
+        self.symbol_index = {symbol: i for i, symbol in enumerate(self.symbols)}
+        shape = (len(self.exchanges), len(self.symbols))
+        size = max(1, shape[0] * shape[1] * BOARD_DTYPE.itemsize)
+        self.owner = name is None
+        self.shm = shared_memory.SharedMemory(name=name, create=self.owner, size=size)
+        self.slots = np.ndarray(shape, dtype=BOARD_DTYPE, buffer=self.shm.buf)
+        if self.owner:
+            self.slots["seq"] = 0
+            for field in BOARD_FIELDS:
+                self.slots[field] = np.nan
+            self.slots["received"] = 0
+
+    def spec(self):
+        # Argumenty do PriceBoard(*spec) w innym procesie
+        return self.exchanges, self.symbols, self.shm.name
+
+    def publish(self, row, cols, values):
+        # values: tablica (len(cols), len(BOARD_FIELDS)) w kolejności BOARD_FIELDS
+        board = self.slots[row]
+        seq = board["seq"]
+        seq[cols] += 1
+        for i, field in enumerate(BOARD_FIELDS):
+            board[field][cols] = values[:, i]
+        seq[cols] += 1
+
+    def read(self, rows, cols, retries=3):
+        # Spójna kopia wskazanych slotów; sloty zapisywane w trakcie odczytu są czytane ponownie, a w ostateczności pomijane
+        seq = self.slots["seq"]
+        before = seq[rows, cols]
+        result = self.slots[rows, cols]
+        torn = (before != seq[rows, cols]) | (before & 1).astype(bool)
+        for _ in range(retries):
+            if not torn.any():
+                return result
+            index = np.flatnonzero(torn)
+            before = seq[rows[index], cols[index]]
+            result[index] = self.slots[rows[index], cols[index]]
+            torn[index] = (before != seq[rows[index], cols[index]]) | (before & 1).astype(bool)
+        result["received"][torn] = 0
+        return result
+
+    def slot(self, row, col):
+        seq = self.slots["seq"]
+        for _ in range(4):
+            before = seq[row, col]
+            value = self.slots[row, col].copy()
+            if before == seq[row, col] and not before & 1:
+                return value
+        return None
+
+    def close(self):
+        # Blok usuwa (unlink) tylko proces, który go utworzył; procesy potomne dzielą z nim resource_tracker
+        self.slots = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+def _number(value):
+    value = float(value)
+    return value if value == value else None
+
+async def publish_tickers(board, name, exchange):
+    row = board.exchange_index[name]
+    tickers = await exchange.fetch_tickers()
+    if not tickers:
+        return 0
+    now = time.time()
+    cols = []
+    values = []
+    for symbol, ticker in tickers.items():
+        col = board.symbol_index.get(normalize_symbol(symbol))
+        if col is None:
+            continue
+        cols.append(col)
+        values.append([ticker.get(key) for key in TICKER_KEYS] + [ticker.get("received") or now])
+    if cols:
+        board.publish(row, np.array(cols, dtype=np.intp), np.array(values, dtype=float))
+    return len(cols)
+
+async def _run_worker(board_spec, names, interval, rate_share, stop):
+    from exchanges.base import get_exchange, close_exchanges
+    board = PriceBoard(*board_spec)
+    exchanges = {name: get_exchange(name) for name in names}
+    for exchange in exchanges.values():
+        exchange.rate_limiter.scale(rate_share)
+    try:
+        while not stop.is_set():
+            start = time.monotonic()
+            results = await asyncio.gather(*(publish_tickers(board, name, exchange) for name, exchange in exchanges.items()),
+                                           return_exceptions=True)
+            for name, result in zip(names, results):
+                if isinstance(result, Exception):
+                    logger.warning(f"PriceBoard - Failed to publish tickers for {name}: {result}")
+            await asyncio.sleep(max(0, interval - (time.monotonic() - start)))
+    finally:
+        await close_exchanges()
+        board.close()
+
+def run_worker(board_spec, names, interval, rate_share, stop, log_queue):
+    # Punkt wejścia procesu pobierającego tickery; przerwanie (Ctrl+C) obsługuje proces główny przez stop,
+    # a logi zapisuje proces główny (log_queue)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    worker_logging(log_queue)
+    asyncio.run(_run_worker(board_spec, names, interval, rate_share, stop))
+
+class ShardedMarketData(MarketDataHub):
+    """
+    MarketDataHub, w którym tickery (zapytania HTTP, parsowanie JSON, normalizacja ccxt) pobierają osobne procesy –
+    giełdy są rozdzielone między SHARDED_WORKERS procesów – a strategie w tym procesie czytają ceny z PriceBoard.
+    Order booki nadal pobierają adaptery tego procesu, z limitem zapytań pomniejszonym o część oddaną procesom tickerów.
+    """
+    def __init__(self, exchanges, symbols=None, interval=CONFIG.get("SNAPSHOT_INTERVAL", 1), screener=None,
+                 workers=None, rate_share=None, max_age=None):
+        super().__init__(exchanges, symbols=symbols, interval=interval, screener=screener)
+        self.workers = max(1, min(workers or CONFIG.get("SHARDED_WORKERS", 1), len(exchanges)))
+        self.rate_share = rate_share if rate_share is not None else CONFIG.get("SHARD_RATE_SHARE", 0.5)
+        if not 0 < self.rate_share < 1:
+            # Przy 0 procesy tickerów dostałyby limiter bez tokenów, a przy 1 procesowi strategii nie zostałby
+            # żaden budżet na order booki
+            raise ValueError(f"SHARD_RATE_SHARE must be in (0, 1), got {self.rate_share}")
+        self.max_age = max_age if max_age is not None else CONFIG.get("BOARD_MAX_AGE", 10)
+        names = list(exchanges)
+        all_symbols = sorted(set().union(*self.symbols.values())) if self.symbols else []
+        self.board = PriceBoard(names, all_symbols)
+        self.shards = [names[i::self.workers] for i in range(self.workers)]
+        self.processes = [None] * self.workers
+        self._context = multiprocessing.get_context("spawn")
+        self._stop = self._context.Event()
+        self._log_queue = self._context.Queue()
+        self._log_listener = None
+        self._screen_index = None
+        self._screen_key = None
+        self._limits = {}  # budżet limiterów tego procesu sprzed start() – przywracany w stop()
+
+    def _start_worker(self, i):
+        process = self._context.Process(target=run_worker, name=f"board-{'-'.join(self.shards[i])}",
+                                        args=(self.board.spec(), self.shards[i], self.interval, self.rate_share, self._stop,
+                                              self._log_queue),
+                                        daemon=True)
+        process.start()
+        self.processes[i] = process
+
+    def start(self):
+        for name, exchange in self.exchanges.items():
+            self._limits[name] = exchange.rate_limiter.limits()
+            exchange.rate_limiter.scale(1 - self.rate_share)
+        self._log_listener = process_listener(self._log_queue)
+        for i in range(self.workers):
+            self._start_worker(i)
+        logger.info(f"ShardedMarketData - Started {self.workers} ticker processes for {len(self.exchanges)} exchanges "
+                    f"and {len(self.board.symbols)} symbols.")
+
+    def stop(self):
+        self._stop.set()
+        try:
+            for process in self.processes:
+                if process is None:
+                    continue
+                process.join(timeout=5)
+                if process.is_alive():
+                    process.terminate()
+                    process.join()
+            for name, limits in self._limits.items():
+                self.exchanges[name].rate_limiter.restore(limits)
+            self._limits.clear()
+            if self._log_listener is not None:
+                # Po zakończeniu procesów – listener zapisuje jeszcze ich ostatnie rekordy z kolejki
+                self._log_listener.stop()
+                self._log_listener = None
+        finally:
+            self.board.close()
+
+    def _check_workers(self):
+        for i, process in enumerate(self.processes):
+            if process is not None and not process.is_alive() and not self._stop.is_set():
+                logger.error(f"ShardedMarketData - Ticker process for {', '.join(self.shards[i])} exited "
+                             f"with code {process.exitcode}, restarting it.")
+                self._start_worker(i)
+
+    def _price_matrix(self, now):
+        screener = self.screener
+        key = (len(screener.symbol_index), sum(len(columns) for columns in screener.columns.values()))
+        if self._screen_key != key:
+            # Indeksy (wiersz, kolumna) macierzy screenera i odpowiadające im sloty tablicy – liczone raz
+            index = [(row, col, self.board.exchange_index[name], self.board.symbol_index[symbol])
+                     for name, row in screener.exchange_index.items() if name in self.board.exchange_index
+                     for symbol, col in screener.columns[name] if symbol in self.board.symbol_index]
+            self._screen_index = np.array(index, dtype=np.intp).reshape(-1, 4).T
+            self._screen_key = key
+        rows, cols, board_rows, board_cols = self._screen_index
+        bids = np.full((len(screener.exchange_index), len(screener.symbol_index)), np.nan)
+        asks = np.full_like(bids, np.nan)
+        slots = self.board.read(board_rows, board_cols)
+        fresh = now - slots["received"] <= self.max_age
+        # Jak utils.ticker_quotes: cena ostatniej transakcji tylko w miejsce brakującej strony księgi
+        bids[rows, cols] = np.where(fresh, np.where(np.isnan(slots["bid"]), slots["last"], slots["bid"]), np.nan)
+        asks[rows, cols] = np.where(fresh, np.where(np.isnan(slots["ask"]), slots["last"], slots["ask"]), np.nan)
+        return bids, asks
+
+    async def refresh(self):
+        self._check_workers()
+        now = time.time()
+        received = self.board.slots["received"].max(axis=1, initial=0)
+        for name, row in self.board.exchange_index.items():
+            if received[row] > 0:
+                self.updated_at[name] = float(received[row])
+        if self.screener is not None:
+            self.candidates = self.screener.screen(self.tickers, prices=self._price_matrix(now))
+        self.cycle += 1
+        async with self._updated:
+            self._updated.notify_all()
+
+    def set_symbols(self, symbols):
+        # Rozmiar tablicy jest stały: symbole spoza niej nie mają cen do ponownego uruchomienia silnika
+        super().set_symbols(symbols)
+        missing = set().union(*symbols.values()).difference(self.board.symbol_index) if symbols else set()
+        if missing:
+            logger.warning(f"ShardedMarketData - {len(missing)} symbols are not on the price board and need a restart "
+                           f"to be tracked: {', '.join(sorted(missing))}")
+
+    def get_ticker(self, exchange_name, symbol):
+        row = self.board.exchange_index.get(exchange_name)
+        col = self.board.symbol_index.get(symbol)
+        if row is None or col is None:
+            return None
+        slot = self.board.slot(row, col)
+        if slot is None or time.time() - slot["received"] > self.max_age:
+            return None
+        ticker = {"symbol": symbol, "received": float(slot["received"])}
+        for key, field in zip(TICKER_KEYS, BOARD_FIELDS):
+            ticker[key] = _number(slot[field])
+        if ticker["timestamp"] is not None:
+            ticker["timestamp"] = int(ticker["timestamp"])
+        return ticker
+
+    async def run(self):
+        self.start()
+        try:
+            await super().run()
+        finally:
+            await asyncio.to_thread(self.stop)
@@ -0,0 +1,88 @@
+import heapq
+import math
+import time
+from config import CONFIG
+
+class SymbolStats:
+    __slots__ = ("mean", "var", "drift", "spread", "checked_at", "observed_at")
+
+    def __init__(self):
+        self.mean = None  # wykładniczo ważona średnia spreadu (zysk % po opłatach w lepszym kierunku)
+        self.var = 0.0  # wykładniczo ważona wariancja spreadu wokół średniej
+        self.drift = 0.0  # zmienność: średni kwadrat zmiany spreadu na sekundę
+        self.spread = None  # ostatnio zmierzony spread
+        self.checked_at = -math.inf  # kiedy symbol ostatnio trafił do przebiegu
+        self.observed_at = None  # kiedy ostatnio zmierzono spread
+
+class PollingScheduler:
+    """
+    Wybiera, które symbole sprawdzić w kolejnym przebiegu, gdy tickery są pobierane per symbol.
+    Priorytet to oszacowane prawdopodobieństwo, że spread przekroczył ARBITRAGE_THRESHOLD: rozkład normalny
+    o średniej z historii spreadu i wariancji rosnącej ze zmiennością oraz czasem od ostatniego sprawdzenia.
+    W przebiegu mieści się budget symboli, ale symbol niesprawdzany dłużej niż max_interval trafia do niego zawsze.
+    W trybie snapshotu wybór ogranicza się do kandydatów ze screeningu (select(candidates=...)) – budżetem są
+    wtedy pobrania order booków.
+    """
+    def __init__(self, symbols, budget, threshold=None, max_interval=None, alpha=None):
+        self.budget = max(1, int(budget))
+        self.threshold = threshold if threshold is not None else CONFIG.get("ARBITRAGE_THRESHOLD", 2)
+        self.max_interval = max_interval if max_interval is not None else CONFIG.get("POLL_MAX_INTERVAL", 60)
+        self.alpha = alpha if alpha is not None else CONFIG.get("POLL_EWMA_ALPHA", 0.2)
+        self.stats = {symbol: SymbolStats() for symbol in symbols}
+        self.clock = time.monotonic  # źródło czasu (w backteście – czas symulacji)
+
+    def add(self, symbol):
+        self.stats.setdefault(symbol, SymbolStats())
+
+    def discard(self, symbol):
+        self.stats.pop(symbol, None)
+
+    def record(self, symbol, spread, now=None):
+        stats = self.stats.get(symbol)
+        if stats is None or spread is None:
+            return
+        now = self.clock() if now is None else now
+        if stats.mean is None:
+            stats.mean = spread
+        else:
+            diff = spread - stats.mean
+            stats.mean += self.alpha * diff
+            stats.var = (1 - self.alpha) * (stats.var + self.alpha * diff * diff)
+            elapsed = max(now - stats.observed_at, 1e-3)
+            change = spread - stats.spread
+            stats.drift += self.alpha * (change * change / elapsed - stats.drift)
+        stats.spread = spread
+        stats.observed_at = now
+
+    def priority(self, stats, now):
+        if stats.mean is None:
+            return 1.0
+        # Ostatni pomiar waży tyle co średnia – spread wraca do średniej, ale nie natychmiast
+        center = (stats.mean + stats.spread) / 2
+        spread_var = stats.var + stats.drift * (now - stats.observed_at)
+        gap = self.threshold - center
+        if spread_var <= 0:
+            return 1.0 if gap <= 0 else 0.0
+        return 0.5 * math.erfc(gap / math.sqrt(2 * spread_var))
+
+    def select(self, now=None, candidates=None):
+        # candidates – symbole, spośród których wybieramy (domyślnie wszystkie znane schedulerowi)
+        now = self.clock() if now is None else now
+        if candidates is None:
+            items = self.stats.items()
+        else:
+            items = [(symbol, self.stats[symbol]) for symbol in candidates if symbol in self.stats]
+        due = []
+        rest = []
+        for symbol, stats in items:
+            if now - stats.checked_at >= self.max_interval:
+                due.append(symbol)
+            else:
+                # Przy równym priorytecie (np. kandydaci pewnie powyżej progu) – dłużej czekający, potem wyższy spread
+                spread = stats.spread if stats.spread is not None else -math.inf
+                rest.append((self.priority(stats, now), now - stats.checked_at, spread, symbol))
+        # Zaległe symbole mają pierwszeństwo (gwarancja max_interval), resztę budżetu dostają najbardziej obiecujące
+        selected = due + [entry[-1] for entry in heapq.nlargest(max(0, self.budget - len(due)), rest)]
+        for symbol in selected:
+            self.stats[symbol].checked_at = now
+        return selected
@@ -0,0 +1,137 @@
+import numpy as np
+from config import CONFIG
+from utils import calculate_effective_buy, calculate_effective_sell, ticker_quotes
+
+class TickerScreener:
+    """
+    Wektorowy etap tickerów: bid i ask ze snapshotu trafiają do macierzy giełda × symbol, a zysk po opłatach
+    dla obu kierunków wszystkich par liczony jest jednym przebiegiem NumPy. Dalej (do order booków)
+    przechodzą tylko kandydaci z zyskiem w przedziale [ARBITRAGE_THRESHOLD, ABSURD_THRESHOLD).
+    Przy nogach w różnych quote cena sprzedaży jest przeliczana na quote kupna kursami z fx (ConversionRates);
+    bez znanego kursu taki kandydat odpada, tak jak w check_liquidity.
+    """
+    def __init__(self, fee_rates, threshold=None, absurd_threshold=None, fx=None):
+        self.exchange_index = {name: i for i, name in enumerate(fee_rates)}  # {"binance": 0, ...}
+        self.fee_rates = np.array([fee_rates[name] for name in fee_rates], dtype=float)
+        self.threshold = threshold if threshold is not None else CONFIG.get("ARBITRAGE_THRESHOLD", 2)
+        self.absurd_threshold = absurd_threshold if absurd_threshold is not None else CONFIG.get("ABSURD_THRESHOLD", 100)
+        self.fx = fx
+        self.symbol_index = {}  # {"ABC/USDT": kolumna macierzy cen}
+        self.quote_index = {}  # {"USDT": numer quote w _entries}
+        self.columns = {name: set() for name in fee_rates}  # kolumny potrzebne dla danej giełdy
+        self._entries = []  # (pair_name, asset, kierunek, giełda kupna, kolumna kupna, giełda sprzedaży, kolumna sprzedaży,
+                            #  quote kupna, quote sprzedaży)
+        self._arrays = None
+        self._spreads = None  # najlepszy zysk % każdego aktywa (z obu kierunków) z ostatniego screen()
+
+    def _column(self, exchange_name, symbol):
+        col = self.symbol_index.setdefault(symbol, len(self.symbol_index))
+        self.columns[exchange_name].add((symbol, col))
+        return col
+
+    def _quote(self, symbol):
+        quote = symbol.split("/")[1] if "/" in symbol else symbol
+        return self.quote_index.setdefault(quote, len(self.quote_index))
+
+    def add_pair(self, pair_name, name1, name2, assets):
+        # assets: [(asset, symbol_ex1, symbol_ex2), ...]
+        e1, e2 = self.exchange_index[name1], self.exchange_index[name2]
+        for asset, symbol_ex1, symbol_ex2 in assets:
+            c1 = self._column(name1, symbol_ex1)
+            c2 = self._column(name2, symbol_ex2)
+            q1, q2 = self._quote(symbol_ex1), self._quote(symbol_ex2)
+            self._entries.append((pair_name, asset, 1, e1, c1, e2, c2, q1, q2))
+            self._entries.append((pair_name, asset, 2, e2, c2, e1, c1, q2, q1))
+        self._arrays = None
+        self._spreads = None
+
+    def remove_pair(self, pair_name):
+        # Kolumny usuniętych symboli zostają w macierzy cen (są tanie, a symbol może wrócić przy kolejnym przeładowaniu)
+        self._entries = [entry for entry in self._entries if entry[0] != pair_name]
+        self._arrays = None
+        self._spreads = None
+
+    def _build(self):
+        entries = np.array([entry[2:] for entry in self._entries], dtype=np.intp).reshape(-1, 7)
+        self._arrays = {
+            "buy_ex": entries[:, 1], "buy_col": entries[:, 2],
+            "sell_ex": entries[:, 3], "sell_col": entries[:, 4],
+            "buy_quote": entries[:, 5], "sell_quote": entries[:, 6],
+        }
+        # Indeksy wpisów z różnymi quote nóg – tylko dla nich liczymy przeliczenie kursem
+        self._arrays["mixed"] = np.flatnonzero(self._arrays["buy_quote"] != self._arrays["sell_quote"])
+        # Wpisy pary leżą obok siebie, po dwa (kierunek 1 i 2) na aktywo: {pair_name: (aktywa, pierwsze aktywo, koniec)}
+        pairs = {}
+        for i in range(0, len(self._entries), 2):
+            pair_name, asset = self._entries[i][:2]
+            assets, start, _ = pairs.setdefault(pair_name, ([], i // 2, None))
+            assets.append(asset)
+            pairs[pair_name] = (assets, start, i // 2 + 1)
+        self._arrays["pairs"] = pairs
+
+    def _quote_factors(self):
+        # Mnożnik ceny sprzedaży na quote kupna dla wpisów z różnymi quote; NaN, gdy kurs nie jest znany
+        a = self._arrays
+        rates = np.array([self.fx.rate(quote) if self.fx is not None else None for quote in self.quote_index], dtype=float)
+        mixed = a["mixed"]
+        return rates[a["sell_quote"][mixed]] / rates[a["buy_quote"][mixed]]
+
+    def price_matrix(self, tickers):
+        # (bids, asks) – kupno liczone po ask, sprzedaż po bid na każdej giełdzie
+        bids = np.full((len(self.exchange_index), len(self.symbol_index)), np.nan)
+        asks = np.full_like(bids, np.nan)
+        for name, row in self.exchange_index.items():
+            snapshot = tickers.get(name, {})
+            for symbol, col in self.columns[name]:
+                ticker = snapshot.get(symbol)
+                if ticker is not None:
+                    bid, ask = ticker_quotes(ticker)
+                    if bid is not None and ask is not None:
+                        bids[row, col] = bid
+                        asks[row, col] = ask
+        return bids, asks
+
+    def screen(self, tickers, prices=None):
+        """
+        Zwraca {pair_name: [(asset, kierunek, zysk %, cena na giełdzie 1, cena na giełdzie 2), ...]}.
+        Kierunek 1 = kupno na pierwszej giełdzie pary, 2 = kupno na drugiej.
+        prices – gotowe macierze (bids, asks) (np. z PriceBoard) zamiast budowania ich ze słowników tickerów.
+        """
+        if not self._entries:
+            return {}
+        if self._arrays is None:
+            self._build()
+        a = self._arrays
+        bids, asks = prices if prices is not None else self.price_matrix(tickers)
+        buy_prices = asks[a["buy_ex"], a["buy_col"]]
+        sell_prices = bids[a["sell_ex"], a["sell_col"]]
+        effective_buy = calculate_effective_buy(buy_prices, self.fee_rates[a["buy_ex"]])
+        effective_sell = calculate_effective_sell(sell_prices, self.fee_rates[a["sell_ex"]])
+        if len(a["mixed"]):
+            effective_sell[a["mixed"]] *= self._quote_factors()
+        with np.errstate(divide="ignore", invalid="ignore"):
+            profits = (effective_sell - effective_buy) / effective_buy * 100
+        mask = np.isfinite(profits) & (profits >= self.threshold) & (profits < self.absurd_threshold)
+        self._spreads = np.fmax(profits[0::2], profits[1::2])
+
+        candidates = {}
+        for i in np.flatnonzero(mask):
+            pair_name, asset, direction = self._entries[i][:3]
+            # price1/price2 w kolejności giełd pary, niezależnie od kierunku
+            if direction == 1:
+                price1, price2 = buy_prices[i], sell_prices[i]
+            else:
+                price1, price2 = sell_prices[i], buy_prices[i]
+            candidates.setdefault(pair_name, []).append((asset, direction, float(profits[i]), float(price1), float(price2)))
+        return candidates
+
+    def spreads(self, pair_name):
+        """
+        (aktywa, najlepszy zysk % z obu kierunków) wszystkich aktywów pary z ostatniego screen() – także tych
+        poniżej progu, np. dla statystyk PollingScheduler. NaN – brak ceny na którejś giełdzie.
+        """
+        pair = self._arrays["pairs"].get(pair_name) if self._spreads is not None else None
+        if pair is None:
+            return [], np.empty(0)
+        assets, start, end = pair
+        return assets, self._spreads[start:end]
@@ -0,0 +1,77 @@
+import numpy as np
+from utils import calculate_effective_buy, calculate_effective_sell
+
+class DepthSizer:
+    """
+    Koszt kupna i przychód ze sprzedaży jako funkcje ilości, wyznaczone ze skumulowanych tablic order booka
+    (asks strony kupna, bids strony sprzedaży). Obie funkcje są odcinkowo liniowe, więc dowolną drabinkę
+    ilości liczymy jednym wywołaniem np.interp, a zysk (funkcja wklęsła) jest maksymalny w jednym z punktów
+    załamania – wystarczy sprawdzić je wszystkie naraz.
+    """
+    def __init__(self, asks, bids, fee_buy, fee_sell, quote_factor=1.0):
+        ask_size, ask_notional = asks.cumulative()
+        bid_size, bid_notional = bids.cumulative()
+        # Punkt (0, 0) na początku, koszty i przychody już po opłatach
+        self.ask_size = np.concatenate(([0.0], ask_size))
+        self.ask_cost = calculate_effective_buy(np.concatenate(([0.0], ask_notional)), fee_buy)
+        self.bid_size = np.concatenate(([0.0], bid_size))
+        # quote_factor przelicza przychód na quote strony kupna, gdy nogi mają różne quote (np. EUR i USDT)
+        self.bid_proceeds = calculate_effective_sell(np.concatenate(([0.0], bid_notional)), fee_sell) * quote_factor
+        # Maksymalna ilość, którą da się kupić i sprzedać w pobranej głębokości
+        self.max_qty = min(self.ask_size[-1], self.bid_size[-1])
+
+    def buy_cost(self, qty):
+        return np.interp(qty, self.ask_size, self.ask_cost)
+
+    def sell_proceeds(self, qty):
+        return np.interp(qty, self.bid_size, self.bid_proceeds)
+
+    def qty_for_investment(self, investment):
+        # Ilość, którą kupimy za daną kwotę (po opłatach); odwrotność buy_cost
+        return np.interp(investment, self.ask_cost, self.ask_size)
+
+    def evaluate(self, quantities):
+        """
+        Wektorowa ocena drabinki ilości. Ilości przekraczające dostępną głębokość są przycinane
+        do max_qty i oznaczane w depth_exhausted.
+        """
+        requested = np.atleast_1d(np.asarray(quantities, dtype=float))
+        qty = np.minimum(requested, self.max_qty)
+        cost = self.buy_cost(qty)
+        proceeds = self.sell_proceeds(qty)
+        profit = proceeds - cost
+        with np.errstate(divide="ignore", invalid="ignore"):
+            profit_pct = np.where(cost > 0, profit / cost * 100, 0.0)
+            avg_buy = np.where(qty > 0, cost / qty, np.nan)
+            avg_sell = np.where(qty > 0, proceeds / qty, np.nan)
+        return {
+            "qty": qty,
+            "cost": cost,
+            "proceeds": proceeds,
+            "profit": profit,
+            "profit_pct": profit_pct,
+            "avg_buy": avg_buy,  # efektywna średnia cena kupna (po opłatach)
+            "avg_sell": avg_sell,  # efektywna średnia cena sprzedaży (po opłatach)
+            "depth_exhausted": requested > self.max_qty,
+        }
+
+    def evaluate_investments(self, investments):
+        # Drabinka kwot inwestycji (w walucie quote) przeliczona na ilości
+        investments = np.atleast_1d(np.asarray(investments, dtype=float))
+        result = self.evaluate(self.qty_for_investment(investments))
+        result["depth_exhausted"] |= investments > self.ask_cost[-1]
+        return result
+
+    def optimal(self, max_investment=None):
+        """
+        Ilość maksymalizująca zysk bezwzględny po opłatach (opcjonalnie ograniczona kwotą inwestycji).
+        Zwraca słownik jak evaluate() dla jednej ilości.
+        """
+        breakpoints = np.unique(np.concatenate((self.ask_size, self.bid_size)))
+        limit = self.max_qty
+        if max_investment is not None:
+            limit = min(limit, float(self.qty_for_investment(max_investment)))
+        candidates = np.append(breakpoints[breakpoints <= limit], limit)
+        result = self.evaluate(candidates)
+        best = int(np.argmax(result["profit"]))
+        return {key: values[best] for key, values in result.items()}
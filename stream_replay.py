@@ -0,0 +1,59 @@
+import argparse
+import asyncio
+import json
+import logging
+from aiohttp import web, WSMsgType
+
+logger = logging.getLogger(__name__)
+
+# Lokalny serwer WebSocket odtwarzający nagrany strumień giełdy (pliki z STREAM_RECORD_DIR,
+# linie "czas\tJSON"). Adapter łączy się z nim po ustawieniu STREAM_WS_URLS, np.
+# {"binance": "ws://127.0.0.1:8765"}. Wiadomości subskrypcji od klienta są ignorowane.
+
+def load_feed(path):
+    feed = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            timestamp, payload = line.split("\t", 1)
+            feed.append((float(timestamp), json.loads(payload)))
+    return feed
+
+async def replay(ws, feed, speed):
+    # speed=0 – bez opóźnień, speed=1 – w czasie rzeczywistym, speed=10 – dziesięć razy szybciej
+    previous = None
+    for timestamp, message in feed:
+        if speed > 0 and previous is not None:
+            await asyncio.sleep(max(0, timestamp - previous) / speed)
+        previous = timestamp
+        if ws.closed:
+            return
+        await ws.send_str(json.dumps(message))
+
+def create_app(feed, speed=1.0):
+    async def handle(request):
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        logger.info(f"Client connected, replaying {len(feed)} messages")
+        task = asyncio.create_task(replay(ws, feed, speed))
+        async for msg in ws:
+            if msg.type == WSMsgType.ERROR:
+                break
+        task.cancel()
+        return ws
+
+    app = web.Application()
+    app.router.add_route("GET", "/{tail:.*}", handle)
+    return app
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Replay a recorded exchange WebSocket feed on a local server")
+    parser.add_argument("feed", help="recorded feed file (time<TAB>JSON per line)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--speed", type=float, default=1.0, help="replay speed multiplier, 0 = as fast as possible")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    web.run_app(create_app(load_feed(args.feed), args.speed), host=args.host, port=args.port)
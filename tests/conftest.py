@@ -0,0 +1,25 @@
+import logging
+import os
+import sys
+import pytest
+
+# Moduły projektu leżą w katalogu głównym repozytorium (bez pakietu instalowanego przez pip)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+@pytest.fixture(autouse=True)
+def log_files_in_tmp_path(tmp_path):
+    # Import arbitrage podpina pliki arbitrage.log i arbitrage_opportunities.log w katalogu repozytorium –
+    # na czas testu te loggery piszą do plików w tmp_path
+    saved = {}
+    for name in ("arbitrage", "arbitrage_opportunities"):
+        logger = logging.getLogger(name)
+        saved[name] = logger.handlers
+        handler = logging.FileHandler(tmp_path / f"{name}.log", encoding="utf-8", delay=True)
+        handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
+        logger.handlers = [handler]
+    yield
+    for name, handlers in saved.items():
+        logger = logging.getLogger(name)
+        for handler in logger.handlers:
+            handler.close()
+        logger.handlers = handlers
@@ -0,0 +1,71 @@
+import asyncio
+import time
+from arbitrage import PairArbitrageStrategy
+from fx import ConversionRates
+from market_data import MarketDataHub
+from screening import TickerScreener
+
+class SnapshotExchange:
+    def __init__(self, name, tickers):
+        self.name = self.display_name = name
+        self.fee_rate = 0
+        self.tickers = tickers
+        self.order_books = []
+
+    async def fetch_tickers(self, symbols=None):
+        return self.tickers
+
+    async def fetch_order_book(self, symbol, limit=None):
+        self.order_books.append(symbol)
+        return None
+
+def test_stale_snapshot_leg_is_rejected_before_order_books():
+    now = time.time()
+    exchanges = {"a": SnapshotExchange("a", {"X/USDT": {"bid": 99, "ask": 100, "timestamp": None, "received": now},
+                                             "Y/USDT": {"bid": 99, "ask": 100, "timestamp": None, "received": now}}),
+                 # Y/USDT na giełdzie b to notowanie sprzed minuty, którego snapshot przestał się odświeżać
+                 "b": SnapshotExchange("b", {"X/USDT": {"bid": 110, "ask": 111, "timestamp": None, "received": now},
+                                             "Y/USDT": {"bid": 110, "ask": 111, "timestamp": (now - 60) * 1000, "received": now}})}
+    screener = TickerScreener({"a": 0, "b": 0}, threshold=1, absurd_threshold=100)
+    hub = MarketDataHub(exchanges, screener=screener)
+    strategy = PairArbitrageStrategy(exchanges["a"], exchanges["b"], ["X/USDT", "Y/USDT"], pair_name="a-b", market_data=hub)
+    screener.add_pair("a-b", "a", "b", strategy.screening_assets())
+
+    async def scenario():
+        await hub.refresh()
+        candidates = hub.candidates["a-b"]
+        # Screening widzi spread na obu aktywach – dopiero bramka wieku nóg odrzuca Y/USDT
+        assert sorted(candidate[0].key for candidate in candidates) == ["X/USDT", "Y/USDT"]
+        await strategy.scan(candidates)
+
+    asyncio.run(scenario())
+    assert sorted(exchanges["a"].order_books + exchanges["b"].order_books) == ["X/USDT", "X/USDT"]
+
+def test_ticker_stage_converts_mixed_quote_legs():
+    now = time.time()
+    exchanges = {"a": SnapshotExchange("a", {"X/EUR": {"bid": 100, "ask": 100, "timestamp": None, "received": now}}),
+                 "b": SnapshotExchange("b", {"X/USDT": {"bid": 105, "ask": 106, "timestamp": None, "received": now}})}
+    fx = ConversionRates(None, quotes=["EUR"])
+    fx.rates["EUR"] = 1.1
+    fx.updated_at["EUR"] = time.monotonic()
+    hub = MarketDataHub(exchanges, symbols={"a": {"X/EUR"}, "b": {"X/USDT"}})
+    strategy = PairArbitrageStrategy(exchanges["a"], exchanges["b"], {"X": {"a": "X/EUR", "b": "X/USDT"}},
+                                     pair_name="a-b", market_data=hub, fx=fx)
+    strategy.threshold = 1
+    checked = []
+
+    async def check_liquidity(plan, direction, profit, price1, price2):
+        checked.append((plan.key, direction, round(profit, 4), price1, price2))
+
+    strategy.check_liquidity = check_liquidity
+
+    async def scenario():
+        await hub.refresh()
+        await strategy.check_opportunity("X")
+        # Bez kursu EUR nie ma porównania – surowe ceny dawałyby pozorne 5% w kierunku 1
+        fx.rates.clear()
+        fx.updated_at.clear()
+        await strategy.check_opportunity("X")
+
+    asyncio.run(scenario())
+    assert checked == [("X", 2, round((110 - 106) / 106 * 100, 4), 100, 106)]
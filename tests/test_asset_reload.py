@@ -0,0 +1,68 @@
+import asyncio
+import logging
+from arbitrage import PairArbitrageStrategy
+from asset_reload import PairAssetReloader
+from market_data import MarketDataHub
+from screening import TickerScreener
+
+class FakeExchange:
+    def __init__(self, name):
+        self.name = self.display_name = name
+        self.fee_rate = 0
+
+    async def fetch_tickers(self, symbols=None):
+        return {}
+
+class FakeWatcher:
+    # Zamiast obserwować pliki, od razu przekazuje kolejne wersje common_assets.json do apply – jak AssetWatcher
+    def __init__(self, apply):
+        self.apply = apply
+
+    def push(self, common_assets_data):
+        self.apply(common_assets_data)
+
+def listing(*symbols, names=("a", "b")):
+    return {symbol: {name: symbol for name in names} for symbol in symbols}
+
+def screener_assets(screener, pair_key):
+    return sorted({entry[1].key for entry in screener._entries if entry[0] == pair_key})
+
+def test_pair_reloader_adds_and_removes_assets(caplog):
+    exchanges = {name: FakeExchange(name) for name in ("a", "b", "c")}
+    screener = TickerScreener({name: 0 for name in exchanges}, threshold=1, absurd_threshold=100)
+    # Snapshot obejmuje tylko giełdy a i b – para z giełdą c nie może zostać uruchomiona bez restartu
+    hub = MarketDataHub({"a": exchanges["a"], "b": exchanges["b"]}, screener=screener)
+    strategy = PairArbitrageStrategy(exchanges["a"], exchanges["b"], listing("X/USDT", "Y/USDT"), pair_name="a-b", market_data=hub)
+    screener.add_pair("a-b", "a", "b", strategy.screening_assets())
+    strategies = {"a-b": strategy}
+    reloader = PairAssetReloader(exchanges, strategies, screener, hub)
+    watcher = FakeWatcher(reloader.apply)
+
+    async def scenario():
+        with caplog.at_level(logging.INFO, logger="arbitrage"):
+            watcher.push({"a-b": listing("X/USDT", "Z/USDT"), "b-a": listing("Y/USDT"),
+                          "a-c": listing("X/USDT", names=("a", "c"))})
+        assert sorted(strategy.plan) == ["X/USDT", "Z/USDT"]
+        assert screener_assets(screener, "a-b") == ["X/USDT", "Z/USDT"]
+        # Nowa para na giełdach ze snapshotu działa jako osobne zadanie
+        assert sorted(strategies) == ["a-b", "b-a"] and len(reloader.tasks) == 1
+        assert sorted(strategies["b-a"].plan) == ["Y/USDT"]
+        assert hub.symbols == {"a": {"X/USDT", "Y/USDT", "Z/USDT"}, "b": {"X/USDT", "Y/USDT", "Z/USDT"}}
+        assert "Pair a-c is not covered" in caplog.text
+
+        # Aktywo usunięte z pliku znika ze strategii, screenera i snapshotu; nowa para b-a jest wygaszana do zera aktywów
+        watcher.push({"a-b": listing("Z/USDT")})
+        assert sorted(strategy.plan) == ["Z/USDT"]
+        assert screener_assets(screener, "a-b") == ["Z/USDT"]
+        assert strategies["b-a"].plan == {} and screener_assets(screener, "b-a") == []
+        assert hub.symbols == {"a": {"Z/USDT"}, "b": {"Z/USDT"}}
+
+        # Ten sam plik drugi raz – nic się nie zmienia
+        caplog.clear()
+        with caplog.at_level(logging.INFO, logger="arbitrage"):
+            watcher.push({"a-b": listing("Z/USDT")})
+        assert "pair assets are the same" in caplog.text
+        await reloader.close()
+        assert all(task.done() for task in reloader.tasks)
+
+    asyncio.run(scenario())
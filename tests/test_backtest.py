@@ -0,0 +1,74 @@
+import asyncio
+from arbitrage import Leg
+from backtest import RecordingExchange, ReplayClock, SimulatedExchange
+
+class StubAdapter:
+    def __init__(self, name, display_name, fee_rate=0.1):
+        self.name = name
+        self.display_name = display_name
+        self.fee_rate = fee_rate
+        self.price = 100.0
+
+    async def fetch_tickers(self, symbols=None):
+        tickers = {"X/USDT": {"symbol": "X/USDT", "timestamp": None, "bid": self.price - 1, "ask": self.price, "last": self.price},
+                   "EUR/USDT": {"symbol": "EUR/USDT", "timestamp": None, "bid": 1.07, "ask": 1.09, "last": 1.08}}
+        return {symbol: ticker for symbol, ticker in tickers.items() if not symbols or symbol in symbols}
+
+    async def fetch_order_book(self, symbol, limit=None):
+        return {"symbol": symbol, "bids": [[self.price - 1, 1, 0]], "asks": [[self.price, 1, 0]]}
+
+    async def close(self):
+        pass
+
+def record(tmp_path, adapters, fx_symbols=None):
+    async def scenario():
+        recorders = {name: RecordingExchange(name, adapter, record_dir=str(tmp_path)) for name, adapter in adapters.items()}
+        for recorder in recorders.values():
+            await recorder.fetch_tickers()
+            await recorder.fetch_order_book("X/USDT", 5)
+            if fx_symbols:
+                # Kursy ConversionRates pobierane z tego samego adaptera między snapshotami
+                await asyncio.sleep(0.01)
+                await recorder.fetch_tickers(fx_symbols)
+        for recorder in recorders.values():
+            await recorder.close()
+        return recorders
+
+    return asyncio.run(scenario())
+
+def test_record_and_replay_round_trip(tmp_path):
+    adapter = StubAdapter("kucoin", "Kucoin", fee_rate=0.08)
+    record(tmp_path, {"kucoin": adapter})
+    simulated = SimulatedExchange("kucoin", str(tmp_path / "kucoin.jsonl.gz"))
+    start, end = simulated.time_range()
+    simulated.clock = ReplayClock(start, speed=0)
+    simulated.clock.advance(end)
+    assert simulated.fee_rate == 0.08
+    tickers = asyncio.run(simulated.fetch_tickers(["X/USDT"]))
+    assert (tickers["X/USDT"]["bid"], tickers["X/USDT"]["ask"]) == (99, 100)
+    order_book = asyncio.run(simulated.fetch_order_book("X/USDT", 1))
+    assert order_book["asks"] == [[100, 1]]
+    # Przed pierwszym nagraniem replay nie zna jeszcze odpowiedzi
+    simulated.clock.advance(start - 10)
+    assert asyncio.run(simulated.fetch_tickers()) == {}
+
+def test_recorded_and_replayed_legs_are_labelled_by_venue(tmp_path):
+    recorders = record(tmp_path, {"binance": StubAdapter("binance", "Binance"), "bitget": StubAdapter("bitget", "Bitget")})
+    leg = Leg(1, recorders["binance"], recorders["bitget"])
+    assert (leg.buy_label, leg.sell_label) == ("Binance", "Bitget")
+    replayed = {name: SimulatedExchange(name, str(tmp_path / f"{name}.jsonl.gz")) for name in recorders}
+    leg = Leg(2, replayed["bitget"], replayed["binance"])
+    assert (leg.buy_label, leg.sell_label) == ("Bitget", "Binance")
+
+def test_subset_tickers_do_not_replace_the_snapshot(tmp_path):
+    record(tmp_path, {"binance": StubAdapter("binance", "Binance")}, fx_symbols=["EUR/USDT"])
+    simulated = SimulatedExchange("binance", str(tmp_path / "binance.jsonl.gz"))
+    start, end = simulated.time_range()
+    simulated.clock = ReplayClock(start, speed=0)
+    simulated.clock.advance(end)
+    # Po zapytaniu o kursy pełny snapshot nadal zawiera wszystkie symbole
+    assert set(asyncio.run(simulated.fetch_tickers())) == {"X/USDT", "EUR/USDT"}
+    assert asyncio.run(simulated.fetch_tickers(["X/USDT"]))["X/USDT"]["ask"] == 100
+    assert list(asyncio.run(simulated.fetch_tickers(["EUR/USDT"]))) == ["EUR/USDT"]
+    # Zapytanie o kursy nie jest dodatkowym krokiem symulacji
+    assert len(simulated.timestamps()) == 1
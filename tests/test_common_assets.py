@@ -0,0 +1,77 @@
+import asyncio
+import json
+import time
+import common_assets
+from common_assets import load_discovery_cache, load_markets_cached, save_discovery_cache
+from exchanges.base import ExchangeAdapter
+
+class MarketsExchange:
+    display_name = "Test"
+
+    def __init__(self, markets=None):
+        self.markets = markets
+        self.loads = 0
+        self.seeded = None
+
+    async def load_markets(self):
+        self.loads += 1
+        if self.markets is None:
+            raise RuntimeError("exchange down")
+        return self.markets
+
+    def seed_symbol_map(self, ids):
+        self.seeded = ids
+
+MARKETS = {"X/USDT": {"id": "XUSDT", "spot": True}, "X/BTC": {"id": "XBTC", "spot": True},
+           "Y/USDT": {"id": "YUSDT", "spot": True}}
+
+def test_discovery_cache_round_trip(tmp_path):
+    path = str(tmp_path / "cache.json")
+    assert load_discovery_cache(path) == {"markets": {}, "liquidity": {}}
+    cache = load_discovery_cache(path)
+    cache["liquidity"]["a"] = {"X/USDT": {"asks": 1, "bids": 2, "levels": 1, "checked": 5}}
+    save_discovery_cache(cache, path)
+    assert load_discovery_cache(path) == cache
+    (tmp_path / "cache.json").write_text("{broken")
+    assert load_discovery_cache(path) == {"markets": {}, "liquidity": {}}
+
+def test_markets_are_cached_with_ids_and_reused(monkeypatch):
+    monkeypatch.setitem(common_assets.CONFIG, "MARKETS_CACHE_TTL", 60)
+    cache = {"markets": {}, "liquidity": {}}
+    exchange = MarketsExchange(MARKETS)
+    markets = asyncio.run(load_markets_cached("a", exchange, ["USDT"], cache))
+    assert markets == {"X/USDT": "X/USDT", "Y/USDT": "Y/USDT"}
+    entry = cache["markets"]["a"]
+    assert entry["symbols"] == ["X/USDT", "Y/USDT"] and entry["ids"] == {"X/USDT": "XUSDT", "Y/USDT": "YUSDT"}
+    # Ciepły start: bez load_markets, a adapter dostaje id rynków z cache
+    warm = MarketsExchange(MARKETS)
+    assert asyncio.run(load_markets_cached("a", warm, ["USDT"], json.loads(json.dumps(cache)))) == markets
+    assert warm.loads == 0 and warm.seeded == entry["ids"]
+
+def test_expired_or_different_quotes_reload_markets(monkeypatch):
+    monkeypatch.setitem(common_assets.CONFIG, "MARKETS_CACHE_TTL", 60)
+    cache = {"markets": {"a": {"updated": time.time() - 61, "quotes": ["USDT"], "symbols": ["X/USDT"]}}, "liquidity": {}}
+    exchange = MarketsExchange(MARKETS)
+    assert set(asyncio.run(load_markets_cached("a", exchange, ["USDT"], cache))) == {"X/USDT", "Y/USDT"}
+    assert exchange.loads == 1
+    assert set(asyncio.run(load_markets_cached("a", exchange, ["BTC", "USDT"], cache))) == {"X/USDT", "X/BTC", "Y/USDT"}
+    assert exchange.loads == 2 and cache["markets"]["a"]["quotes"] == ["BTC", "USDT"]
+
+def test_failed_load_falls_back_to_stale_cache(monkeypatch):
+    monkeypatch.setitem(common_assets.CONFIG, "MARKETS_CACHE_TTL", 60)
+    entry = {"updated": 0, "quotes": ["USDT"], "symbols": ["X/USDT"], "ids": {"X/USDT": "XUSDT"}}
+    cache = {"markets": {"a": dict(entry)}, "liquidity": {}}
+    exchange = MarketsExchange(None)
+    assert asyncio.run(load_markets_cached("a", exchange, ["USDT"], cache)) == {"X/USDT": "X/USDT"}
+    assert cache["markets"]["a"] == entry and exchange.seeded == entry["ids"]
+
+def test_seeded_adapter_resolves_ids_without_load_markets():
+    adapter = ExchangeAdapter("binance")
+
+    async def no_load_markets():
+        raise AssertionError("load_markets called")
+
+    adapter.load_markets = no_load_markets
+    adapter.seed_symbol_map({"X/USDT": "XUSDT"})
+    symbol_map = asyncio.run(adapter._symbols())
+    assert symbol_map.ids == {"X/USDT": "XUSDT"} and symbol_map.symbols == {"XUSDT": "X/USDT"}
@@ -0,0 +1,44 @@
+import pytest
+from cross_venue import BestQuoteBook, build_universe
+
+def test_best_quote_book_with_an_empty_side_on_one_venue():
+    book = BestQuoteBook({"a": 0, "b": 0, "c": 0}, threshold=1, absurd_threshold=100)
+    # Giełda a ma tylko stronę ask, b tylko bid – najlepsze ceny i tak składają się z obu
+    book.update("a", "X/USDT", None, 100)
+    assert "X/USDT" not in book.best
+    book.update("b", "X/USDT", 105, None)
+    assert book.best["X/USDT"] == ("a", 100, "b", 105)
+    assert book.opportunities["X/USDT"] == pytest.approx(5)
+    # Po zniknięciu jedynej strony bid nie ma już najlepszej giełdy sprzedaży ani okazji
+    book.remove("b", "X/USDT")
+    assert "X/USDT" not in book.best and "X/USDT" not in book.opportunities
+    # Ta sama giełda najtańsza i najdroższa – brak okazji
+    book.update("c", "X/USDT", 99, 99.5)
+    assert book.best["X/USDT"] == ("c", 99.5, "c", 99)
+    assert "X/USDT" not in book.opportunities
+
+def test_best_quote_book_applies_fees():
+    book = BestQuoteBook({"a": 1, "b": 1}, threshold=1, absurd_threshold=100)
+    book.update("a", "X/USDT", 99, 100)
+    book.update("b", "X/USDT", 102, 103)
+    _, effective_ask, _, effective_bid = book.best["X/USDT"]
+    assert (effective_ask, effective_bid) == (pytest.approx(101), pytest.approx(100.98))
+    assert "X/USDT" not in book.opportunities
+
+def test_build_universe_keys_cross_quote_symbols_by_usdt():
+    common_assets = {
+        "binance-bitstamp": {"X/EUR": {"binance": "X/USDT", "bitstamp": "X/EUR"}},
+        "bitstamp-kucoin": {"X/EUR": {"bitstamp": "X/EUR", "kucoin": "X/EUR"},
+                            "X/USDT": {"bitstamp": "X/USDT", "kucoin": "X/USDT"}},
+        "binance-kucoin": {"Y/BTC": {"binance": "Y/BTC"}},
+    }
+    assert build_universe(common_assets) == {
+        "X/EUR": {"binance": "X/USDT", "bitstamp": "X/EUR", "kucoin": "X/EUR"},
+        "X/USDT": {"bitstamp": "X/USDT", "kucoin": "X/USDT"},
+        "Y/BTC": {"binance": "Y/BTC", "kucoin": "Y/BTC"},
+    }
+    # Wspólny klucz "X/USDT"; giełda notująca aktywo w kilku quote dostaje symbol w USDT
+    assert build_universe(common_assets, cross_quote=True) == {
+        "X/USDT": {"binance": "X/USDT", "bitstamp": "X/USDT", "kucoin": "X/USDT"},
+        "Y/USDT": {"binance": "Y/BTC", "kucoin": "Y/BTC"},
+    }
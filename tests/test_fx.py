@@ -0,0 +1,75 @@
+import asyncio
+import pytest
+import fx
+from fx import ConversionRates
+
+class TickerExchange:
+    def __init__(self, tickers):
+        self.tickers = tickers
+        self.requests = []
+
+    async def fetch_tickers(self, symbols=None):
+        self.requests.append(symbols)
+        return {symbol: self.tickers[symbol] for symbol in symbols if symbol in self.tickers}
+
+class Clock:
+    def __init__(self):
+        self.now = 100.0
+
+    def monotonic(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(fx, "time", clock)
+    return clock
+
+def refreshed(tickers, quotes=("EUR", "BTC", "USDT"), ttl=60):
+    exchange = TickerExchange(tickers)
+    rates = ConversionRates(exchange, quotes=set(quotes), ttl=ttl)
+    asyncio.run(rates.refresh())
+    return rates, exchange
+
+def test_rates_expire_after_ttl(clock):
+    rates, exchange = refreshed({"EUR/USDT": {"last": 1.1}})
+    assert exchange.requests == [["BTC/USDT", "EUR/USDT"]]
+    assert rates.rate("EUR") == 1.1
+    clock.now += 60
+    assert rates.rate("EUR") == 1.1
+    clock.now += 1
+    assert rates.rate("EUR") is None
+    assert rates.factor("EUR", "USDT") is None
+    # Quote bazowy nie wygasa
+    assert rates.rate("USDT") == 1.0
+
+def test_conversions_in_both_directions(clock):
+    rates, _ = refreshed({"EUR/USDT": {"last": 1.25}, "BTC/USDT": {"last": None, "bid": 49000, "ask": 51000}})
+    # Bez ceny ostatniej transakcji kurs to środek spreadu
+    assert rates.rate("BTC") == 50000
+    assert rates.to_base(10, "EUR") == pytest.approx(12.5)
+    assert rates.from_base(12.5, "EUR") == pytest.approx(10)
+    assert rates.factor("EUR", "USDT") == pytest.approx(1.25)
+    assert rates.factor("USDT", "EUR") == pytest.approx(0.8)
+    assert rates.factor("BTC", "EUR") == pytest.approx(40000)
+    assert rates.factor("EUR", "EUR") == 1.0
+
+def test_missing_quotes_have_no_rate(clock):
+    rates, _ = refreshed({"EUR/USDT": {"last": 1.1}})
+    assert rates.rate("BTC") is None and rates.rate("GBP") is None
+    assert rates.from_base(100, "BTC") is None
+    assert rates.factor("BTC", "EUR") is None and rates.factor("EUR", "BTC") is None
+
+def test_failed_refresh_keeps_previous_rates(clock):
+    rates, exchange = refreshed({"EUR/USDT": {"last": 1.1}})
+    exchange.tickers = {}
+    clock.now += 10
+    asyncio.run(rates.refresh())
+    assert rates.rate("EUR") == 1.1
+
+def test_fx_exchange_falls_back_to_first_available(monkeypatch):
+    exchanges = {"kucoin": TickerExchange({}), "bitget": TickerExchange({})}
+    monkeypatch.setitem(fx.CONFIG, "FX_EXCHANGE", "binance")
+    assert ConversionRates.for_exchanges(exchanges).exchange is exchanges["kucoin"]
+    monkeypatch.setitem(fx.CONFIG, "FX_EXCHANGE", "bitget")
+    assert ConversionRates.for_exchanges(exchanges).exchange is exchanges["bitget"]
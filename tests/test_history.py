@@ -0,0 +1,72 @@
+import logging
+import numpy as np
+import history
+from history import RECORD_DTYPE, HistoryStore, main, merge_runs, sort_order
+
+def line(time, pair, asset, profit):
+    return (f"2025-03-10 {time},700 - INFO - Pair: {pair} | Asset: {{'kucoin': '{asset}', 'bitget': '{asset}'}} | "
+            f"Buy (BitgetExchange eff.): 0.494540 | Sell (KucoinExchange eff.): 0.612043 | Ticker Profit: 25.43% | "
+            f"Liquidity Profit: {profit}% | Profit (USDT): 47.737463 | Invested (USDT): 200.913196 | "
+            f"Qty Purchased: 406.2631 | Liquidity Info: Buy Levels: [[0.4918, 2.2603]]; Sell Levels: [[0.6135, 181.8695]]\n")
+
+def write_log(path, lines):
+    path.write_text("".join(lines), encoding="utf-8")
+    return str(path)
+
+def test_import_builds_groups_and_frequency(tmp_path, capsys, caplog, monkeypatch):
+    # Małe przebiegi – każdy plik jest dzielony na kilka posortowanych kawałków scalanych na dysku
+    monkeypatch.setattr(history, "RUN_ROWS", 2)
+    first = write_log(tmp_path / "first.log", [
+        line("05:34:10", "kucoin-bitget", "WEMIX/USDT", "23.76"),
+        line("05:36:33", "kucoin-bitget", "BROCCOLI/USDT", "30.56"),
+        "2025-03-10 05:40:00,000 - INFO - Triangular | Cycle: a -> b | Profit: 0.2%\n",
+        line("05:42:27", "kucoin-bitget", "WEMIX/USDT", "23.30"),
+    ])
+    # Drugi plik powtarza jedną linię pierwszego – duplikat nie może trafić do magazynu
+    second = write_log(tmp_path / "second.log", [
+        line("05:34:10", "kucoin-bitget", "WEMIX/USDT", "23.76"),
+        line("05:35:00", "binance-bitget", "WEMIX/USDT", "5.00"),
+        line("05:30:00", "kucoin-bitget", "WEMIX/USDT", "10.00"),
+    ])
+    store_path = str(tmp_path / "store")
+    store = HistoryStore(store_path)
+    with caplog.at_level(logging.INFO, logger="history"):
+        assert store.import_files([first, second]) == 5
+    assert f"{first}: 3 records" in caplog.text and f"{second}: 3 records" in caplog.text
+
+    store = HistoryStore.open(store_path)
+    groups = {(store.names["assets"].values[g["asset"]], store.names["pairs"].values[g["pair"]]): g["end"] - g["start"]
+              for g in store.index}
+    assert groups == {("WEMIX/USDT", "kucoin-bitget"): 3, ("BROCCOLI/USDT", "kucoin-bitget"): 1,
+                      ("WEMIX/USDT", "binance-bitget"): 1}
+    assert store.frequency() == [("WEMIX/USDT", 4), ("BROCCOLI/USDT", 1)]
+    assert store.frequency(pair="kucoin-bitget", min_profit=20) == [("WEMIX/USDT", 2), ("BROCCOLI/USDT", 1)]
+    wemix = store.select("WEMIX", "kucoin-bitget")
+    assert np.all(np.diff(wemix["timestamp"]) > 0)
+
+    # Ponowny import tych samych plików nie zmienia magazynu, a katalog nie zawiera pozostałości po scalaniu
+    assert store.import_files([first, second]) == 5
+    assert sorted(p.name for p in (tmp_path / "store").iterdir()) == ["index.npy", "names.json", "records.npy"]
+
+    capsys.readouterr()
+    main(["--store", store_path, "freq"])
+    output = capsys.readouterr().out.split("\n")
+    assert output[0].split() == ["WEMIX/USDT", "4"]
+    assert output[1].split() == ["BROCCOLI/USDT", "1"]
+
+def test_merge_runs_deduplicates_across_blocks():
+    rng = np.random.default_rng(0)
+    records = np.zeros(200, dtype=RECORD_DTYPE)
+    records["asset"] = rng.integers(0, 4, len(records))
+    records["pair"] = rng.integers(0, 2, len(records))
+    records["timestamp"] = rng.integers(0, 10, len(records))
+    records["profit"] = rng.integers(0, 2, len(records))
+    runs = [part[sort_order(part)] for part in (records[:120], records[80:], records[::3])]
+
+    batches = []
+    total = merge_runs(runs, batches.append, block_rows=7)
+    merged = np.concatenate(batches)
+    expected = np.unique(records)
+    expected = expected[sort_order(expected)]
+    assert total == len(merged)
+    assert merged.tobytes() == expected.tobytes()
@@ -0,0 +1,181 @@
+import asyncio
+import json
+import numpy as np
+import pytest
+import time
+from fx import ConversionRates
+from orderbook import BookSide, OrderBook
+from sizing import DepthSizer
+from price_board import PriceBoard, ShardedMarketData, BOARD_FIELDS
+from screening import TickerScreener
+from exchanges.request_cache import RequestCache
+from exchanges.raw import BinanceRaw, KucoinRaw, RawApi
+from utils import ticker_quotes
+
+def book(asks, bids):
+    return OrderBook.from_ccxt({"asks": asks, "bids": bids})
+
+def test_book_side_replace_grows_and_keeps_order():
+    bids = BookSide(descending=True, capacity=2)
+    bids.replace([[102, 2], [101, 3], [100, 1], [99, 4]])
+    assert list(bids) == [(102, 2), (101, 3), (100, 1), (99, 4)]
+    assert bids.best() == (102, 2)
+
+def test_book_side_cumulative_after_replace():
+    asks = book([[10, 1], [11, 2], [12, 3]], []).asks
+    size, notional = asks.cumulative()
+    assert size.tolist() == [1, 3, 6]
+    assert notional.tolist() == [10, 32, 68]
+    asks.replace([[10, 1], [11, 1]])
+    size, notional = asks.cumulative(2)
+    assert size.tolist() == [1, 2]
+    assert notional.tolist() == [10, 21]
+
+def test_depth_sizer_interpolates_cost_and_proceeds():
+    ob_buy = book([[10, 1], [20, 1]], [])
+    ob_sell = book([], [[30, 2]])
+    sizer = DepthSizer(ob_buy.asks, ob_sell.bids, 0, 0)
+    result = sizer.evaluate([0.5, 1.5, 3])
+    assert result["cost"].tolist() == pytest.approx([5, 20, 30])
+    assert result["proceeds"].tolist() == pytest.approx([15, 45, 60])
+    assert result["depth_exhausted"].tolist() == [False, False, True]
+    assert float(sizer.qty_for_investment(20)) == pytest.approx(1.5)
+
+def test_depth_sizer_optimal_stops_where_profit_ends():
+    # Drugi poziom asków jest droższy niż bid – optimum to cały pierwszy poziom
+    sizer = DepthSizer(book([[10, 1], [40, 1]], []).asks, book([], [[30, 5]]).bids, 0, 0)
+    best = sizer.optimal()
+    assert best["qty"] == pytest.approx(1)
+    assert best["profit"] == pytest.approx(20)
+
+def test_price_board_publish_read_and_torn_slot():
+    board = PriceBoard(["a", "b"], ["X/USDT", "Y/USDT"])
+    try:
+        values = np.array([[1, 2, 1.5, 10, 20, 1000, 5]], dtype=float)
+        board.publish(1, np.array([0]), values)
+        slot = board.slot(1, 0)
+        assert [float(slot[field]) for field in BOARD_FIELDS] == values[0].tolist()
+        assert slot["seq"] == 2
+        rows, cols = np.array([1, 0]), np.array([0, 1])
+        result = board.read(rows, cols)
+        assert result["received"].tolist() == [5, 0]
+        # Nieparzysty licznik = zapis w toku: slot nie jest zwracany
+        board.slots["seq"][1, 0] += 1
+        assert board.slot(1, 0) is None
+        assert board.read(rows, cols)["received"].tolist() == [0, 0]
+    finally:
+        board.close()
+
+def test_price_board_attach_by_name_shares_memory():
+    board = PriceBoard(["a"], ["X/USDT"])
+    try:
+        other = PriceBoard(*board.spec())
+        board.publish(0, np.array([0]), np.array([[1, 2, 1.5, 0, 0, 0, 7]], dtype=float))
+        assert float(other.slot(0, 0)["received"]) == 7
+        other.close()
+    finally:
+        board.close()
+
+@pytest.mark.parametrize("rate_share", [0, 1, -0.5])
+def test_sharded_market_data_rejects_rate_share_without_budget(rate_share):
+    # Przy 0 limiter procesu tickerów nie ma tokenów, przy 1 proces strategii nie ma budżetu na order booki
+    with pytest.raises(ValueError, match="SHARD_RATE_SHARE"):
+        ShardedMarketData({"a": None}, rate_share=rate_share)
+
+def test_request_cache_single_flight_and_ttl():
+    async def scenario():
+        calls = []
+
+        async def fetch():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return {"n": len(calls)}
+
+        cache = RequestCache(ttl={"fetch_ticker": 60}, max_size=10)
+        first, second = await asyncio.gather(cache.get_or_fetch("fetch_ticker", "X", fetch),
+                                             cache.get_or_fetch("fetch_ticker", "X", fetch))
+        third = await cache.get_or_fetch("fetch_ticker", "X", fetch)
+        return calls, first, second, third
+
+    calls, first, second, third = asyncio.run(scenario())
+    assert len(calls) == 1
+    assert first is second is third
+
+def test_request_cache_does_not_store_failures():
+    async def scenario():
+        results = iter([None, {"ok": True}])
+
+        async def fetch():
+            return next(results)
+
+        cache = RequestCache(ttl={"fetch_ticker": 60})
+        return [await cache.get_or_fetch("fetch_ticker", "X", fetch) for _ in range(2)]
+
+    assert asyncio.run(scenario()) == [None, {"ok": True}]
+
+def test_raw_book_tickers_keep_last_trade_meaning():
+    binance = BinanceRaw().parse_tickers([{"symbol": "XUSDT", "bidPrice": "1", "askPrice": "2", "bidQty": "3", "askQty": "4"}])
+    assert binance["XUSDT"].last is None
+    assert ticker_quotes(binance["XUSDT"]) == (1, 2)
+    kucoin = KucoinRaw().parse_tickers({"data": {"time": 1, "ticker": [
+        {"symbol": "X-USDT", "buy": "1", "sell": "2", "bestBidSize": "1", "bestAskSize": "1", "last": "1.9"}]}})
+    assert kucoin["X-USDT"].last == 1.9
+
+def test_raw_api_subclass_without_parser_fails_on_construction():
+    class PartialRaw(RawApi):
+        def tickers_request(self):
+            return "/tickers", None
+
+        def ticker_request(self, market_id):
+            return "/ticker", {"symbol": market_id}
+
+        def depth_request(self, market_id, limit):
+            return "/depth", {"symbol": market_id}
+
+    # Brak parse_tickers wychodzi przy tworzeniu adaptera, a nie przy pierwszym pobraniu tickerów
+    with pytest.raises(TypeError, match="parse_tickers"):
+        PartialRaw()
+    with pytest.raises(TypeError):
+        RawApi()
+
+def test_screener_buys_at_ask_and_sells_at_bid():
+    screener = TickerScreener({"a": 0, "b": 0}, threshold=1, absurd_threshold=100)
+    screener.add_pair("a-b", "a", "b", [("X", "X/USDT", "X/USDT")])
+    tickers = {"a": {"X/USDT": {"bid": 99, "ask": 100, "last": 100}},
+               "b": {"X/USDT": {"bid": 100.5, "ask": 111, "last": 110}}}
+    # Po cenach ostatnich transakcji byłoby 10%, po bid/ask tylko 0,5% – poniżej progu
+    assert screener.screen(tickers) == {}
+    tickers["b"]["X/USDT"]["bid"] = 105
+    candidates = screener.screen(tickers)["a-b"]
+    assert [(asset, direction, price1, price2) for asset, direction, _, price1, price2 in candidates] == [("X", 1, 100, 105)]
+    assert candidates[0][2] == pytest.approx(5)
+
+def eur_rates(rate):
+    fx = ConversionRates(None, quotes=["EUR"])
+    fx.rates["EUR"] = rate
+    fx.updated_at["EUR"] = time.monotonic()
+    return fx
+
+def test_screener_converts_mixed_quote_legs():
+    tickers = {"a": {"X/EUR": {"bid": 100, "ask": 100}}, "b": {"X/USDT": {"bid": 105, "ask": 106}}}
+    # Bez kursu EUR para o różnych quote nie przechodzi (surowe ceny dawałyby pozorne 5%)
+    screener = TickerScreener({"a": 0, "b": 0}, threshold=1, absurd_threshold=100)
+    screener.add_pair("a-b", "a", "b", [("X", "X/EUR", "X/USDT")])
+    assert screener.screen(tickers) == {}
+
+    # 100 EUR = 110 USDT: opłaca się kupno na b po 106 USDT i sprzedaż na a
+    screener = TickerScreener({"a": 0, "b": 0}, threshold=1, absurd_threshold=100, fx=eur_rates(1.1))
+    screener.add_pair("a-b", "a", "b", [("X", "X/EUR", "X/USDT")])
+    candidates = screener.screen(tickers)["a-b"]
+    assert [(asset, direction, price1, price2) for asset, direction, _, price1, price2 in candidates] == [("X", 2, 100, 106)]
+    assert candidates[0][2] == pytest.approx((110 - 106) / 106 * 100)
+
+def test_benchmark_smoke(tmp_path):
+    import benchmark
+    output = tmp_path / "bench.json"
+    code = benchmark.main(["--symbols", "30", "--duration", "3", "--latency", "0.01", "--inject-interval", "1",
+                           "--json", str(output), "--max-cycle-time", "5"])
+    assert code == 0
+    results = json.loads(output.read_text())
+    assert results["discovery"]["common_assets"] > 0
+    assert results["arbitrage"]["scan"] is not None
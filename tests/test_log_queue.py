@@ -0,0 +1,100 @@
+import logging
+import multiprocessing
+import os
+import subprocess
+import sys
+import log_queue
+from log_queue import Lazy, SampledLog, process_listener, queued, stop_listeners, worker_logging
+
+class ListHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.messages = []
+
+    def emit(self, record):
+        self.messages.append(record.getMessage())
+
+def queued_logger(name, handler):
+    logger = logging.getLogger(name)
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    logger.handlers = [queued(handler)]
+    return logger
+
+def test_mutable_args_are_snapshotted_before_queueing():
+    target = ListHandler()
+    logger = queued_logger("test_log_queue.snapshot", target)
+    calls = []
+    levels = [1, 2]
+    asset = {"kucoin": "ABC/USDT"}
+    logger.info("Asset: %s | Profit: %.2f%% | Levels: %s", asset, 1.5, Lazy(lambda: calls.append(1) or levels))
+    assert calls == []  # Lazy liczony dopiero w wątku logowania
+    asset["kucoin"] = "XYZ/USDT"
+    stop_listeners()
+    assert target.messages == ["Asset: {'kucoin': 'ABC/USDT'} | Profit: 1.50% | Levels: [1, 2]"]
+    assert calls == [1]
+
+def test_sampled_log_suppresses_repeats_per_key(monkeypatch):
+    target = ListHandler()
+    logger = logging.getLogger("test_log_queue.sampled")
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    logger.handlers = [target]
+    now = [100.0]
+    monkeypatch.setattr(log_queue.time, "monotonic", lambda: now[0])
+    sampled = SampledLog(logger, interval=10)
+
+    sampled.info("a", "below %s", "ABC")
+    sampled.info("a", "below %s", "ABC")
+    sampled.info("b", "below %s", "XYZ")
+    now[0] += 5
+    sampled.info("a", "below %s", "ABC")
+    now[0] += 6
+    sampled.info("a", "below %s", "ABC")
+    sampled.log(logging.DEBUG, "a", "debug %s", "ABC")
+    assert target.messages == ["below ABC", "below XYZ", "below ABC (2 similar messages suppressed)"]
+
+    unsampled = SampledLog(logger, interval=0)
+    unsampled.warning("a", "error")
+    unsampled.warning("a", "error")
+    assert target.messages[-2:] == ["error", "error"]
+
+def test_listener_is_flushed_at_exit(tmp_path):
+    # Proces kończy się bez jawnego stop_listeners – rekordy z kolejki zapisuje handler atexit
+    path = tmp_path / "out.log"
+    script = (
+        "import logging\n"
+        "from log_queue import queued\n"
+        f"handler = logging.FileHandler({str(path)!r})\n"
+        "logger = logging.getLogger('exit_test')\n"
+        "logger.setLevel(logging.INFO)\n"
+        "logger.addHandler(queued(handler))\n"
+        "for i in range(1000):\n"
+        "    logger.info('line %d', i)\n"
+    )
+    root = os.path.dirname(log_queue.__file__)
+    subprocess.run([sys.executable, "-c", script], cwd=root, check=True, timeout=60)
+    lines = path.read_text().splitlines()
+    assert len(lines) == 1000 and lines[-1] == "line 999"
+
+def log_from_worker(log_queue):
+    worker_logging(log_queue)
+    logging.getLogger("test_log_queue.worker").warning("failed to publish tickers for %s", "binance")
+    logging.getLogger("test_log_queue.worker").debug("not sent")
+
+def test_worker_process_logs_reach_parent_handlers():
+    target = ListHandler()
+    logger = logging.getLogger("test_log_queue.worker")
+    logger.propagate = False
+    logger.handlers = [target]
+    context = multiprocessing.get_context("spawn")
+    log_queue = context.Queue()
+    listener = process_listener(log_queue)
+    try:
+        process = context.Process(target=log_from_worker, args=(log_queue,))
+        process.start()
+        process.join(timeout=60)
+        assert process.exitcode == 0
+    finally:
+        listener.stop()
+    assert target.messages == ["failed to publish tickers for binance"]
@@ -0,0 +1,55 @@
+import asyncio
+import socket
+import aiohttp
+import metrics
+from metrics import Counter, Gauge, Histogram, render, start_metrics_server
+
+def test_metrics_register_and_render():
+    counter = Counter("test_requests_total", "Requests", ("exchange", "outcome"))
+    gauge = Gauge("test_waiting", "Waiting", ("exchange",))
+    histogram = Histogram("test_latency_seconds", "Latency", ("exchange",), buckets=(0.1, 1))
+    try:
+        counter.labels("binance", "ok").inc()
+        counter.labels("binance", "ok").inc(2)
+        counter.labels('kucoin"x', "error").inc()
+        gauge.labels("binance").set(5)
+        gauge.labels("binance").dec()
+        for value in (0.05, 0.5, 3):
+            histogram.labels("binance").observe(value)
+
+        text = render()
+        assert "# TYPE test_requests_total counter" in text
+        assert 'test_requests_total{exchange="binance",outcome="ok"} 3.0' in text
+        assert 'test_requests_total{exchange="kucoin\\"x",outcome="error"} 1.0' in text
+        assert 'test_waiting{exchange="binance"} 4.0' in text
+        assert 'test_latency_seconds_bucket{exchange="binance",le="0.1"} 1' in text
+        assert 'test_latency_seconds_bucket{exchange="binance",le="1.0"} 2' in text
+        assert 'test_latency_seconds_bucket{exchange="binance",le="+Inf"} 3' in text
+        assert 'test_latency_seconds_count{exchange="binance"} 3' in text
+        assert 'test_latency_seconds_sum{exchange="binance"} 3.55' in text
+        # Metryki modułu są zarejestrowane przy imporcie
+        assert "# TYPE arbitrage_exchange_requests_total counter" in text
+    finally:
+        for metric in (counter, gauge, histogram):
+            metrics._metrics.remove(metric)
+
+def test_metrics_endpoint_serves_registry():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+
+    async def scenario():
+        assert await start_metrics_server(port=0) is None  # port 0 / brak portu – endpoint wyłączony
+        runner = await start_metrics_server("127.0.0.1", port)
+        try:
+            metrics.OPPORTUNITIES.labels("test-pair", "profitable").inc()
+            async with aiohttp.ClientSession() as session:
+                async with session.get(f"http://127.0.0.1:{port}/metrics") as response:
+                    assert response.status == 200
+                    assert response.headers["Content-Type"].startswith("text/plain; version=0.0.4")
+                    body = await response.text()
+        finally:
+            await runner.cleanup()
+        assert 'arbitrage_opportunities_total{pair="test-pair",outcome="profitable"}' in body
+
+    asyncio.run(scenario())
@@ -0,0 +1,28 @@
+import asyncio
+import logging
+import numpy as np
+from orderbook import OrderBook
+from opportunity_store import OpportunityRecorder, load_opportunities
+
+def test_recorded_batch_reads_back_through_memmap(tmp_path, caplog):
+    path = tmp_path / "opportunities.bin"
+    book = OrderBook.from_ccxt({"asks": [[10, 1], [11, 2]], "bids": [[12, 3]]})
+    recorder = OpportunityRecorder(path=str(path), depth=3, batch_size=2)
+    # Konstruktor działa na pętli zdarzeń – plik powstaje dopiero przy zapisie partii w wątku
+    assert not path.exists()
+    with caplog.at_level(logging.WARNING, logger="arbitrage"):
+        for timestamp, pair in ((1.5, "binance-kucoin"), (2.5, "binance-kucoin-" + "x" * 20)):
+            recorder.record(pair, "ABC", "Binance", "Kucoin", "ABC/USDT", "ABC/USDT", "USDT", 1,
+                            10, 12, 10.01, 11.99, 19.8, 19.7, 1.97, 10.01, 1, False, book.asks, book.bids, timestamp)
+    assert "pair value" in caplog.text
+    asyncio.run(recorder.flush())
+
+    records = load_opportunities(str(path))
+    assert isinstance(records, np.memmap)
+    assert records["timestamp"].tolist() == [1.5, 2.5]
+    assert records["pair"][0] == b"binance-kucoin"
+    assert len(records["pair"][1]) == 24
+    assert records["asset"][0] == b"ABC" and records["direction"][0] == 1
+    assert records["liquidity_profit"][0] == 19.7
+    assert records["ask_prices"][0][:2].tolist() == [10, 11] and np.isnan(records["ask_prices"][0][2])
+    assert records["bid_sizes"][0][0] == 3
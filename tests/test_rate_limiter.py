@@ -0,0 +1,105 @@
+import asyncio
+from types import SimpleNamespace
+import ccxt.async_support as ccxt
+import pytest
+from exchanges import rate_limiter
+from exchanges.rate_limiter import TokenBucketLimiter
+
+class FakeClock:
+    # Czas limitera przesuwany tylko przez jego własne sleep() – przebieg nie zależy od zegara maszyny
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+    async def sleep(self, delay):
+        self.now += max(0, delay)
+        await asyncio.sleep(0)
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(rate_limiter, "time", clock)
+    monkeypatch.setattr(rate_limiter, "asyncio", SimpleNamespace(
+        sleep=clock.sleep, Lock=asyncio.Lock, CancelledError=asyncio.CancelledError))
+    return clock
+
+def acquire_all(clock, limiter, weights):
+    async def scenario():
+        done = []
+
+        async def acquire(i, weight):
+            await limiter.acquire(weight)
+            done.append((i, clock.now - 1000))
+
+        await asyncio.gather(*(acquire(i, weight) for i, weight in enumerate(weights)))
+        return done
+
+    return asyncio.run(scenario())
+
+def test_acquire_is_fifo_at_the_bucket_rate(clock):
+    limiter = TokenBucketLimiter("test", rate=2, capacity=1)
+    assert acquire_all(clock, limiter, [1, 1, 1, 1]) == [(0, 0), (1, 0.5), (2, 1.0), (3, 1.5)]
+
+def test_waiting_heavy_request_is_not_overtaken(clock):
+    # Czekający trzyma lock podczas sleep, więc lżejsze zapytania za nim nie wyprzedzają go
+    limiter = TokenBucketLimiter("test", rate=1, capacity=5)
+    limiter.tokens = 0
+    assert acquire_all(clock, limiter, [5, 1]) == [(0, 5), (1, 6)]
+
+def test_request_heavier_than_capacity_waits_for_a_full_bucket(clock):
+    limiter = TokenBucketLimiter("test", rate=1, capacity=4)
+    limiter.tokens = 2
+    assert acquire_all(clock, limiter, [10, 1]) == [(0, 2), (1, 9)]
+    assert limiter.tokens == 0
+
+class FailingClient:
+    def __init__(self, error, headers=None):
+        self.error = error
+        self.last_response_headers = headers
+
+    async def fetch_ticker(self, symbol):
+        raise self.error(f"{symbol} limited")
+
+@pytest.mark.parametrize("error, headers, pause", [
+    (ccxt.RateLimitExceeded, {"Retry-After": "7"}, 7),
+    (ccxt.RateLimitExceeded, None, 5),
+    (ccxt.DDoSProtection, None, 60),
+    (ccxt.DDoSProtection, {"retry-after": "12.5"}, 12.5),
+])
+def test_rate_limited_response_pauses_and_backs_off(clock, error, headers, pause):
+    limiter = TokenBucketLimiter("test", rate=10, capacity=10, cooldown=5, ban_cooldown=60)
+
+    async def scenario():
+        with pytest.raises(error):
+            await limiter.run(FailingClient(error, headers), "fetch_ticker", "X/USDT")
+        assert limiter.blocked_until == clock.now + pause
+        assert limiter.rate == 5 and limiter.tokens <= 0
+        await limiter.acquire()
+
+    start = clock.now
+    asyncio.run(scenario())
+    # Pierwsze zapytanie przechodzi dopiero po pauzie
+    assert clock.now - start == pytest.approx(pause)
+
+def test_rate_recovers_after_successes(clock):
+    limiter = TokenBucketLimiter("test", rate=10, capacity=10, recovery_step=0.1)
+    limiter.on_rate_limited()
+    for _ in range(3):
+        limiter.on_success()
+    assert limiter.rate == pytest.approx(8)
+    for _ in range(10):
+        limiter.on_success()
+    assert limiter.rate == 10
+
+def test_scale_and_restore_budget(clock):
+    limiter = TokenBucketLimiter("test", rate=20, capacity=40)
+    limits = limiter.limits()
+    limiter.scale(0.25)
+    assert (limiter.base_rate, limiter.rate, limiter.min_rate, limiter.capacity, limiter.tokens) == (5, 5, 0.25, 10, 10)
+    limiter.on_rate_limited()
+    limiter.restore(limits)
+    # Przywrócenie nie zależy od backoffu w trakcie działania ani nie dodaje tokenów ponad stan kubełka
+    assert (limiter.base_rate, limiter.rate, limiter.min_rate, limiter.capacity) == (20, 20, 1, 40)
+    assert limiter.tokens <= 0
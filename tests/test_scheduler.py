@@ -0,0 +1,60 @@
+import time
+from types import SimpleNamespace
+import pytest
+from arbitrage import PairArbitrageStrategy
+from scheduler import PollingScheduler
+from screening import TickerScreener
+
+def test_scheduler_checks_spreads_near_threshold_first():
+    scheduler = PollingScheduler(["far", "near", "above"], budget=2, threshold=1, max_interval=60)
+    for _ in range(5):
+        for symbol, spread in (("far", -3.0), ("near", 0.8), ("above", 1.5)):
+            scheduler.record(symbol, spread, now=0)
+    scheduler.select(now=0)  # pierwszy przebieg: wszystkie symbole są zaległe
+    assert scheduler.select(now=1) == ["above", "near"]
+
+def test_scheduler_never_exceeds_max_interval():
+    scheduler = PollingScheduler(["far", "near", "above"], budget=1, threshold=1, max_interval=10)
+    for symbol, spread in (("far", -5.0), ("near", 0.9), ("above", 2.0)):
+        scheduler.record(symbol, spread, now=0)
+    last_checked = {}
+    for now in range(0, 60):
+        for symbol in scheduler.select(now=now):
+            last_checked[symbol] = now
+        assert all(now - last_checked[symbol] <= 10 for symbol in last_checked)
+    assert set(last_checked) == {"far", "near", "above"}
+
+def test_scheduler_selects_only_among_candidates():
+    scheduler = PollingScheduler(["a", "b", "c"], budget=5, threshold=1, max_interval=60)
+    assert scheduler.select(now=0, candidates=["c", "x"]) == ["c"]
+    assert scheduler.stats["a"].checked_at < 0
+
+def screened_strategy(prices):
+    # Strategia w trybie snapshotu z prawdziwym screeningiem; prices: {symbol: (ask na a, bid na b)}
+    screener = TickerScreener({"a": 0, "b": 0}, threshold=1, absurd_threshold=100)
+    market_data = SimpleNamespace(screener=screener, get_ticker=lambda name, symbol: {"timestamp": None, "received": time.time()})
+    strategy = PairArbitrageStrategy(None, None, list(prices), pair_name="a-b", market_data=market_data)
+    screener.add_pair("a-b", "a", "b", strategy.screening_assets())
+    tickers = {"a": {symbol: {"bid": ask, "ask": ask} for symbol, (ask, _) in prices.items()},
+               "b": {symbol: {"bid": bid, "ask": bid} for symbol, (_, bid) in prices.items()}}
+    return strategy, screener.screen(tickers).get("a-b", [])
+
+def test_snapshot_candidates_are_limited_by_budget():
+    strategy, candidates = screened_strategy({"A/USDT": (100, 101.2), "B/USDT": (100, 105), "C/USDT": (100, 101.1)})
+    assert strategy.scheduler is not None
+    strategy.scheduler.budget = 1
+    strategy.scheduler.threshold = 1
+    # Pierwszy przebieg: żaden kandydat nie był jeszcze sprawdzany – wszyscy są zaległi
+    assert len(strategy.select_candidates(candidates)) == 3
+    selected = strategy.select_candidates(candidates)
+    assert [candidate[0].key for candidate in selected] == ["B/USDT"]
+
+def test_screened_spreads_below_threshold_update_scheduler_stats():
+    strategy, candidates = screened_strategy({"A/USDT": (100, 105), "D/USDT": (100, 100.3), "E/USDT": (100, None)})
+    assert [candidate[0].key for candidate in candidates] == ["A/USDT"]
+    strategy.select_candidates(candidates)
+    stats = strategy.scheduler.stats
+    assert stats["A/USDT"].spread == pytest.approx(5)
+    # D/USDT jest poniżej progu, a mimo to jego spread trafia do statystyk; E/USDT nie ma ceny na giełdzie b
+    assert stats["D/USDT"].spread == pytest.approx(0.3)
+    assert stats["E/USDT"].spread is None
@@ -0,0 +1,71 @@
+import asyncio
+import json
+import time
+from aiohttp import web
+import ccxt.pro as ccxtpro
+import stream_replay
+from exchanges.streaming import MarketStream, _replace_urls
+from utils import stale_legs
+
+MARKET = {"id": "XUSDT", "lowercaseId": "xusdt", "symbol": "X/USDT", "base": "X", "quote": "USDT",
+          "baseId": "X", "quoteId": "USDT", "type": "spot", "spot": True, "active": True, "info": {}}
+
+async def replay_stream(name, feed, action, max_age=5, record_file=None):
+    # MarketStream z klientem ccxt.pro połączonym z lokalnym serwerem stream_replay (bez sieci i ładowania rynków)
+    runner = web.AppRunner(stream_replay.create_app(feed, speed=0))
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    client = getattr(ccxtpro, name)()
+    client.urls['api']['ws'] = _replace_urls(client.urls['api']['ws'], f"ws://127.0.0.1:{port}")
+    client.set_markets([client.safe_market_structure(dict(MARKET))])
+    stream = MarketStream(name, client, max_age=max_age, record_file=record_file)
+    try:
+        action(stream)
+        for _ in range(100):
+            await asyncio.sleep(0.02)
+            if stream.tickers or stream.order_books:
+                break
+        await asyncio.sleep(0.1)
+        return stream, stream.get_tickers(["X/USDT"]), stream.get_order_book("X/USDT", 1)
+    finally:
+        await stream.close()
+        await runner.cleanup()
+
+def test_stream_ticker_updates_are_stamped_and_gated():
+    feed = [(0, {"u": 1, "s": "XUSDT", "b": "1.0", "B": "2", "a": "1.1", "A": "3"}),
+            (0, {"u": 2, "s": "XUSDT", "b": "1.2", "B": "2", "a": "1.3", "A": "3"})]
+    before = time.time()
+    stream, tickers, _ = asyncio.run(replay_stream("binance", feed, lambda stream: stream.start(["X/USDT"])))
+    ticker = tickers["X/USDT"]
+    assert (ticker["bid"], ticker["ask"]) == (1.2, 1.3)
+    # Kanał book-ticker nie ma znacznika giełdy – wiek notowania wyznacza czas odebrania
+    assert ticker["timestamp"] is None and before <= ticker["received"] <= time.time()
+    leg = (ticker["timestamp"], ticker["received"])
+    assert stale_legs(leg, leg, ticker["received"] + 1, max_age=5) is None
+    assert stale_legs(leg, leg, ticker["received"] + 10, max_age=5) == "quote 10.00s old"
+    # Po max_age bez nowych wiadomości strumień nie zwraca już tickera
+    stream.max_age = 0
+    assert stream.get_ticker("X/USDT") is None
+
+def test_stream_order_book_honours_limit():
+    timestamp = int(time.time() * 1000)
+    feed = [(0, {"action": "snapshot", "arg": {"instType": "SPOT", "channel": "books5", "instId": "XUSDT"}, "ts": timestamp,
+                 "data": [{"asks": [["1.1", "3"], ["1.2", "1"]], "bids": [["1.0", "2"], ["0.9", "1"]], "ts": str(timestamp)}]})]
+    stream, tickers, order_book = asyncio.run(
+        replay_stream("bitget", feed, lambda stream: stream.subscribe_order_book("X/USDT", 5)))
+    assert order_book["asks"] == [[1.1, 3]] and order_book["bids"] == [[1.0, 2]]
+    assert order_book["received"] is not None
+    # Ticker z order booka niesie ten sam czas odebrania
+    assert (tickers["X/USDT"]["bid"], tickers["X/USDT"]["ask"]) == (1.0, 1.1)
+    assert tickers["X/USDT"]["received"] == order_book["received"]
+
+def test_recorded_stream_messages_are_written_by_the_recorder(tmp_path):
+    feed = [(0, {"u": 1, "s": "XUSDT", "b": "1.0", "B": "2", "a": "1.1", "A": "3"}),
+            (0, {"u": 2, "s": "XUSDT", "b": "1.2", "B": "2", "a": "1.3", "A": "3"})]
+    path = tmp_path / "binance.jsonl"
+    asyncio.run(replay_stream("binance", feed, lambda stream: stream.start(["X/USDT"]), record_file=str(path)))
+    # close() czeka na wątek zapisu – wszystkie odebrane wiadomości są już w pliku
+    messages = [json.loads(line.split("\t", 1)[1]) for line in path.read_text(encoding="utf-8").splitlines()]
+    assert [message for message in messages if message.get("s") == "XUSDT"] == [message for _, message in feed]
@@ -0,0 +1,76 @@
+import asyncio
+import math
+import pytest
+from market_data import MarketDataHub
+from triangular import EPS, LogPriceGraph, TriangularEngine
+
+def rate(value):
+    return -math.log(value)
+
+def assert_potentials_valid(graph):
+    # Niezmiennik grafu: każda krawędź poza naruszonymi ma nieujemny koszt zredukowany
+    for u, edges in graph.out.items():
+        for v, weight in edges.items():
+            if (u, v) not in graph.violated:
+                assert weight + graph.pi[u] - graph.pi[v] >= -EPS
+
+def test_graph_detects_cycle_and_clears_it_incrementally():
+    graph = LogPriceGraph()
+    assert graph.set_edge("A", "B", rate(2)) is None
+    assert graph.set_edge("B", "C", rate(3)) is None
+    assert graph.set_edge("C", "A", rate(0.16)) is None  # 2 * 3 * 0.16 = 0.96 – strata
+    assert_potentials_valid(graph)
+    cycle = graph.set_edge("C", "A", rate(0.17), label="C->A")  # 2 * 3 * 0.17 = 1.02
+    assert cycle["nodes"] == ["A", "B", "C", "A"]
+    assert cycle["profit"] == pytest.approx(2)
+    assert cycle["legs"] == [None, None, "C->A"]
+    assert graph.violated == {("C", "A")}
+    # Cykl nadal istnieje, dopóki kurs się nie zmieni
+    assert [found["nodes"] for found in graph.repair()] == [["A", "B", "C", "A"]]
+    graph.set_edge("B", "C", rate(2.9))  # 2 * 2.9 * 0.17 = 0.986
+    assert graph.repair() == []
+    assert graph.violated == set()
+    assert_potentials_valid(graph)
+
+def test_weight_increase_keeps_potentials():
+    graph = LogPriceGraph()
+    graph.set_edge("A", "B", rate(2))
+    graph.set_edge("B", "A", rate(0.4))
+    potentials = dict(graph.pi)
+    graph.set_edge("A", "B", rate(1.5))
+    assert graph.pi == potentials
+    assert_potentials_valid(graph)
+
+def test_engine_finds_triangle_from_ticker_snapshots():
+    engine = TriangularEngine(transfer_cost=-1)
+    engine.add_markets("x", ["BTC/USDT", "ETH/BTC", "ETH/USDT"], fee_rate=0)
+    fair = {"BTC/USDT": {"bid": 100, "ask": 100}, "ETH/BTC": {"bid": 0.1, "ask": 0.1}, "ETH/USDT": {"bid": 10, "ask": 10}}
+    assert engine.update({"x": fair}) == []
+    # ETH drożeje na rynku USDT: USDT -> BTC -> ETH -> USDT daje 5%
+    cycles = engine.update({"x": dict(fair, **{"ETH/USDT": {"bid": 10.5, "ask": 10.6}})})
+    assert len(cycles) == 1
+    assert cycles[0]["profit"] == pytest.approx(5)
+    assert {leg[1] for leg in cycles[0]["legs"]} == {"BTC/USDT", "ETH/BTC", "ETH/USDT"}
+    # Tylko zmienione rynki zmieniają krawędzie; cena ostatniej transakcji zastępuje brakującą stronę
+    engine.update({"x": dict(fair, **{"ETH/USDT": {"bid": None, "ask": 10, "last": 10}})})
+    assert engine.prices[("x", "ETH/USDT")] == (10, 10)
+    assert engine.update({"x": fair}) == []
+
+class StaticExchange:
+    def __init__(self, symbols):
+        self.symbols = symbols
+        self.calls = 0
+
+    async def fetch_tickers(self, symbols=None):
+        self.calls += 1
+        return {symbol: {"bid": 1, "ask": 1} for symbol in self.symbols}
+
+def test_tracked_symbols_share_the_snapshot_and_survive_reload():
+    a, b = StaticExchange(["X/USDT", "BTC/USDT", "Y/USDT"]), StaticExchange(["BTC/USDT"])
+    hub = MarketDataHub({"a": a}, symbols={"a": {"X/USDT"}})
+    hub.track({"a": a, "b": b}, {"a": {"BTC/USDT"}, "b": {"BTC/USDT"}})
+    hub.set_symbols({"a": {"Y/USDT"}})
+    asyncio.run(hub.refresh())
+    assert set(hub.tickers["a"]) == {"Y/USDT", "BTC/USDT"}
+    assert set(hub.tickers["b"]) == {"BTC/USDT"}
+    assert (a.calls, b.calls) == (1, 1)
@@ -0,0 +1,185 @@
+import asyncio
+import heapq
+import logging
+import math
+from config import CONFIG
+from utils import calculate_effective_buy, calculate_effective_sell, ticker_quotes
+
+logger = logging.getLogger("arbitrage")
+opp_logger = logging.getLogger("arbitrage_opportunities")
+
+EPS = 1e-12
+
+class LogPriceGraph:
+    """
+    Graf walut z wagami krawędzi -log(kursu po opłatach): ujemny cykl = sekwencja wymian, po której mamy
+    więcej waluty początkowej. Zamiast uruchamiać Bellmana-Forda od zera, graf utrzymuje potencjały
+    wierzchołków (pi), dla których każda krawędź ma nieujemny koszt zredukowany w + pi[u] - pi[v].
+    Wzrost wagi nie narusza potencjałów (O(1)); spadek wagi krawędzi u->v naprawia je Dijkstrą od v,
+    ograniczoną do wierzchołków, których potencjał faktycznie się zmienia. Jeśli Dijkstra dojdzie do u,
+    krawędź zamyka ujemny cykl – wtedy zostaje oznaczona jako "naruszona" i sprawdzana ponownie przy kolejnych zmianach.
+    """
+    def __init__(self):
+        self.out = {}  # {u: {v: waga}}
+        self.labels = {}  # {(u, v): opis krawędzi, np. ("binance", "BTC/USDT", "buy")}
+        self.pi = {}
+        self.violated = set()  # krawędzie, których nie da się dodać bez ujemnego cyklu
+
+    def _node(self, node):
+        if node not in self.out:
+            self.out[node] = {}
+            self.pi[node] = 0.0
+
+    def set_edge(self, u, v, weight, label=None):
+        self._node(u)
+        self._node(v)
+        self.out[u][v] = weight
+        if label is not None:
+            self.labels[(u, v)] = label
+        if (u, v) in self.violated:
+            return None
+        cycle = self._insert(u, v, weight)
+        if cycle is not None:
+            self.violated.add((u, v))
+        return cycle
+
+    def repair(self):
+        # Ponowna próba dla naruszonych krawędzi; zwraca cykle, które nadal istnieją
+        cycles = []
+        for u, v in list(self.violated):
+            self.violated.discard((u, v))
+            cycle = self._insert(u, v, self.out[u][v])
+            if cycle is not None:
+                self.violated.add((u, v))
+                cycles.append(cycle)
+        return cycles
+
+    def _insert(self, u, v, weight):
+        reduced = weight + self.pi[u] - self.pi[v]
+        if reduced >= -EPS:
+            return None
+        delta = -reduced
+        dist = {v: 0.0}
+        parent = {v: None}
+        done = []
+        heap = [(0.0, v)]
+        visited = set()
+        while heap:
+            d, x = heapq.heappop(heap)
+            if x in visited:
+                continue
+            if d >= delta - EPS:
+                break
+            if x == u:
+                return self._cycle(parent, u, v)
+            visited.add(x)
+            done.append(x)
+            pi_x = self.pi[x]
+            for y, w in self.out[x].items():
+                if (x, y) in self.violated:
+                    continue
+                nd = d + w + pi_x - self.pi[y]
+                if nd < dist.get(y, math.inf):
+                    dist[y] = nd
+                    parent[y] = x
+                    heapq.heappush(heap, (nd, y))
+        for x in done:
+            self.pi[x] += dist[x] - delta
+        return None
+
+    def _cycle(self, parent, u, v):
+        path = [u]
+        while path[-1] != v:
+            path.append(parent[path[-1]])
+        path.reverse()  # v -> ... -> u
+        nodes = path + [v]
+        weight = sum(self.out[a][b] for a, b in zip(nodes, nodes[1:]))
+        return {"nodes": nodes, "profit": (math.exp(-weight) - 1) * 100,
+                "legs": [self.labels.get((a, b)) for a, b in zip(nodes, nodes[1:])]}
+
+class TriangularEngine:
+    """
+    Buduje graf z rynków zwróconych przez load_markets_for_exchange: wierzchołki to waluty na danej giełdzie
+    ("binance:BTC"), krawędzie to kupno/sprzedaż na rynku oraz (opcjonalnie) transfer tej samej waluty
+    między giełdami. Każdy snapshot tickerów zmienia tylko krawędzie rynków, których ceny się zmieniły.
+    """
+    def __init__(self, transfer_cost=None):
+        self.graph = LogPriceGraph()
+        self.markets = {}  # {giełda: {symbol: (base, quote)}}
+        self.fee_rates = {}
+        self.prices = {}  # {(giełda, symbol): (bid, ask)}
+        self.transfer_cost = transfer_cost if transfer_cost is not None else CONFIG.get("TRIANGULAR_TRANSFER_COST")
+
+    def add_markets(self, exchange_name, markets, fee_rate):
+        parsed = {}
+        for symbol in markets:
+            if "/" in symbol:
+                base, quote = symbol.split("/")
+                parsed[symbol] = (base, quote)
+        self.markets[exchange_name] = parsed
+        self.fee_rates[exchange_name] = fee_rate
+        if self.transfer_cost is not None and self.transfer_cost >= 0:
+            self._add_transfer_edges(exchange_name)
+
+    def _add_transfer_edges(self, exchange_name):
+        # Transfer waluty między giełdami (koszt w %), dzięki czemu wykrywane są też cykle międzygiełdowe
+        currencies = {c for base_quote in self.markets[exchange_name].values() for c in base_quote}
+        weight = -math.log(1 - self.transfer_cost / 100)
+        for other, markets in self.markets.items():
+            if other == exchange_name:
+                continue
+            other_currencies = {c for base_quote in markets.values() for c in base_quote}
+            for currency in currencies & other_currencies:
+                a, b = f"{exchange_name}:{currency}", f"{other}:{currency}"
+                self.graph.set_edge(a, b, weight, (exchange_name, currency, "transfer"))
+                self.graph.set_edge(b, a, weight, (other, currency, "transfer"))
+
+    def update_from_tickers(self, exchange_name, tickers):
+        fee = self.fee_rates[exchange_name]
+        for symbol, (base, quote) in self.markets.get(exchange_name, {}).items():
+            ticker = tickers.get(symbol)
+            if not ticker:
+                continue
+            bid, ask = ticker_quotes(ticker)
+            if not bid or not ask or self.prices.get((exchange_name, symbol)) == (bid, ask):
+                continue
+            self.prices[(exchange_name, symbol)] = (bid, ask)
+            base_node, quote_node = f"{exchange_name}:{base}", f"{exchange_name}:{quote}"
+            # Sprzedaż base za quote po bid, kupno base za quote po ask (oba kursy po opłatach)
+            sell_weight = -math.log(calculate_effective_sell(bid, fee))
+            buy_weight = math.log(calculate_effective_buy(ask, fee))
+            self.graph.set_edge(base_node, quote_node, sell_weight, (exchange_name, symbol, "sell"))
+            self.graph.set_edge(quote_node, base_node, buy_weight, (exchange_name, symbol, "buy"))
+
+    def update(self, snapshot):
+        # snapshot: {giełda: {symbol: ticker}}; zwraca aktualnie istniejące ujemne cykle.
+        # Cykle raportujemy dopiero po naniesieniu całego snapshotu – w trakcie część krawędzi ma jeszcze stare ceny
+        for exchange_name, tickers in snapshot.items():
+            if exchange_name in self.markets:
+                self.update_from_tickers(exchange_name, tickers)
+        cycles = self.graph.repair()
+        unique = {}
+        for cycle in cycles:
+            unique.setdefault(frozenset(cycle["nodes"]), cycle)
+        return list(unique.values())
+
+class TriangularArbitrageStrategy:
+    def __init__(self, engine, market_data, min_profit=None):
+        self.engine = engine
+        self.market_data = market_data
+        self.min_profit = min_profit if min_profit is not None else CONFIG.get("TRIANGULAR_MIN_PROFIT", 0.1)
+
+    async def run(self):
+        logger.info(f"Triangular - Starting cycle search over {len(self.engine.graph.out)} currency nodes.")
+        cycle = 0
+        try:
+            while True:
+                cycle = await self.market_data.wait_for_update(cycle)
+                for found in self.engine.update(self.market_data.tickers):
+                    if found["profit"] < self.min_profit:
+                        continue
+                    legs = " -> ".join(f"{leg[1]} {leg[2]} ({leg[0]})" for leg in found["legs"] if leg)
+                    opp_logger.info(f"Triangular | Cycle: {' -> '.join(found['nodes'])} | Profit: {found['profit']:.4f}% | Legs: {legs}")
+        except asyncio.CancelledError:
+            logger.info("Triangular - Cycle search cancelled.")
+            return
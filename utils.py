@@ -1,5 +1,53 @@
+from config import CONFIG
+
 def calculate_effective_buy(price, fee_rate):
     return price * (1 + fee_rate / 100)
 
 def calculate_effective_sell(price, fee_rate):
     return price * (1 - fee_rate / 100)
+
+def ticker_quotes(ticker):
+    # (bid, ask) tickera – ceny porównywane między giełdami (kupno po ask, sprzedaż po bid). Tylko gdy giełda
+    # nie podaje strony księgi, zastępuje ją cena ostatniej transakcji
+    last = ticker.get("last")
+    return ticker.get("bid") or last, ticker.get("ask") or last
+
+
+def quote_time(timestamp, received):
+    # Chwila notowania w sekundach: znacznik giełdy (ms), a gdy go brak – czas odebrania odpowiedzi
+    if timestamp:
+        return timestamp / 1000
+    return received
+
+def stale_quote(leg, now, max_age=None):
+    # leg = (znacznik giełdy w ms, czas odebrania w s); True, gdy notowanie jest starsze niż MAX_QUOTE_AGE
+    max_age = max_age if max_age is not None else CONFIG.get("MAX_QUOTE_AGE")
+    moment = quote_time(*leg)
+    return max_age is not None and moment is not None and now - moment > max_age
+
+def stale_legs(leg1, leg2, now, max_skew=None, max_age=None):
+    """
+    Sprawdza, czy obie nogi pochodzą z (prawie) tej samej chwili i nie są przeterminowane.
+    Zwraca opis powodu odrzucenia albo None. Notowania bez żadnego znacznika czasu nie są odrzucane.
+    """
+    max_skew = max_skew if max_skew is not None else CONFIG.get("MAX_LEG_SKEW")
+    max_age = max_age if max_age is not None else CONFIG.get("MAX_QUOTE_AGE")
+    t1, t2 = quote_time(*leg1), quote_time(*leg2)
+    if t1 is None or t2 is None:
+        return None
+    skew = abs(t1 - t2)
+    if max_skew is not None and skew > max_skew:
+        return f"legs {skew:.2f}s apart"
+    age = now - min(t1, t2)
+    if max_age is not None and age > max_age:
+        return f"quote {age:.2f}s old"
+    return None
+
+def exchange_label(exchange):
+    # Nazwa giełdy do logów – z adaptera (display_name), więc nagrywanie i replay dają etykietę giełdy, a nie klasy
+    return getattr(exchange, "display_name", None) or getattr(exchange, "name", None) or exchange.__class__.__name__
+
+def normalize_symbol(symbol):
+    if ":" in symbol:
+        return symbol.split(":")[0]
+    return symbol